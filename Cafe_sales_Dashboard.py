@@ -1,18 +1,92 @@
-import pandas as pd
-from analysis_events import show_events_analysis
-from analysis_temp import show_temperature_analysis
-from analysis_category import show_category_performance
-from analysis_discounts import show_discount_analysis
+import os
+from sales_data import source_key
+from aggregates import load_aggregates
+from ingest import (
+    STORE_DIR, load_receipt_lines, load_store_aggregates, manifest_path, source_version, store_date_ranges, store_seeded,
+)
+from instrumentation import SectionTimer, mark_cache_miss, show_diagnostics_panel, start_run
+from sales_filter import build_index, build_indexes, category_products, filter_aggregates, slice_index
+from shared_store import load_shared
 import streamlit as st
 
+# The analysis modules (and scipy, plotly, matplotlib behind them) are
+# imported inside the routing below, the first time their section is opened
+
 st.set_page_config(page_title="Cafe Sales Dashboard", layout="wide")
 
 # --- Utility Function ---
-def load_main_data(path):
-    df = pd.read_csv(path)
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
-    return df
+# The sections only read the aggregate cube, built once per data version and
+# published as memory-mapped Arrow files (the source key changes whenever the
+# source does). cache_resource hands every session the same read-only frames,
+# and other processes attach to the same mapped pages
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_cached_aggregates(path, key):
+    mark_cache_miss()
+    return load_shared(key, 'aggregates', lambda: load_aggregates(path))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_cached_store_aggregates(store_dir, key):
+    mark_cache_miss()
+    return load_shared(key, 'aggregates', lambda: load_store_aggregates(store_dir))
+
+# A store or month selection reads only its partitions, aggregated per store in parallel
+@st.cache_resource(show_spinner="Loading selected stores...", max_entries=8)
+def _load_cached_store_selection(store_dir, key, stores, months):
+    mark_cache_miss()
+    return load_store_aggregates(store_dir, list(stores) or None, *months)
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _load_cached_store_ranges(store_dir, key):
+    return store_date_ranges(store_dir)
+
+def load_main_aggregates(path, stores=(), months=(None, None)):
+    # Prefer the incrementally maintained store once it is seeded with the history
+    if store_seeded(STORE_DIR):
+        key = source_key(manifest_path(STORE_DIR))
+        if stores or any(month is not None for month in months):
+            return _load_cached_store_selection(STORE_DIR, key, stores, months)
+        return _load_cached_store_aggregates(STORE_DIR, key)
+    return _load_cached_aggregates(path, source_key(path))
+
+def data_version(path):
+    if store_seeded(STORE_DIR):
+        return source_key(manifest_path(STORE_DIR))
+    return source_key(path)
+
+# Receipt lines for basket analysis, indexed like the cube; None without receipt IDs
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_cached_receipts(store_dir, key, stores):
+    mark_cache_miss()
+    lines = load_receipt_lines(store_dir, list(stores) or None)
+    return None if lines is None else build_index(lines)
+
+# The date-sorted filter index is read-only, so one copy is shared by all sessions
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_cached_indexes(key, _aggregates):
+    mark_cache_miss()
+    return build_indexes(_aggregates), category_products(_aggregates['cube'])
+
+# --- Filters ---
+def date_filter(first, last):
+    date_range = st.sidebar.date_input("Date range", (first, last), min_value=first, max_value=last)
+    # The range picker returns a single date while the second click is pending
+    start = date_range[0] if len(date_range) > 0 and date_range[0] != first else None
+    end = date_range[1] if len(date_range) > 1 and date_range[1] != last else None
+    return start, end
+
+def store_filters(ranges):
+    # Stores and their date bounds come from the manifest, so a selection can
+    # prune partitions before anything is read
+    stores = tuple(st.sidebar.multiselect("Stores", list(ranges))) if len(ranges) > 1 else ()
+    in_view = [ranges[s] for s in stores or ranges]
+    start, end = date_filter(min(r[0] for r in in_view), max(r[1] for r in in_view))
+    return stores, start, end
+
+def product_filters(products_by_category):
+    categories = st.sidebar.multiselect("Categories", list(products_by_category))
+    product_choices = [p for c in (categories or products_by_category) for p in products_by_category[c]]
+    products = st.sidebar.multiselect("Products", product_choices)
+    return categories, products
 
 
 
@@ -21,17 +95,57 @@ def load_main_data(path):
 # --- Data Loading ---
 DATA_PATH = "CafeSales_clean.csv"
 EVENTS_PATH = "Data Anaylst Task -Events_2023_2024.csv"
-df = load_main_data(DATA_PATH)
 
 section = st.sidebar.radio("Go to", [
     "Home",
     "Event Impact",
     "Temperature Effect",
     "Category Performance",
+    "Basket Analysis",
     "Discount Analysis",
     "Model Development",
     "Final Conclusion"
 ])
+show_diagnostics = st.sidebar.checkbox("Show diagnostics")
+start_run()
+
+# Streaming mode reads the data in chunks for files too large to aggregate in memory:
+# the seeded store's parts under its store and date filters, otherwise the CSV
+stream_discounts = section == "Discount Analysis" and st.sidebar.checkbox("Stream discount data (bounded memory)")
+if stream_discounts and store_seeded(STORE_DIR):
+    st.sidebar.subheader("Filters")
+    stores, start, end = store_filters(_load_cached_store_ranges(STORE_DIR, data_version(DATA_PATH)))
+    st.sidebar.caption("Category and product filters are not applied in streaming mode.")
+
+if section in ("Event Impact", "Temperature Effect", "Category Performance", "Basket Analysis", "Discount Analysis",
+               "Model Development") and not stream_discounts:
+    timer = SectionTimer(section)
+    st.sidebar.subheader("Filters")
+    partitioned = store_seeded(STORE_DIR)
+    if not partitioned and os.path.exists(manifest_path(STORE_DIR)):
+        st.sidebar.caption(f"{STORE_DIR}/ is not seeded with {DATA_PATH} yet, so the CSV is shown. "
+                           "Run `python ingest.py` to seed it.")
+    stores, months = (), (None, None)
+    if partitioned:
+        stores, start, end = store_filters(_load_cached_store_ranges(STORE_DIR, data_version(DATA_PATH)))
+        # Whole months are read; the days inside them are filtered on the index below
+        months = tuple(None if day is None else day.replace(day=1) for day in (start, end))
+    aggregates = load_main_aggregates(DATA_PATH, stores, months)
+    timer.mark('load', rows=len(aggregates['cube']), cached=True)
+    if not partitioned:
+        dates = aggregates['daily']['Date']
+        start, end = date_filter(dates.min().date(), dates.max().date())
+    indexes, products_by_category = _load_cached_indexes((data_version(DATA_PATH), stores, months), aggregates)
+    timer.mark('index', cached=True)
+
+    # Every section reads the same filtered cube and rollups
+    categories, products = product_filters(products_by_category)
+    aggregates = filter_aggregates(aggregates, indexes, start, end, categories, products)
+    filtered = bool(stores or categories or products) or start is not None or end is not None
+    timer.mark('filter', rows=len(aggregates['cube']))
+    if aggregates['cube'].empty:
+        st.warning("No sales match the selected filters.")
+        st.stop()
 
 # --- Section Routing ---
 
@@ -50,41 +164,44 @@ if section == "Home":
     3. **Product Category Performance:**  
        Comparing the sales and trends of each product category.
 
-    4. **Discount Analysis:**  
+    4. **Basket Analysis:**  
+       Measuring which products and categories sell together.
+
+    5. **Discount Analysis:**  
        Investigating how different discount strategies affect sales quantity.
 
-    5. **Model Development:**  
+    6. **Model Development:**  
        Attempting to forecast sales using statistical and machine learning models.
 
     ---
     Use the sidebar to navigate to each section for details and interactive figures.
     """)
 elif section == "Event Impact":
-    show_events_analysis(df, EVENTS_PATH)
+    from analysis_events import show_events_analysis
+    # Store-specific events only count when a single store is selected
+    show_events_analysis(aggregates, EVENTS_PATH, stores[0] if len(stores) == 1 else None)
 elif section == "Temperature Effect":
-    show_temperature_analysis(df)
+    from analysis_temp import show_temperature_analysis
+    show_temperature_analysis(aggregates)
 elif section == "Category Performance":
-    show_category_performance(df)
+    from analysis_category import show_category_performance
+    show_category_performance(aggregates)
+elif section == "Basket Analysis":
+    from analysis_baskets import show_basket_analysis
+    # Only the ingested store carries receipt IDs
+    receipts = _load_cached_receipts(STORE_DIR, data_version(DATA_PATH), stores) if partitioned else None
+    show_basket_analysis(None if receipts is None else slice_index(receipts, start, end, categories, products))
 elif section == "Discount Analysis":
-    show_discount_analysis(df)
+    from analysis_discounts import show_discount_analysis
+    if stream_discounts and store_seeded(STORE_DIR):
+        show_discount_analysis(streaming_store=STORE_DIR, stores=stores, start=start, end=end)
+    elif stream_discounts:
+        show_discount_analysis(streaming_path=DATA_PATH)
+    else:
+        show_discount_analysis(aggregates)
 elif section == "Model Development":
-    st.markdown("""
-### **Model Development Summary**
-
-- Tried **Linear Regression, Random Forest, XGBoost, and Prophet** to forecast daily sales.
-- **Prophet with regressors** gave the best performance (lowest MAE and RMSE).
-- **Random Forest** and **XGBoost** had competitive results, but didn’t outperform Prophet.
-- **Main issue:** Streamlit app performance was slow when running model training and tuning live. This made real-time forecasting impractical.
-- **Solution:** Model evaluation and tuning were done offline in Jupyter, and results are summarized here instead of re-running each time.
-
-**Bottom line:**  
-Prophet is currently the best option for sales forecasting on this dataset, but heavy model training should be kept outside Streamlit for speed.
-
----
-"""
-)
-        
-    
+    from analysis_model import show_model_development
+    show_model_development(aggregates, EVENTS_PATH, filtered=filtered, version=source_version(DATA_PATH, STORE_DIR))
 elif section == "Final Conclusion":
     st.markdown("""
 # **Final Recommendations**
@@ -131,3 +248,7 @@ Let actual sales data drive every operational decision.
 """)
 
 
+
+# --- Diagnostics ---
+if show_diagnostics:
+    show_diagnostics_panel()
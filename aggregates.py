@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from sales_data import CACHE_DIR, SALES_SCHEMA, cache_path, discount_flag, load_sales_data, write_cache
+
+DISCOUNT_BINS = [0, 0.025, 0.05, 0.10, 0.20, 0.50]
+DISCOUNT_LABELS = ['Very Low (0–2.5%)', 'Low (2.5–5%)', 'Moderate (5–10%)', 'High (10–20%)', 'Very High (>20%)']
+# Fixed 2%-wide edges over the whole 0–100% range so histograms from different
+# data versions or batches can be added together
+DISCOUNT_HIST_EDGES = np.linspace(0, 1, 51)
+
+CUBE_DIMENSIONS = ['Date', 'Item Category', 'Product Description', 'Discount Applied', 'Discount Bin']
+CUBE_MEASURES = ['Sale Amount', 'Quantity Sold', 'Discount Amount', 'Temperature Sum', 'Temperature Count', 'Transactions']
+
+# Rollups materialized next to the cube: name -> (keys, dropna). The discount
+# rollup keeps undiscounted rows (no Discount Bin) for the Yes/No comparison
+ROLLUPS = {
+    'daily': (['Date'], True),
+    'monthly': (['Month', 'Item Category'], True),
+    'category': (['Item Category'], True),
+    'discount_bin': (['Item Category', 'Discount Applied', 'Discount Bin'], False),
+}
+AGGREGATE_NAMES = ['cube', 'discount_histogram'] + list(ROLLUPS)
+# Series levels that forecasts, trends and response curves are built for
+LEVELS = ['Item Category', 'Product Description']
+
+
+# --- Row-Level Derivations ---
+def discount_pct(df):
+    return df['Discount Amount'] / (df['Sale Amount'] + df['Discount Amount'])
+
+
+def discount_bin(pct):
+    return pd.cut(pct, bins=DISCOUNT_BINS, labels=DISCOUNT_LABELS, include_lowest=False)
+
+
+# --- Cube Construction ---
+def build_sales_cube(df, pct=None):
+    pct = discount_pct(df) if pct is None else pct
+    keys = [
+        df['Date'],
+        df['Item Category'],
+        df['Product Description'],
+        df['Discount Applied'],
+        discount_bin(pct).rename('Discount Bin'),
+    ]
+    # Narrow row dtypes are fine per transaction but not for running totals, so
+    # the measures are widened before they are summed
+    measures = pd.DataFrame({
+        'Sale Amount': df['Sale Amount'].astype('float64'),
+        'Quantity Sold': df['Quantity Sold'].astype('int64'),
+        'Discount Amount': df['Discount Amount'].astype('float64'),
+        'Temperature (°F)': df['Temperature (°F)'].astype('float64'),
+    }, index=df.index)
+    # dropna=False keeps the undiscounted rows, which have no Discount Bin
+    cube = measures.groupby(keys, observed=True, dropna=False).agg(**{
+        'Sale Amount': ('Sale Amount', 'sum'),
+        'Quantity Sold': ('Quantity Sold', 'sum'),
+        'Discount Amount': ('Discount Amount', 'sum'),
+        'Temperature Sum': ('Temperature (°F)', 'sum'),
+        'Temperature Count': ('Temperature (°F)', 'count'),
+        'Transactions': ('Sale Amount', 'size'),
+    })
+    return cube.reset_index()
+
+
+HISTOGRAM_DIMENSIONS = ['Date', 'Item Category', 'Product Description', 'Bin Start']
+
+
+def build_discount_histogram(df, pct=None):
+    # Counts per day and product on the fixed edges, so the histogram can be
+    # filtered like the cube; histogram_counts() collapses it for plotting
+    pct = (discount_pct(df) if pct is None else pct).to_numpy()
+    discounted = pct > 0
+    # Same binning as np.histogram: half-open bins, the last one closed
+    bins = np.searchsorted(DISCOUNT_HIST_EDGES, pct[discounted], side='right') - 1
+    bins = np.clip(bins, 0, len(DISCOUNT_HIST_EDGES) - 2)
+    keys = [
+        df['Date'][discounted],
+        df['Item Category'][discounted],
+        df['Product Description'][discounted],
+        pd.Series(DISCOUNT_HIST_EDGES[bins], index=df.index[discounted], name='Bin Start'),
+    ]
+    return df[discounted].groupby(keys, observed=True).size().rename('Count').reset_index()
+
+
+def histogram_counts(histogram):
+    # Total count per bin over all edges, empty bins included
+    counts = histogram.groupby('Bin Start')['Count'].sum().reindex(DISCOUNT_HIST_EDGES[:-1], fill_value=0)
+    return pd.DataFrame({
+        'Bin Start': DISCOUNT_HIST_EDGES[:-1],
+        'Bin End': DISCOUNT_HIST_EDGES[1:],
+        'Count': counts.to_numpy(),
+    })
+
+
+def merge_histograms(existing, delta):
+    if existing is None:
+        return delta
+    merged = pd.concat([existing, delta], ignore_index=True)
+    keys = [col for col in HISTOGRAM_DIMENSIONS if col in merged.columns]
+    return restore_dimension_dtypes(merged).groupby(keys, observed=True)['Count'].sum().reset_index()
+
+
+def build_aggregates(df):
+    pct = discount_pct(df)
+    cube = build_sales_cube(df, pct)
+    return {
+        'cube': cube,
+        'discount_histogram': build_discount_histogram(df, pct),
+        **build_rollups(cube),
+    }
+
+
+def empty_aggregates():
+    # Typed aggregates with no rows, for a selection nothing was sold in
+    rows = pd.DataFrame({'Date': pd.Series(dtype='datetime64[us]'),
+                         **{col: pd.Series(dtype=dtype) for col, dtype in SALES_SCHEMA.items()}})
+    return build_aggregates(rows)
+
+
+# --- Rollups ---
+def month_start(dates):
+    return dates.dt.to_period('M').dt.to_timestamp()
+
+
+def rollup(cube, by, dropna=True):
+    # Sums roll up exactly; means are re-derived from their sum and count parts
+    grouped = cube.groupby(by, observed=True, dropna=dropna)[CUBE_MEASURES].sum()
+    grouped['Temperature (°F)'] = grouped['Temperature Sum'] / grouped['Temperature Count']
+    return grouped.reset_index()
+
+
+def build_rollups(cube):
+    # Rollups are themselves valid rollup inputs, so they can be merged additively
+    if 'Month' not in cube.columns:
+        cube = cube.assign(Month=month_start(cube['Date']))
+    return {name: rollup(cube, keys, dropna=dropna) for name, (keys, dropna) in ROLLUPS.items()}
+
+
+def restore_dimension_dtypes(frame):
+    # Concatenating frames with different category sets falls back to object
+    for col in ['Item Category', 'Product Description']:
+        if col in frame.columns:
+            frame[col] = frame[col].astype('category')
+    if 'Discount Applied' in frame.columns:
+        frame['Discount Applied'] = discount_flag(frame['Discount Applied'])
+    if 'Discount Bin' in frame.columns:
+        frame['Discount Bin'] = frame['Discount Bin'].astype(pd.CategoricalDtype(DISCOUNT_LABELS, ordered=True))
+    return frame
+
+
+def merge_rollups(existing, delta, keys, dropna=True):
+    # Partial rollups of disjoint rows add up to the rollup of their union
+    if existing is None:
+        return delta
+    return restore_dimension_dtypes(rollup(pd.concat([existing, delta], ignore_index=True), keys, dropna=dropna))
+
+
+# --- Cached Loading ---
+def load_aggregates(path, cache_dir=CACHE_DIR):
+    paths = {name: cache_path(path, cache_dir, kind=name) for name in AGGREGATE_NAMES}
+    if all(os.path.exists(p) for p in paths.values()):
+        return {name: pd.read_parquet(p) for name, p in paths.items()}
+
+    aggregates = build_aggregates(load_sales_data(path, cache_dir))
+    for name, p in paths.items():
+        write_cache(aggregates[name], p)
+    return aggregates
@@ -0,0 +1,172 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from scipy import sparse
+from analysis_category import CATEGORY_COLORS
+from instrumentation import SectionTimer
+
+# A basket is one receipt. Receipt IDs only come with POS exports ingested
+# through clean_sales.py, and are only unique within a store
+RECEIPT_BASKET = ['Store', 'Transaction ID']
+MIN_SUPPORT = 0.01
+TOP_PRODUCTS = 25
+
+
+# --- Sparse Co-occurrence ---
+def incidence_matrix(frame, basket_columns, item_column):
+    # (baskets x items) 0/1 CSR matrix; repeated lines of an item in one basket count once
+    baskets = frame.groupby(basket_columns, sort=False, observed=True).ngroup().to_numpy()
+    items, labels = pd.factorize(frame[item_column].astype(str), sort=True)
+    keep = items >= 0
+    matrix = sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.int32), (baskets[keep], items[keep])),
+        shape=(baskets.max() + 1 if len(baskets) else 0, len(labels)),
+    )
+    matrix.data[:] = 1
+    return matrix, pd.Index(labels, name=item_column)
+
+
+def cooccurrence(incidence):
+    # (items x items) basket counts: the diagonal counts baskets holding each
+    # item, the off-diagonal baskets holding both
+    return (incidence.T @ incidence).tocsr()
+
+
+def pair_metrics(counts, n_baskets, labels, min_support=0.0):
+    # Support, confidence both ways and lift for every co-occurring pair, read
+    # off the upper triangle of the count matrix
+    single = counts.diagonal().astype(float)
+    pairs = sparse.triu(counts, k=1).tocoo()
+    both = pairs.data.astype(float)
+    keep = both / n_baskets >= min_support
+    a, b, both = pairs.row[keep], pairs.col[keep], both[keep]
+    result = pd.DataFrame({
+        'Item A': labels[a],
+        'Item B': labels[b],
+        'Baskets': both.astype(np.int64),
+        'Support': both / n_baskets,
+        'Confidence A→B': both / single[a],
+        'Confidence B→A': both / single[b],
+        'Lift': both * n_baskets / (single[a] * single[b]),
+    })
+    return result.sort_values(['Lift', 'Support'], ascending=False, ignore_index=True)
+
+
+def lift_matrix(counts, n_baskets, labels):
+    single = counts.diagonal().astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lift = counts.toarray() * n_baskets / np.outer(single, single)
+    np.fill_diagonal(lift, np.nan)
+    return pd.DataFrame(lift, index=labels, columns=labels)
+
+
+# --- Section Computation ---
+def compute_baskets(frame, basket_columns=RECEIPT_BASKET, min_support=MIN_SUPPORT, top_products=TOP_PRODUCTS):
+    # frame: one row per receipt line, e.g. ingest.load_receipt_lines()
+    frame = frame[frame['Quantity Sold'] > 0] if 'Quantity Sold' in frame else frame
+    products, product_labels = incidence_matrix(frame, basket_columns, 'Product Description')
+    n_baskets = products.shape[0]
+    if n_baskets == 0:
+        return None
+    product_counts = cooccurrence(products)
+
+    # Category baskets from the product ones: (baskets x products) @ (products x categories)
+    product_category = (frame[['Product Description', 'Item Category']].astype(str)
+                        .drop_duplicates('Product Description').set_index('Product Description')['Item Category']
+                        .reindex(product_labels))
+    category_codes, category_labels = pd.factorize(product_category, sort=True)
+    membership = sparse.csr_matrix(
+        (np.ones(len(category_codes), dtype=np.int32), (np.arange(len(category_codes)), category_codes)),
+        shape=(len(product_labels), len(category_labels)),
+    )
+    categories = (products @ membership).tocsr()
+    categories.data[:] = 1
+    category_counts = cooccurrence(categories)
+
+    # The heatmap shows the products found in the most baskets
+    top = np.argsort(-product_counts.diagonal(), kind='stable')[:top_products]
+    top = np.sort(top)
+    return {
+        'n_baskets': n_baskets,
+        'product_pairs': pair_metrics(product_counts, n_baskets, product_labels, min_support),
+        'category_pairs': pair_metrics(category_counts, n_baskets, pd.Index(category_labels, name='Item Category')),
+        'product_lift': lift_matrix(product_counts[top][:, top], n_baskets, product_labels[top]),
+        'product_support': pd.DataFrame({
+            'Product Description': product_labels,
+            'Item Category': product_category.to_numpy(),
+            'Support': product_counts.diagonal() / n_baskets,
+        }),
+    }
+
+
+def build_basket_figures(results):
+    fig1 = px.imshow(
+        results['product_lift'],
+        color_continuous_scale='RdBu_r',
+        color_continuous_midpoint=1.0,
+        title="Lift Between Products",
+        labels={'color': 'Lift', 'x': 'Product', 'y': 'Product'},
+        aspect='auto',
+    )
+    fig1.update_layout(height=650, title_x=0.5)
+
+    top_pairs = results['product_pairs'].head(15)
+    fig2 = px.bar(
+        top_pairs.assign(Pair=top_pairs['Item A'] + ' + ' + top_pairs['Item B']).iloc[::-1],
+        x='Lift',
+        y='Pair',
+        orientation='h',
+        color='Support',
+        title="Product Pairs with the Highest Lift",
+        labels={'Pair': 'Product Pair'},
+    )
+    fig2.add_vline(x=1.0, line_dash="dash", line_color="red")
+    fig2.update_layout(height=500, title_x=0.5)
+
+    fig3 = px.bar(
+        results['product_support'].sort_values('Support', ascending=False),
+        x='Product Description',
+        y='Support',
+        color='Item Category',
+        color_discrete_map=CATEGORY_COLORS,
+        title="Share of Baskets Containing Each Product",
+        labels={'Product Description': 'Product', 'Support': 'Support'},
+    )
+    fig3.update_layout(xaxis_tickangle=-45, title_x=0.5)
+    return {'lift_heatmap': fig1, 'top_pairs': fig2, 'product_support': fig3}
+
+
+# --- Rendering ---
+def show_basket_analysis(lines):
+    st.header("Basket Analysis: What Sells Together")
+    # Co-purchase needs receipts: a day's sales put every product in one basket
+    if lines is None:
+        st.info("Basket analysis needs receipt IDs. Ingest POS exports that carry a Transaction ID or Receipt ID "
+                "column with `python clean_sales.py export.csv`; CafeSales_clean.csv has none.")
+        return
+    min_support = st.slider("Minimum pair support (share of baskets)", 0.0, 0.5, MIN_SUPPORT, 0.01)
+    timer = SectionTimer("Basket Analysis")
+    results = compute_baskets(lines, RECEIPT_BASKET, min_support)
+    timer.mark('aggregate', rows=len(lines))
+    if results is None:
+        st.info("No receipts in the current selection.")
+        return
+    figures = build_basket_figures(results)
+
+    st.caption(f"{results['n_baskets']:,} receipts. Lift above 1 means two items are bought on the same receipt "
+               "more often than their separate rates suggest.")
+
+    st.subheader("Category Pairs")
+    st.dataframe(results['category_pairs'].rename(columns={'Item A': 'Category A', 'Item B': 'Category B'}), hide_index=True)
+
+    st.subheader("Product Pairs")
+    st.dataframe(results['product_pairs'].rename(columns={'Item A': 'Product A', 'Item B': 'Product B'}), hide_index=True)
+    st.plotly_chart(figures['top_pairs'], use_container_width=True)
+
+    st.subheader("Lift Heatmap")
+    st.plotly_chart(figures['lift_heatmap'], use_container_width=True)
+
+    st.subheader("Product Support")
+    st.plotly_chart(figures['product_support'], use_container_width=True)
+    timer.mark('render', rows=len(results['product_pairs']))
@@ -1,32 +1,54 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
+from instrumentation import SectionTimer, mark_cache_miss
+from trend_pyramid import build_trend_pyramid, trend_window
 
-def show_category_performance(df):
-    st.header("Category Performance Analysis")
 
-    # Clean up categories
-    category_order = ['Coffee', 'Pastries', 'Tea', 'Sandwiches']
-    custom_colors = {
-        'Coffee': '#6f4e37',
-        'Pastries': '#f5c16c',
-        'Tea': '#8cbf26',
-        'Sandwiches': '#d1bfa7'
-    }
+# Clean up categories
+CATEGORY_ORDER = ['Coffee', 'Pastries', 'Tea', 'Sandwiches']
+CATEGORY_COLORS = {
+    'Coffee': '#6f4e37',
+    'Pastries': '#f5c16c',
+    'Tea': '#8cbf26',
+    'Sandwiches': '#d1bfa7'
+}
+RESOLUTION_TITLES = {'Day': 'Daily', 'Week': 'Weekly', 'Month': 'Monthly'}
+
+
+# --- Section Computation ---
+def compute_category(aggregates, pyramid=None, start=None, end=None, resolution=None, level='Item Category'):
     # Compute total and average sales per category
-    category_stats = df.groupby('Item Category').agg(
-        Total_Sales=('Sale Amount', 'sum'),
-        Total_Quantity=('Quantity Sold', 'sum')
-    ).reset_index()
+    category_totals = aggregates['category']
+    category_stats = category_totals.rename(columns={
+        'Sale Amount': 'Total_Sales',
+        'Quantity Sold': 'Total_Quantity'
+    })[['Item Category', 'Total_Sales', 'Total_Quantity']]
     category_stats['Avg_Price'] = category_stats['Total_Sales'] / category_stats['Total_Quantity']
     category_stats['Item Category'] = pd.Categorical(
-        category_stats['Item Category'], categories=category_order, ordered=True
+        category_stats['Item Category'], categories=CATEGORY_ORDER, ordered=True
     )
     category_stats = category_stats.sort_values('Item Category')
 
-    st.subheader("Total Sales and Average Revenue per Item by Category")
+    # Revenue by category
+    category_revenue = category_totals[['Item Category', 'Sale Amount']].copy()
+    category_revenue['Item Category'] = pd.Categorical(category_revenue['Item Category'], categories=CATEGORY_ORDER, ordered=True)
+    category_revenue = category_revenue.sort_values('Item Category')
+
+    # Sales trend over [start, end], read from the rollup pyramid at the
+    # finest resolution that keeps the chart small (unless one is given)
+    pyramid = build_trend_pyramid(aggregates['cube']) if pyramid is None else pyramid
+    trend, resolution = trend_window(pyramid, level, start, end, resolution)
+    return {
+        'category_stats': category_stats,
+        'category_revenue': category_revenue,
+        'sales_trend': trend,
+        'trend_resolution': resolution,
+    }
+
+
+def build_category_figures(results):
+    category_stats = results['category_stats']
     fig1 = px.bar(
         category_stats,
         x='Item Category',
@@ -35,17 +57,12 @@ def show_category_performance(df):
         text=category_stats['Avg_Price'].apply(lambda x: f"{x:.2f} SAR/item"),
         title='Total Sales and Avg Revenue per Item',
         labels={'Total_Sales': 'Total Sales (SAR)', 'Item Category': 'Category'},
-        color_discrete_map=custom_colors
+        color_discrete_map=CATEGORY_COLORS
     )
     fig1.update_traces(textposition='outside')
     fig1.update_layout(showlegend=False, title_x=0.5)
-    st.plotly_chart(fig1, use_container_width=True)
 
-    # Revenue by category
-    st.subheader("Total Revenue by Item Category")
-    category_revenue = df.groupby('Item Category')['Sale Amount'].sum().reset_index()
-    category_revenue['Item Category'] = pd.Categorical(category_revenue['Item Category'], categories=category_order, ordered=True)
-    category_revenue = category_revenue.sort_values('Item Category')
+    category_revenue = results['category_revenue']
     fig2 = px.bar(
         category_revenue,
         x='Item Category',
@@ -53,35 +70,65 @@ def show_category_performance(df):
         title="Total Revenue by Item Category",
         labels={'Sale Amount': 'Total Revenue (SAR)', 'Item Category': 'Category'},
         color='Item Category',
-        color_discrete_map=custom_colors,
+        color_discrete_map=CATEGORY_COLORS,
         text=category_revenue['Sale Amount'].apply(lambda x: f"{x:,.0f} SAR")
     )
     fig2.update_traces(textposition='outside', textfont_size=10)
     fig2.update_layout(showlegend=False, title_x=0.5)
-    st.plotly_chart(fig2, use_container_width=True)
-
-    # Monthly sales by item category (lineplot)
-    st.subheader("Monthly Sales Trend by Category")
-    df['Date'] = pd.to_datetime(df['Date'])
-    monthly_category_sales = df.groupby([
-        pd.Grouper(key='Date', freq='M'), 'Item Category'
-    ])['Sale Amount'].sum().reset_index()
-    plt.figure(figsize=(14, 7))
-    sns.lineplot(
-        data=monthly_category_sales,
+
+    # Sales trend at the resolution picked for the visible range
+    trend = results['sales_trend']
+    level = trend.columns[1]
+    resolution = RESOLUTION_TITLES.get(results['trend_resolution'], '')
+    fig3 = px.line(
+        trend,
         x='Date',
         y='Sale Amount',
-        hue='Item Category',
-        linewidth=2.5
+        color=level,
+        title=f"{resolution} Sales by {'Item Category' if level == 'Item Category' else 'Product'}",
+        labels={'Sale Amount': 'Total Sales (SAR)'},
+        color_discrete_map=CATEGORY_COLORS if level == 'Item Category' else None,
     )
-    plt.title("Monthly Sales by Item Category")
-    plt.xlabel("Month")
-    plt.ylabel("Total Sales (SAR)")
-    plt.legend(title="Item Category")
-    plt.grid(True)
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
-    plt.clf()
+    fig3.update_traces(line_width=2.5)
+    fig3.update_layout(title_x=0.5, height=550, hovermode='x unified')
+    return {'sales_and_avg_price': fig1, 'revenue': fig2, 'sales_trend': fig3}
+
+
+# --- Rendering ---
+# Built once per (filtered) cube; every zoom or resolution change only slices it
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_trend_pyramid(cube):
+    mark_cache_miss()
+    return build_trend_pyramid(cube)
+
+
+def show_category_performance(aggregates):
+    st.header("Category Performance Analysis")
+    timer = SectionTimer("Category Performance")
+    pyramid = _cached_trend_pyramid(aggregates['cube'])
+    timer.mark('pyramid', rows=len(aggregates['cube']), cached=True)
+
+    # Trend controls: the visible range picks the resolution unless one is forced
+    first, last = aggregates['daily']['Date'].min().date(), aggregates['daily']['Date'].max().date()
+    with st.expander("Trend view", expanded=False):
+        level = st.radio("Lines", ['Item Category', 'Product Description'], horizontal=True, key="trend_level")
+        start, end = (first, last) if first == last else st.slider("Visible range", first, last, (first, last), key="trend_range")
+        resolution = st.selectbox("Resolution", ['Auto'] + pyramid['resolutions'], key="trend_resolution")
+    results = compute_category(aggregates, pyramid, start, end, None if resolution == 'Auto' else resolution, level)
+    timer.mark('aggregate', rows=len(results['sales_trend']))
+    figures = build_category_figures(results)
+
+    st.subheader("Total Sales and Average Revenue per Item by Category")
+    st.plotly_chart(figures['sales_and_avg_price'], use_container_width=True)
+
+    st.subheader("Total Revenue by Item Category")
+    st.plotly_chart(figures['revenue'], use_container_width=True)
+
+    st.subheader("Sales Trend")
+    st.plotly_chart(figures['sales_trend'], use_container_width=True)
+    st.caption(f"{RESOLUTION_TITLES[results['trend_resolution']]} totals from the precomputed rollups; "
+               "narrow the visible range under Trend view to drill down to finer periods. Weeks and months "
+               "cut off by the start or end of the data are left out rather than shown as dips.")
 
     # Text Recap
     st.markdown("""
@@ -91,3 +138,4 @@ def show_category_performance(df):
     - The average price per item is highest for sandwiches, but coffee dominates in volume.
     - Monthly trends are stable, with small seasonal shifts.
     """)
+    timer.mark('render', rows=len(results['sales_trend']))
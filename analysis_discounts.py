@@ -1,17 +1,112 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from aggregates import (
+    DISCOUNT_LABELS, ROLLUPS, build_discount_histogram, build_rollups, build_sales_cube, discount_pct, empty_aggregates,
+    histogram_counts, merge_rollups, rollup,
+)
+from discount_response import compute_discount_response
+from ingest import iter_store_rows, manifest_path
+from sales_data import iter_sales_csv, source_key
+from instrumentation import SectionTimer, mark_cache_miss
+from resampling import N_RESAMPLES, SEED, bootstrap, confidence_interval, permutation_test
 
-def show_discount_analysis(df):
-    st.header("Discount Analysis")
+
+BIN_COLORS = {
+    'Very Low (0–2.5%)': '#a6cee3',
+    'Low (2.5–5%)': '#1f78b4',
+    'Moderate (5–10%)': '#33a02c',
+    'High (10–20%)': '#fb9a99',
+    'Very High (>20%)': '#e31a1c',
+}
+CATEGORY_COLORS = {
+    'Coffee': '#6f4e37',
+    'Pastries': '#f5c16c',
+    'Tea': '#8cbf26',
+    'Sandwiches': '#d1bfa7'
+}
+
+
+# --- Section Computation ---
+def compute_discounts(aggregates):
+    discount_totals = aggregates['discount_bin']
 
     # --- 0. Discounted vs Non-Discounted: Total Quantity Sold ---
-    st.subheader("Total Quantity Sold: Discounted vs Non-Discounted")
-    discount_comparison = df.groupby("Discount Applied")["Quantity Sold"].sum().reset_index()
+    discount_comparison = rollup(discount_totals, "Discount Applied")[["Discount Applied", "Quantity Sold"]]
     discount_comparison["Discount Label"] = discount_comparison["Discount Applied"].map({
-        "Yes": "Discounted",
-        "No": "Non-Discounted"
+        True: "Discounted",
+        False: "Non-Discounted"
     })
+
+    # --- 1. Discount Percentage Histogram (precomputed on fixed edges) ---
+    histogram = histogram_counts(aggregates['discount_histogram'])
+    last_bin = histogram.index[histogram['Count'] > 0].max() if histogram['Count'].any() else 0
+    histogram = histogram.loc[:last_bin]
+
+    # --- 2. Quantity Sold per Discount Bin ---
+    # Undiscounted rows carry no Discount Bin, so they drop out of these rollups
+    avg_quantity_per_bin = rollup(discount_totals, 'Discount Bin')[['Discount Bin', 'Quantity Sold']]
+
+    # --- 3. Quantity Sold per Discount Bin by Item Category ---
+    discount_grouped = (
+        rollup(discount_totals, ['Item Category', 'Discount Bin'])[['Item Category', 'Discount Bin', 'Quantity Sold']]
+        .rename(columns={'Quantity Sold': 'Total Quantity'})
+    )
+    return {
+        'discount_comparison': discount_comparison,
+        'histogram': histogram,
+        'quantity_per_bin': avg_quantity_per_bin,
+        'quantity_per_bin_category': discount_grouped,
+    }
+
+
+def compute_discount_resampling(aggregates, reference=DISCOUNT_LABELS[2], n_resamples=N_RESAMPLES, seed=SEED, max_workers=None):
+    # Quantity per transaction in each bin against the reference ("sweet spot")
+    # bin. Days are the resampling unit, since transactions within a day are
+    # not independent; each day contributes its quantity and transaction totals
+    daily_bins = rollup(aggregates['cube'], ['Discount Bin', 'Date'])
+    groups = {
+        label: (days['Quantity Sold'].to_numpy(), days['Transactions'].to_numpy())
+        for label, days in daily_bins.groupby('Discount Bin', observed=True)
+        if len(days) >= 2
+    }
+    if reference not in groups or len(groups) < 2:
+        return None
+
+    labels = list(groups)
+    samples = bootstrap([groups[label] for label in labels], n_resamples, seed, max_workers)
+    reference_samples = samples[labels.index(reference)]
+    rows = []
+    for i, label in enumerate(labels):
+        quantity, transactions = groups[label]
+        row = {'Discount Bin': label, 'Quantity per Transaction': quantity.sum() / transactions.sum(), 'Days': len(quantity)}
+        if label != reference:
+            difference, p_value = permutation_test(groups[reference], groups[label], n_resamples, seed, max_workers)
+            low, high = confidence_interval(reference_samples - samples[i])
+            row.update({'Difference vs Reference': difference, 'CI Low': low, 'CI High': high, 'Permutation P-value': p_value})
+        rows.append(row)
+    return {'comparison': pd.DataFrame(rows), 'reference': reference, 'n_resamples': n_resamples}
+
+
+def compute_discounts_streaming(chunks):
+    # Same results as compute_discounts, from one pass over typed row chunks
+    # (iter_sales_csv or ingest.iter_store_rows). The state kept between chunks
+    # is the discount rollup (categories x flag x bin) and the fixed-edge
+    # histogram, so memory does not grow with the data
+    keys, dropna = ROLLUPS['discount_bin']
+    # Seeded empty, so a stream with no rows (a range between ingested months) has typed results
+    empty = empty_aggregates()
+    discount_totals, histogram = empty['discount_bin'], histogram_counts(empty['discount_histogram'])
+    for chunk in chunks:
+        pct = discount_pct(chunk)
+        chunk_totals = build_rollups(build_sales_cube(chunk, pct))['discount_bin']
+        discount_totals = merge_rollups(discount_totals, chunk_totals, keys, dropna=dropna)
+        histogram['Count'] += histogram_counts(build_discount_histogram(chunk, pct))['Count'].to_numpy()
+    return compute_discounts({'discount_bin': discount_totals, 'discount_histogram': histogram})
+
+
+def build_discount_figures(results):
+    discount_comparison = results['discount_comparison']
     fig0 = px.bar(
         discount_comparison,
         x="Discount Label",
@@ -29,60 +124,30 @@ def show_discount_analysis(df):
         margin=dict(t=60, b=60),
         yaxis=dict(tickformat=",", range=[0, discount_comparison["Quantity Sold"].max() * 1.15])
     )
-    st.plotly_chart(fig0, use_container_width=True)
-
-    # --- 1. Calculate Discount Percentage ---
-    df = df.copy()
-    df['Discount %'] = df['Discount Amount'] / (df['Sale Amount'] + df['Discount Amount'])
 
-    # --- 2. Distribution of Discount Percentages (Excl. 0%) ---
-    st.subheader("Distribution of Discount Percentages (Excl. 0%)")
-    fig1 = px.histogram(
-        df[df['Discount %'] > 0], 
-        x='Discount %', 
-        nbins=30,
+    histogram = results['histogram']
+    fig1 = px.bar(
+        histogram,
+        x=(histogram['Bin Start'] + histogram['Bin End']) / 2,
+        y='Count',
         title="Distribution of Discount Percentages (Excl. 0%)"
     )
+    fig1.update_traces(width=histogram['Bin End'] - histogram['Bin Start'])
     fig1.update_layout(
         xaxis_title="Discount %",
         yaxis_title="Frequency",
         bargap=0.1,
         margin=dict(t=60, b=60, l=60, r=60)
     )
-    st.plotly_chart(fig1, use_container_width=True)
-
-    # --- 3. Quantity Sold per Discount Bin ---
-    bins = [0, 0.025, 0.05, 0.10, 0.20, 0.50]
-    labels = ['Very Low (0–2.5%)', 'Low (2.5–5%)', 'Moderate (5–10%)', 'High (10–20%)', 'Very High (>20%)']
-    df['Discount Bin'] = pd.cut(
-        df['Discount %'],
-        bins=bins,
-        labels=labels,
-        include_lowest=False
-    )
-
-    avg_quantity_per_bin = (
-        df[df['Discount %'] > 0]
-        .groupby('Discount Bin', observed=True)['Quantity Sold']
-        .sum()
-        .reset_index()
-    )
-
-    color_map = {
-        'Very Low (0–2.5%)': '#a6cee3',
-        'Low (2.5–5%)': '#1f78b4',
-        'Moderate (5–10%)': '#33a02c',
-        'High (10–20%)': '#fb9a99',
-        'Very High (>20%)': '#e31a1c',
-    }
 
+    avg_quantity_per_bin = results['quantity_per_bin']
     fig2 = px.bar(
         avg_quantity_per_bin,
         x='Discount Bin',
         y='Quantity Sold',
         title='🧮 Quantity Sold per Discount Bin',
         color='Discount Bin',
-        color_discrete_map=color_map,
+        color_discrete_map=BIN_COLORS,
         text='Quantity Sold'
     )
     fig2.update_traces(texttemplate='%{text:.0f}', textposition='outside')
@@ -95,30 +160,15 @@ def show_discount_analysis(df):
     )
     max_val = avg_quantity_per_bin['Quantity Sold'].max()
     fig2.update_yaxes(range=[0, max_val * 1.15])
-    st.plotly_chart(fig2, use_container_width=True)
-
-    # --- 4. Quantity Sold per Discount Bin by Item Category ---
-    discount_grouped = (
-        df[df['Discount %'] > 0]
-        .groupby(['Item Category', 'Discount Bin'], observed=True)['Quantity Sold']
-        .sum()
-        .reset_index(name='Total Quantity')
-    )
-
-    custom_colors = {
-        'Coffee': '#6f4e37',
-        'Pastries': '#f5c16c',
-        'Tea': '#8cbf26',
-        'Sandwiches': '#d1bfa7'
-    }
 
+    discount_grouped = results['quantity_per_bin_category']
     fig3 = px.bar(
         discount_grouped,
         x='Discount Bin',
         y='Total Quantity',
         color='Item Category',
         title='Quantity Sold per Discount Bin by Item Category',
-        color_discrete_map=custom_colors,
+        color_discrete_map=CATEGORY_COLORS,
         barmode='group',
         text='Total Quantity'
     )
@@ -135,7 +185,125 @@ def show_discount_analysis(df):
         margin=dict(t=60, b=100, l=60, r=40)
     )
     fig3.update_traces(textposition='outside')
-    st.plotly_chart(fig3, use_container_width=True)
+    return {
+        'discount_comparison': fig0,
+        'discount_distribution': fig1,
+        'quantity_per_bin': fig2,
+        'quantity_per_bin_category': fig3,
+    }
+
+
+def build_response_figure(response, level, series):
+    # Fitted uplift curves inside each series' observed discount range, with
+    # the recommended discount marked
+    curves = response['curves']
+    curves = curves[(curves['Level'] == level) & curves['Series'].isin(series) & curves['Observed']]
+    fig = px.line(
+        curves,
+        x='Discount %',
+        y='Uplift %',
+        color='Series',
+        title='Fitted Quantity Uplift per Transaction vs Discount',
+        labels={'Uplift %': 'Quantity Uplift vs No Discount (%)', 'Series': level},
+    )
+    summary = response['summary']
+    picked = summary[(summary['Level'] == level) & summary['Series'].isin(series)]
+    fig.add_scatter(
+        x=picked['Recommended Discount %'],
+        y=picked['Uplift at Recommended (%)'],
+        mode='markers',
+        marker=dict(size=11, symbol='diamond', color='black'),
+        name='Recommended',
+        text=picked['Series'],
+    )
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(title_x=0.5, height=500)
+    return fig
+
+
+# --- Rendering ---
+@st.cache_data(show_spinner="Streaming discount data...", max_entries=2)
+def _cached_streaming_results(path, key):
+    mark_cache_miss()
+    return compute_discounts_streaming(iter_sales_csv(path))
+
+
+# Only the selected stores' parts are read, and only the row groups in the date range
+@st.cache_data(show_spinner="Streaming discount data...", max_entries=4)
+def _cached_store_streaming_results(store_dir, key, stores, start, end):
+    mark_cache_miss()
+    return compute_discounts_streaming(iter_store_rows(store_dir, list(stores), start, end))
+
+
+@st.cache_data(show_spinner="Resampling...", max_entries=8)
+def _cached_discount_resampling(cube):
+    return compute_discount_resampling({'cube': cube})
+
+
+# Keyed on the (filtered) cube, so it refits only when the data version or filters change
+@st.cache_data(show_spinner="Fitting discount response...", max_entries=8)
+def _cached_discount_response(cube):
+    mark_cache_miss()
+    return compute_discount_response({'cube': cube})
+
+
+def show_discount_analysis(aggregates=None, streaming_path=None, streaming_store=None, stores=(), start=None, end=None):
+    st.header("Discount Analysis")
+    timer = SectionTimer("Discount Analysis")
+    if streaming_store is not None:
+        key = source_key(manifest_path(streaming_store))
+        results = _cached_store_streaming_results(streaming_store, key, tuple(stores), start, end)
+        timer.mark('aggregate', rows=len(results['quantity_per_bin_category']), cached=True)
+    elif streaming_path is not None:
+        results = _cached_streaming_results(streaming_path, source_key(streaming_path))
+        timer.mark('aggregate', rows=len(results['quantity_per_bin_category']), cached=True)
+    else:
+        results = compute_discounts(aggregates)
+        timer.mark('aggregate', rows=len(aggregates['discount_bin']))
+    if results['discount_comparison'].empty:
+        # Only a streamed selection gets here empty; the filtered cube is checked before routing
+        st.warning("No sales match the selected filters.")
+        return
+    figures = build_discount_figures(results)
+
+    st.subheader("Total Quantity Sold: Discounted vs Non-Discounted")
+    st.plotly_chart(figures['discount_comparison'], use_container_width=True)
+
+    st.subheader("Distribution of Discount Percentages (Excl. 0%)")
+    st.plotly_chart(figures['discount_distribution'], use_container_width=True)
+
+    st.plotly_chart(figures['quantity_per_bin'], use_container_width=True)
+    st.plotly_chart(figures['quantity_per_bin_category'], use_container_width=True)
+
+    st.subheader("Is the 5–10% Bin Really Different?")
+    if aggregates is None:
+        st.caption("Resampling tests need the daily cube and are not available in streaming mode.")
+    elif st.checkbox(f"Run permutation and bootstrap tests ({N_RESAMPLES:,} resamples)", key="discount_resampling"):
+        resampled = _cached_discount_resampling(aggregates['cube'])
+        if resampled is None:
+            st.info("Not enough discounted days in the current selection.")
+        else:
+            st.dataframe(resampled['comparison'], hide_index=True)
+            st.caption(f"Quantity per transaction by bin, compared with {resampled['reference']} over daily totals, with 95% bootstrap intervals.")
+        timer.mark('resample')
+
+    st.subheader("Discount Response by Product")
+    if aggregates is None:
+        st.caption("The response model needs the daily cube and is not available in streaming mode.")
+    else:
+        response = _cached_discount_response(aggregates['cube'])
+        timer.mark('response', rows=len(aggregates['cube']), cached=True)
+        if response is None:
+            st.info("No transactions in the current selection.")
+        else:
+            level = st.radio("Fit per", ['Product Description', 'Item Category'], horizontal=True, key="response_level")
+            summary = response['summary'][response['summary']['Level'] == level].drop(columns='Level')
+            busiest = summary.sort_values('Transactions', ascending=False)['Series'].tolist()
+            series = st.multiselect("Show curves for", busiest, busiest[:5], key=f"response_series_{level}")
+            st.plotly_chart(build_response_figure(response, level, series), use_container_width=True)
+            st.dataframe(summary.rename(columns={'Series': level}), hide_index=True)
+            st.caption("Quantity per transaction regressed on discount share and its square, controlling for day of week and month, "
+                       "one weighted fit per series. The recommended discount maximises net revenue per transaction within the range each series has seen.")
     st.markdown("""
     ### Conclusion & Recommendations
 
@@ -156,3 +324,4 @@ def show_discount_analysis(df):
     - **Monitor and Adjust:**  
     Keep tracking what works, but for now, there’s zero evidence to support routine deep discounting or flash sales.
     """)
+    timer.mark('render', rows=len(results['quantity_per_bin_category']))
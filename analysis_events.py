@@ -1,76 +1,188 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from scipy.stats import ttest_ind, ttest_1samp
-
-def show_events_analysis(df, events_path):
-    st.header("Event Effects on Sales")
-
-    # Load events data
-    events = pd.read_csv(events_path)
-    events['Date'] = pd.to_datetime(events['Date'])
+from scipy.stats import t as t_dist, ttest_ind
+from event_calendar import event_flags, load_event_calendar
+from instrumentation import SectionTimer
+from resampling import N_RESAMPLES, SEED, bootstrap, confidence_interval, permutation_test
+
+
+# --- Batched Significance Engine ---
+def event_significance(event_values, baseline):
+    # Same statistic as ttest_1samp(baseline, value) for every value at once:
+    # the baseline mean, std and n are computed a single time
+    baseline = np.asarray(baseline, dtype=float)
+    n = baseline.size
+    standard_error = baseline.std(ddof=1) / np.sqrt(n)
+    t_stats = (baseline.mean() - np.asarray(event_values, dtype=float)) / standard_error
+    p_values = 2 * t_dist.sf(np.abs(t_stats), n - 1)
+    return t_stats, p_values
+
+
+def event_window_means(daily_sales, starts, ends, window=0):
+    # Mean daily sales over [start - window, end + window] for every event and
+    # the number of days with sales in it, read off cumulative sums of the
+    # sorted daily totals (days without sales have no row and are skipped)
+    calendar = daily_sales.set_index('Date')['Sale Amount'].sort_index()
+    sums = np.concatenate([[0.0], np.cumsum(calendar.to_numpy(dtype=float))])
+    lower = calendar.index.searchsorted(pd.DatetimeIndex(starts) - pd.Timedelta(days=window), side='left')
+    upper = calendar.index.searchsorted(pd.DatetimeIndex(ends) + pd.Timedelta(days=window), side='right')
+    days = upper - lower
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums[upper] - sums[lower]) / days
+    return means, days
+
+
+# --- Section Computation ---
+def compute_events(aggregates, events_path, window=0, store=None):
+    # Event calendar, indexed once per version of the events file
+    calendar = load_event_calendar(events_path)
 
     # Daily sales aggregation
-    daily_sales = df.groupby('Date')['Sale Amount'].sum().reset_index()
-    daily_sales['Date'] = pd.to_datetime(daily_sales['Date'])
+    daily_totals = aggregates['daily'][['Date', 'Sale Amount']]
 
-    # Merge with events (now both Date columns are datetime)
-    daily_sales = daily_sales.merge(events, on='Date', how='left')
-
-    # Create binary flag
-    daily_sales['Is Event'] = daily_sales['Event Description'].notna()
+    # Flag days inside any event (multi-day and overlapping events included)
+    daily_sales = daily_totals.assign(**{'Is Event': event_flags(calendar, daily_totals['Date'], store)})
+    # A date selection can leave only event days or only non-event days
+    if daily_sales['Is Event'].all() or not daily_sales['Is Event'].any():
+        return None
 
     # Summary stats
     event_sales_summary = daily_sales.groupby('Is Event')['Sale Amount'].agg(['count', 'mean', 'std'])
     event_sales_summary.index = ['Non-Event Day', 'Event Day']
-    st.subheader("Summary Statistics: Event vs Non-Event Days")
-    st.dataframe(event_sales_summary)
 
     # T-test between event and non-event days
     event_sales = daily_sales[daily_sales['Is Event']]['Sale Amount']
     non_event_sales = daily_sales[~daily_sales['Is Event']]['Sale Amount']
     t_stat, p_value = ttest_ind(event_sales, non_event_sales, equal_var=False)
-    st.write(f"**T-statistic:** {t_stat:.2f}, **P-value:** {p_value:.4f}")
-
-    # One-sample t-test for each event vs non-event days
-    individual_events = daily_sales[daily_sales['Is Event']][['Date', 'Event Description', 'Sale Amount']]
-    results = []
-    for _, row in individual_events.iterrows():
-        event_name = row['Event Description']
-        event_date = row['Date']
-        event_sale = row['Sale Amount']
-        t_stat_evt, p_val_evt = ttest_1samp(non_event_sales, event_sale)
-        results.append({
-            'Date': event_date,
-            'Event': event_name,
-            'Sale Amount': event_sale,
-            'T-stat': t_stat_evt,
-            'P-value': round(p_val_evt,9)
-        })
-
-    event_outlier_results = pd.DataFrame(results).sort_values(by='P-value')
-    # Add label for plot
-    event_outlier_results['Label'] = event_outlier_results['Event'] + " (" + event_outlier_results['Date'].dt.strftime('%Y-%m-%d') + ")"
-
-    st.subheader("Statistical Test: Individual Event Days vs Non-Event Day Sales")
-    st.dataframe(event_outlier_results[['Date', 'Event', 'Sale Amount', 'T-stat', 'P-value']])
 
+    # One row per event in the analysed period: its mean daily sales, kept (as
+    # NaN, 0 days) when none of its days had sales
+    events = calendar['events']
+    in_period = (events['End'] >= daily_totals['Date'].min()) & (events['Start'] <= daily_totals['Date'].max())
+    if store is not None:
+        in_period &= events['Store'].isna() | (events['Store'] == store)
+    events = events[in_period]
+    event_means, event_days = event_window_means(daily_totals, events['Start'], events['End'])
+    event_outlier_results = pd.DataFrame({
+        'Date': events['Start'].to_numpy(),
+        'End': events['End'].to_numpy(),
+        'Event': events['Event'].to_numpy(),
+        'Days': event_days,
+        'Sale Amount': event_means,
+    })
+
+    # One-sample t-test for each event vs non-event days, all events in one pass
+    if window > 0:
+        event_outlier_results['Window Avg Sales'] = event_window_means(daily_totals, events['Start'], events['End'], window)[0]
+        tested_values = event_outlier_results['Window Avg Sales']
+    else:
+        tested_values = event_outlier_results['Sale Amount']
+    t_stats, p_values = event_significance(tested_values, non_event_sales)
+    event_outlier_results['Uplift %'] = (tested_values / non_event_sales.mean() - 1) * 100
+    event_outlier_results['T-stat'] = t_stats
+    event_outlier_results['P-value'] = np.round(p_values, 9)
+    event_outlier_results = event_outlier_results.sort_values(by='P-value')
+    # Add label for plot
+    span = event_outlier_results['Date'].dt.strftime('%Y-%m-%d')
+    multi_day = event_outlier_results['End'] > event_outlier_results['Date']
+    span = span.where(~multi_day, span + " to " + event_outlier_results['End'].dt.strftime('%Y-%m-%d'))
+    event_outlier_results['Label'] = event_outlier_results['Event'] + " (" + span + ")"
+
+    result_columns = ['Date', 'End', 'Event', 'Days', 'Sale Amount'] + (['Window Avg Sales'] if window > 0 else []) + ['Uplift %', 'T-stat', 'P-value']
+    return {
+        'summary': event_sales_summary,
+        't_stat': float(t_stat),
+        'p_value': float(p_value),
+        'event_results': event_outlier_results,
+        'result_columns': result_columns,
+        'average_non_event_sales': float(non_event_sales.mean()),
+        'daily_sales': daily_sales[['Date', 'Sale Amount', 'Is Event']],
+    }
+
+
+def compute_event_resampling(results, n_resamples=N_RESAMPLES, seed=SEED, max_workers=None):
+    # Distribution-free checks of the t-tests above: a permutation test of event
+    # vs non-event days and bootstrap intervals for every uplift
+    daily_sales = results['daily_sales']
+    event_sales = daily_sales.loc[daily_sales['Is Event'], 'Sale Amount'].to_numpy()
+    non_event_sales = daily_sales.loc[~daily_sales['Is Event'], 'Sale Amount'].to_numpy()
+    if len(event_sales) < 1 or len(non_event_sales) < 2:
+        return None
+
+    difference, p_value = permutation_test(event_sales, non_event_sales, n_resamples, seed, max_workers)
+    samples = bootstrap([event_sales, non_event_sales], n_resamples, seed, max_workers)
+    low, high = confidence_interval((samples[0] / samples[1] - 1) * 100)
+    overall = pd.DataFrame({
+        'Mean Difference': [difference],
+        'Uplift %': [(event_sales.mean() / non_event_sales.mean() - 1) * 100],
+        'CI Low %': [low],
+        'CI High %': [high],
+        'Permutation P-value': [p_value],
+    })
+
+    # A single event is a fixed value, so its interval comes from the baseline mean
+    event_results = results['event_results']
+    tested = event_results['Window Avg Sales' if 'Window Avg Sales' in event_results else 'Sale Amount'].to_numpy()
+    lows, highs = confidence_interval((tested[:, None] / samples[1][None, :] - 1) * 100)
+    per_event = event_results[['Date', 'Event', 'Uplift %']].assign(**{'CI Low %': lows, 'CI High %': highs})
+    return {'overall': overall, 'per_event': per_event, 'n_resamples': n_resamples}
+
+
+def build_events_figures(results):
     # Plot with Plotly (interactive)
-    average_non_event_sales = non_event_sales.mean()
     fig = px.bar(
-        event_outlier_results.sort_values(by='Sale Amount', ascending=False),
+        results['event_results'].sort_values(by='Sale Amount', ascending=False),
         x='Label',
         y='Sale Amount',
         title="Sales on Event Days vs. Average Non-Event Sales",
-        labels={'Sale Amount': 'Total Sales (SAR)', 'Label': 'Event'},
+        labels={'Sale Amount': 'Avg Daily Sales (SAR)', 'Label': 'Event'},
         color='Sale Amount'
     )
     # Add average non-event sales line
-    fig.add_hline(y=average_non_event_sales, line_dash="dash", line_color="red",
+    fig.add_hline(y=results['average_non_event_sales'], line_dash="dash", line_color="red",
                   annotation_text="Avg Non-Event Sales", annotation_position="bottom left")
     fig.update_layout(xaxis_tickangle=-45, height=500)
+    return {'event_sales': fig}
+
+
+# --- Rendering ---
+@st.cache_data(show_spinner="Resampling...", max_entries=8)
+def _cached_event_resampling(results):
+    return compute_event_resampling(results)
+
+
+def show_events_analysis(aggregates, events_path, store=None):
+    st.header("Event Effects on Sales")
+    window = st.slider("Event window (days before/after each event)", 0, 7, 0)
+    timer = SectionTimer("Event Impact")
+    results = compute_events(aggregates, events_path, window, store)
+    timer.mark('aggregate', rows=len(aggregates['daily']))
+    if results is None:
+        st.info("The current selection needs both event and non-event days to compare.")
+        return
+    figures = build_events_figures(results)
+
+    st.subheader("Summary Statistics: Event vs Non-Event Days")
+    st.dataframe(results['summary'])
+    st.write(f"**T-statistic:** {results['t_stat']:.2f}, **P-value:** {results['p_value']:.4f}")
+
+    st.subheader("Statistical Test: Individual Event Days vs Non-Event Day Sales")
+    st.dataframe(results['event_results'][results['result_columns']])
+
+    st.subheader("Resampling Checks")
+    if st.checkbox(f"Run permutation and bootstrap tests ({N_RESAMPLES:,} resamples)", key="event_resampling"):
+        resampled = _cached_event_resampling(results)
+        if resampled is None:
+            st.info("Not enough event and non-event days in the current selection.")
+        else:
+            st.dataframe(resampled['overall'], hide_index=True)
+            st.dataframe(resampled['per_event'], hide_index=True)
+            st.caption("95% bootstrap intervals for the uplift over the average non-event day; the permutation test makes no normality assumption.")
+        timer.mark('resample')
 
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures['event_sales'], use_container_width=True)
 
     st.caption("Only the Long Weekend boosted sales. All other events actually saw a drop in sales, and that drop was statistically significant.")
     st.markdown("""
@@ -90,3 +202,4 @@ def show_events_analysis(df, events_path):
     - **Monitor Event Performance:**  
       Keep tracking sales during all events, but don’t let event hype drive operational decisions—let the numbers speak.
     """)
+    timer.mark('render', rows=len(results['event_results']))
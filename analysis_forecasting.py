@@ -0,0 +1,231 @@
+import argparse
+import ast
+import itertools
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from aggregates import LEVELS, rollup
+
+ARTIFACT_DIR = "forecast_artifacts"
+# The data version the artifacts were fit on (ingest.source_version); the
+# dashboard hides them once its source has moved on
+VERSION_FILE = "version.json"
+HORIZON = 7
+N_ORIGINS = 4
+# Every lag is at least the horizon, so a 7-day forecast never needs its own predictions
+LAGS = [7, 14, 21, 28]
+
+MODEL_GRIDS = {
+    'Linear Regression': [{}],
+    'Random Forest': [{'n_estimators': 200, 'max_depth': depth, 'min_samples_leaf': leaf}
+                      for depth, leaf in itertools.product([4, 8, None], [1, 5])],
+    'XGBoost': [{'n_estimators': 300, 'max_depth': depth, 'learning_rate': rate}
+                for depth, rate in itertools.product([3, 6], [0.05, 0.1])],
+    'Prophet': [{'changepoint_prior_scale': scale} for scale in [0.05, 0.5]],
+}
+
+
+# --- Series Preparation ---
+def build_series(aggregates):
+    # One gap-free daily sales series per category and per product, plus the total
+    series = {('Total', 'All Sales'): aggregates['daily'].set_index('Date')['Sale Amount']}
+    for level in LEVELS:
+        daily = rollup(aggregates['cube'], ['Date', level]).pivot(index='Date', columns=level, values='Sale Amount')
+        for name in daily.columns:
+            series[(level, str(name))] = daily[name]
+    return {key: s.sort_index().asfreq('D', fill_value=0).fillna(0) for key, s in series.items()}
+
+
+def make_features(dates, values, event_dates):
+    features = pd.DataFrame({
+        'dayofweek': dates.dayofweek,
+        'month': dates.month,
+        'dayofyear': dates.dayofyear,
+        'is_event': dates.isin(event_dates).astype(int),
+    }, index=dates)
+    history = pd.Series(values, index=dates)
+    for lag in LAGS:
+        features[f'lag_{lag}'] = history.shift(lag)
+    features[f'rolling_mean_{HORIZON}'] = history.shift(HORIZON).rolling(HORIZON).mean()
+    return features
+
+
+# --- Models ---
+def _make_regressor(model, params):
+    if model == 'Linear Regression':
+        from sklearn.linear_model import LinearRegression
+        return LinearRegression(**params)
+    if model == 'Random Forest':
+        from sklearn.ensemble import RandomForestRegressor
+        # One core per fit: the process pool already spreads fits across cores
+        return RandomForestRegressor(random_state=0, n_jobs=1, **params)
+    if model == 'XGBoost':
+        from xgboost import XGBRegressor
+        return XGBRegressor(random_state=0, n_jobs=1, **params)
+    raise ValueError(f"Unknown model: {model}")
+
+
+def fit_model(model, params, dates, values, event_dates):
+    if model == 'Prophet':
+        from prophet import Prophet
+        holidays = pd.DataFrame({'holiday': 'event', 'ds': pd.DatetimeIndex(event_dates)})
+        fitted = Prophet(holidays=holidays, **params)
+        fitted.fit(pd.DataFrame({'ds': dates, 'y': values}))
+        return fitted
+    features = make_features(dates, values, event_dates)
+    usable = features.notna().all(axis=1).to_numpy()
+    regressor = _make_regressor(model, params)
+    regressor.fit(features[usable], values[usable])
+    return regressor
+
+
+def predict_model(fitted, model, history_dates, history_values, future_dates, event_dates):
+    if model == 'Prophet':
+        return fitted.predict(pd.DataFrame({'ds': future_dates}))['yhat'].to_numpy()
+    # Lags for the future rows come from the history, which is why LAGS >= HORIZON
+    dates = history_dates.append(future_dates)
+    values = np.concatenate([history_values, np.full(len(future_dates), np.nan)])
+    features = make_features(dates, values, event_dates)
+    return fitted.predict(features.iloc[-len(future_dates):])
+
+
+# --- Rolling-Origin Backtest (runs in worker processes) ---
+def backtest_task(task):
+    level, name, model, params, dates, values, event_dates = task
+    rows = []
+    try:
+        for origin in range(N_ORIGINS, 0, -1):
+            cut = len(values) - origin * HORIZON
+            fitted = fit_model(model, params, dates[:cut], values[:cut], event_dates)
+            future = dates[cut:cut + HORIZON]
+            predicted = predict_model(fitted, model, dates[:cut], values[:cut], future, event_dates)
+            rows.append(pd.DataFrame({
+                'Level': level, 'Series': name, 'Model': model, 'Params': repr(params),
+                'Origin': dates[cut - 1], 'Date': future,
+                'Actual': values[cut:cut + HORIZON], 'Forecast': predicted,
+            }))
+    except ImportError:
+        # Optional model libraries (xgboost, prophet) may not be installed everywhere
+        return None
+    return pd.concat(rows, ignore_index=True)
+
+
+def final_fit_task(task):
+    level, name, model, params, dates, values, event_dates = task
+    fitted = fit_model(model, params, dates, values, event_dates)
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=HORIZON, freq='D')
+    predicted = predict_model(fitted, model, dates, values, future, event_dates)
+    forecast = pd.DataFrame({'Level': level, 'Series': name, 'Model': model, 'Date': future, 'Forecast': predicted})
+    return fitted, forecast
+
+
+def score_backtests(backtests):
+    errors = backtests['Forecast'] - backtests['Actual']
+    scored = backtests.assign(abs_error=errors.abs(), sq_error=errors ** 2)
+    metrics = scored.groupby(['Level', 'Series', 'Model', 'Params'], sort=False).agg(
+        MAE=('abs_error', 'mean'),
+        RMSE=('sq_error', lambda e: float(np.sqrt(e.mean()))),
+    )
+    return metrics.reset_index()
+
+
+# --- Pipeline ---
+def run_pipeline(aggregates, event_dates, artifact_dir=ARTIFACT_DIR, max_workers=None, version=None):
+    series = build_series(aggregates)
+    min_length = (N_ORIGINS + 1) * HORIZON + max(LAGS)
+    series = {key: s for key, s in series.items() if len(s) >= min_length}
+    event_dates = pd.DatetimeIndex(event_dates)
+
+    def tasks_for(grid):
+        for (level, name), s in series.items():
+            for model, params in grid(level, name):
+                yield (level, name, model, params, s.index, s.to_numpy(dtype=float), event_dates)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Hyperparameter search: every series x model x parameter set backtested in parallel
+        def all_candidates(level, name):
+            return [(model, params) for model, grid in MODEL_GRIDS.items() for params in grid]
+
+        results = [r for r in pool.map(backtest_task, tasks_for(all_candidates), chunksize=4) if r is not None]
+        backtests = pd.concat(results, ignore_index=True)
+        metrics = score_backtests(backtests)
+
+        # Best parameter set per series and model, by backtest MAE
+        best = metrics.loc[metrics.groupby(['Level', 'Series', 'Model'], sort=False)['MAE'].idxmin()]
+        best_params = {(r.Level, r.Series, r.Model): ast.literal_eval(r.Params) for r in best.itertuples()}
+        backtests = backtests.merge(best[['Level', 'Series', 'Model', 'Params']], on=['Level', 'Series', 'Model', 'Params'])
+
+        def best_candidates(level, name):
+            return [(model, best_params[(level, name, model)])
+                    for model in MODEL_GRIDS if (level, name, model) in best_params]
+
+        final_tasks = list(tasks_for(best_candidates))
+        finals = list(pool.map(final_fit_task, final_tasks, chunksize=4))
+
+    # --- Persist Artifacts ---
+    os.makedirs(os.path.join(artifact_dir, "models"), exist_ok=True)
+    for task, (fitted, _) in zip(final_tasks, finals):
+        level, name, model = task[:3]
+        file_name = f"{level}__{name}__{model}.pkl".replace(' ', '_').replace('/', '-')
+        with open(os.path.join(artifact_dir, "models", file_name), 'wb') as f:
+            pickle.dump(fitted, f)
+
+    # Uncompressed Arrow files can be memory-mapped by the dashboard without a parse step
+    forecasts = pd.concat([forecast for _, forecast in finals], ignore_index=True)
+    tables = {
+        'metrics': metrics,
+        'best_metrics': best.reset_index(drop=True),
+        'backtests': backtests.drop(columns='Params'),
+        'forecasts': forecasts,
+    }
+    for name, table in tables.items():
+        feather.write_feather(table, os.path.join(artifact_dir, f"{name}.arrow"), compression='uncompressed')
+    with open(os.path.join(artifact_dir, VERSION_FILE), 'w') as f:
+        json.dump(version, f, indent=2)
+    return tables
+
+
+def load_artifacts(artifact_dir=ARTIFACT_DIR):
+    tables = {}
+    for name in ['metrics', 'best_metrics', 'backtests', 'forecasts']:
+        path = os.path.join(artifact_dir, f"{name}.arrow")
+        if not os.path.exists(path):
+            return None
+        tables[name] = feather.read_table(path, memory_map=True).to_pandas()
+    return tables
+
+
+def artifact_version(artifact_dir=ARTIFACT_DIR):
+    # None for artifacts written before they were stamped
+    path = os.path.join(artifact_dir, VERSION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    from event_calendar import event_days, load_event_calendar
+    from ingest import STORE_DIR, source_version
+    from report import load_report_aggregates
+
+    parser = argparse.ArgumentParser(description="Backtest, tune and fit the sales forecasting models offline.")
+    parser.add_argument("--data", default="CafeSales_clean.csv")
+    parser.add_argument("--store", default=STORE_DIR, help="used instead of --data once it is seeded, as in the dashboard")
+    parser.add_argument("--events", default="Data Anaylst Task -Events_2023_2024.csv")
+    parser.add_argument("--out", default=ARTIFACT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Multi-day events contribute every day they cover
+    event_dates = event_days(load_event_calendar(args.events))
+    # Same source as the dashboard and report, stamped so they can tell when the artifacts go stale
+    version = source_version(args.data, args.store)
+    tables = run_pipeline(load_report_aggregates(args.data, args.store), event_dates, args.out, args.workers, version)
+    print(tables['best_metrics'].sort_values(['Level', 'Series', 'MAE']).to_string(index=False))
@@ -1,16 +1,96 @@
-from turtle import st
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from analysis_forecasting import ARTIFACT_DIR, artifact_version, load_artifacts
+from event_calendar import load_event_calendar
+from fast_forecasting import compute_fast_forecasts
+from instrumentation import SectionTimer
 
-st.markdown("""
+
+# --- Section Computation ---
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_fast_forecasts(cube, events_path):
+    return compute_fast_forecasts({'cube': cube}, load_event_calendar(events_path))
+
+
+def combine_forecasts(live, artifacts, filtered=False):
+    # Live baselines next to the offline models, in the same long layout. The
+    # offline models were fit on the full history, so they are left out when
+    # the live fits only see a filtered cube
+    if artifacts is None or filtered:
+        return live
+    offline_metrics = artifacts['best_metrics'].drop(columns='Params')
+    return {
+        'metrics': pd.concat([live['metrics'].assign(Source='Live'), offline_metrics.assign(Source='Offline')], ignore_index=True),
+        'backtests': pd.concat([live['backtests'], artifacts['backtests']], ignore_index=True),
+        'forecasts': pd.concat([live['forecasts'], artifacts['forecasts']], ignore_index=True),
+    }
+
+
+# --- Rendering ---
+def show_model_development(aggregates, events_path, artifact_dir=ARTIFACT_DIR, filtered=False, version=None):
+    st.markdown("""
 ### **Model Development Summary**
 
 - Tried **Linear Regression, Random Forest, XGBoost, and Prophet** to forecast daily sales.
 - **Prophet with regressors** gave the best performance (lowest MAE and RMSE).
 - **Random Forest** and **XGBoost** had competitive results, but didn’t outperform Prophet.
 - **Main issue:** Streamlit app performance was slow when running model training and tuning live. This made real-time forecasting impractical.
-- **Solution:** Model evaluation and tuning were done offline in Jupyter, and results are summarized here instead of re-running each time.
+- **Solution:** Model evaluation and tuning run offline (`python analysis_forecasting.py`), and the saved results are shown here instead of re-running each time.
+- **Live baselines:** Seasonal-naive, Holt-Winters and ridge regression (calendar, event and discount features) are fitted here on every series at once, on the current filters.
 
 **Bottom line:**  
 Prophet is currently the best option for sales forecasting on this dataset, but heavy model training should be kept outside Streamlit for speed.
 
 ---
 """)
+
+    timer = SectionTimer("Model Development")
+    live = _cached_fast_forecasts(aggregates['cube'], events_path)
+    timer.mark('aggregate', rows=len(aggregates['cube']), cached=True)
+    if live is None:
+        st.info("Not enough days in the current selection to backtest the forecasters.")
+        return
+
+    # Precomputed backtests and forecasts, memory-mapped from the offline pipeline
+    artifacts = load_artifacts(artifact_dir)
+    timer.mark('load', rows=None if artifacts is None else len(artifacts['backtests']))
+    # Artifacts fit on another version of the data (an older CSV, or before the
+    # store was seeded or grew) would compare models fit on different sales
+    stale = artifacts is not None and version is not None and artifact_version(artifact_dir) != version
+    results = combine_forecasts(live, None if stale else artifacts, filtered)
+
+    metrics = results['metrics']
+    level = st.selectbox("Forecast level", metrics['Level'].unique())
+    series = st.selectbox("Series", metrics.loc[metrics['Level'] == level, 'Series'].unique())
+
+    st.subheader("Rolling-Origin Backtest Error by Model")
+    series_metrics = metrics[(metrics['Level'] == level) & (metrics['Series'] == series)]
+    st.dataframe(series_metrics.drop(columns=['Level', 'Series']).sort_values('MAE'), hide_index=True)
+    if artifacts is None:
+        st.caption("Run `python analysis_forecasting.py` to add the offline models (Prophet, Random Forest, XGBoost) for comparison.")
+    elif stale:
+        st.caption("The offline models were fit on a different version of the sales data, so they are hidden. "
+                   "Run `python analysis_forecasting.py` again to compare them here.")
+    elif filtered:
+        st.caption("The offline models were fit on the full, unfiltered history, so they are hidden while a filter is active.")
+
+    backtests = results['backtests']
+    series_backtests = backtests[(backtests['Level'] == level) & (backtests['Series'] == series)]
+    actuals = series_backtests.drop_duplicates('Date')[['Date', 'Actual']].rename(columns={'Actual': 'Sales'}).assign(Model='Actual')
+    predicted = series_backtests[['Date', 'Forecast', 'Model']].rename(columns={'Forecast': 'Sales'})
+    fig = px.line(
+        pd.concat([actuals, predicted], ignore_index=True),
+        x='Date',
+        y='Sales',
+        color='Model',
+        title=f"Backtest Forecasts vs Actual Sales: {series}",
+        labels={'Sales': 'Daily Sales (SAR)'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Next-Week Forecast")
+    forecasts = results['forecasts']
+    series_forecasts = forecasts[(forecasts['Level'] == level) & (forecasts['Series'] == series)]
+    st.dataframe(series_forecasts.pivot(index='Date', columns='Model', values='Forecast').round(2))
+    timer.mark('render', rows=len(series_backtests))
@@ -1,23 +1,103 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+import plotly.express as px
+from aggregates import rollup
+from instrumentation import SectionTimer
+
+TEMPERATURE_LAGS = range(0, 8)
+ROLLING_WINDOW_DAYS = 90
+MIN_PERIODS = 3
+# The bar chart keeps the most temperature-sensitive products once the catalog gets long
+MAX_CHART_PRODUCTS = 30
+
+
+# --- Correlation Engine ---
+# All functions take a Date x product sales matrix (NaN where a product had no
+# sales) and the daily temperature on a gap-free daily index, and only ever
+# correlate products against temperature, never products against each other.
+def _pairwise_mask(sales, temperature):
+    values = sales.to_numpy(dtype=float)
+    temps = np.broadcast_to(temperature.to_numpy(dtype=float)[:, None], values.shape)
+    mask = ~np.isnan(values) & ~np.isnan(temps)
+    return np.where(mask, values, 0.0), np.where(mask, temps, 0.0), mask
+
+
+def temperature_correlations(sales, temperature, min_periods=MIN_PERIODS):
+    # Pearson r per product over the days where both values exist, like
+    # DataFrame.corr() does pairwise, but as one vectorized pass
+    x, t, mask = _pairwise_mask(sales, temperature)
+    n = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.where(mask, x - x.sum(axis=0) / n, 0.0)
+        dt = np.where(mask, t - t.sum(axis=0) / n, 0.0)
+        r = (dx * dt).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dt * dt).sum(axis=0))
+    r[n < min_periods] = np.nan
+    return pd.DataFrame({'Correlation': r, 'Days': n}, index=sales.columns)
+
+
+def lagged_temperature_correlations(sales, temperature, lags=TEMPERATURE_LAGS, min_periods=MIN_PERIODS):
+    # Sales on day t against the temperature on day t - k, for each lag k
+    return pd.DataFrame({
+        f"Lag {lag}": temperature_correlations(sales, temperature.shift(lag), min_periods)['Correlation']
+        for lag in lags
+    })
 
-def show_temperature_analysis(df):
-    st.header("Temperature Effects on Sales")
 
-    # Make a copy and ensure Date column is datetime
-    df = df.copy()
-    df['Date'] = pd.to_datetime(df['Date'])
+def rolling_temperature_correlations(sales, temperature, window=ROLLING_WINDOW_DAYS, min_periods=MIN_PERIODS):
+    # Trailing-window r for every product and day from cumulative sums. Values
+    # are centred on their overall means first to keep the moment sums stable
+    x, t, mask = _pairwise_mask(sales, temperature)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(mask, x - np.nanmean(np.where(mask, x, np.nan), axis=0), 0.0)
+        t = np.where(mask, t - np.nanmean(np.where(mask, t, np.nan), axis=0), 0.0)
+
+    def windowed(values):
+        sums = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        lower = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+        return sums[1:] - sums[lower]
+
+    n = windowed(mask.astype(float))
+    sx, st_, sxx, stt, sxt = (windowed(v) for v in (x, t, x * x, t * t, x * t))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = sxt - sx * st_ / n
+        r = covariance / np.sqrt((sxx - sx * sx / n) * (stt - st_ * st_ / n))
+    r[n < min_periods] = np.nan
+    return pd.DataFrame(np.clip(r, -1, 1), index=sales.index, columns=sales.columns)
+
+
+# --- Section Computation ---
+def compute_temperature(aggregates):
+    cube = aggregates['cube']
 
     # --- 1. Total Daily Sales vs Temperature ---
-    daily_summary = df.groupby('Date').agg({
-        'Sale Amount': 'sum',
-        'Temperature (°F)': 'mean'
-    }).reset_index()
+    daily_summary = aggregates['daily'][['Date', 'Sale Amount', 'Temperature (°F)']]
 
     # Pearson correlation
     correlation = daily_summary['Sale Amount'].corr(daily_summary['Temperature (°F)'])
-    st.write(f"**Correlation between temperature and total sales:** {correlation:.3f}")
+
+    # --- 2. Product-wise correlation with temperature ---
+    product_temp_sales = rollup(cube, ['Date', 'Product Description'])
+
+    # Gap-free daily calendar, so a lag or window of k rows is k days
+    pivoted_sales = product_temp_sales.pivot(index='Date', columns='Product Description', values='Sale Amount').asfreq('D')
+    pivoted_sales.columns = pivoted_sales.columns.astype(str)
+    daily_temp = product_temp_sales.groupby('Date')['Temperature (°F)'].mean().reindex(pivoted_sales.index)
+
+    product_temp_correlation = temperature_correlations(pivoted_sales, daily_temp)['Correlation'].sort_values()
+    product_temp_correlation.name = 'Temperature (°F)'
+    return {
+        'daily_summary': daily_summary,
+        'correlation': float(correlation),
+        'product_correlation': product_temp_correlation,
+        'lagged_correlation': lagged_temperature_correlations(pivoted_sales, daily_temp),
+        'rolling_correlation': rolling_temperature_correlations(pivoted_sales, daily_temp),
+    }
+
+
+def build_temperature_figures(results):
+    daily_summary = results['daily_summary']
 
     # Scatter plot
     fig, ax = plt.subplots(figsize=(7, 4))
@@ -26,27 +106,68 @@ def show_temperature_analysis(df):
     ax.set_xlabel('Temperature (°F)')
     ax.set_ylabel('Total Sales (SAR)')
     ax.grid(True)
-    st.pyplot(fig)
-
-    # --- 2. Product-wise correlation with temperature ---
-    st.subheader("Product-wise correlation with temperature")
-    product_temp_sales = df.groupby(['Date', 'Product Description']).agg({
-        'Sale Amount': 'sum',
-        'Temperature (°F)': 'mean'
-    }).reset_index()
-
-    pivoted_sales = product_temp_sales.pivot(index='Date', columns='Product Description', values='Sale Amount')
-    daily_temp = product_temp_sales.groupby('Date')['Temperature (°F)'].mean()
-    pivoted_sales['Temperature (°F)'] = daily_temp
-
-    product_temp_correlation = pivoted_sales.corr()['Temperature (°F)'].drop('Temperature (°F)').sort_values()
-    st.dataframe(product_temp_correlation)
 
+    product_temp_correlation = results['product_correlation'].dropna()
+    # A range shorter than MIN_PERIODS days leaves no product correlations to chart
+    if product_temp_correlation.empty:
+        return {'temperature_vs_sales': fig}
+    strongest = product_temp_correlation.abs().nlargest(MAX_CHART_PRODUCTS).index
+    product_temp_correlation = product_temp_correlation[product_temp_correlation.index.isin(strongest)]
     fig2, ax2 = plt.subplots(figsize=(7, max(2, len(product_temp_correlation) * 0.3)))
     product_temp_correlation.plot(kind='barh', ax=ax2)
     ax2.set_title("Product Sales vs Temperature Correlation")
     ax2.set_xlabel("Correlation with Temperature")
-    st.pyplot(fig2)
+
+    lagged = results['lagged_correlation']
+    fig3 = px.imshow(
+        lagged.loc[lagged.index.isin(strongest)],
+        color_continuous_scale='RdBu_r',
+        zmin=-1,
+        zmax=1,
+        aspect='auto',
+        title="Correlation with Temperature k Days Earlier",
+        labels={'x': 'Temperature lag', 'y': 'Product', 'color': 'r'}
+    )
+
+    rolling = results['rolling_correlation'][strongest[:10]]
+    fig4 = px.line(
+        rolling.reset_index().melt(id_vars='Date', var_name='Product', value_name='Correlation'),
+        x='Date',
+        y='Correlation',
+        color='Product',
+        title=f"Rolling {ROLLING_WINDOW_DAYS}-Day Correlation with Temperature",
+    )
+    fig4.update_yaxes(range=[-1, 1])
+    return {
+        'temperature_vs_sales': fig,
+        'product_correlation': fig2,
+        'lagged_correlation': fig3,
+        'rolling_correlation': fig4,
+    }
+
+
+# --- Rendering ---
+def show_temperature_analysis(aggregates):
+    st.header("Temperature Effects on Sales")
+    timer = SectionTimer("Temperature Effect")
+    results = compute_temperature(aggregates)
+    timer.mark('aggregate', rows=len(aggregates['cube']))
+    figures = build_temperature_figures(results)
+
+    st.write(f"**Correlation between temperature and total sales:** {results['correlation']:.3f}")
+    st.pyplot(figures['temperature_vs_sales'])
+
+    st.subheader("Product-wise correlation with temperature")
+    if 'product_correlation' not in figures:
+        st.info(f"No product has {MIN_PERIODS} days of sales in the current selection; widen the date range "
+                "to see product, lagged and rolling correlations.")
+    else:
+        st.dataframe(results['product_correlation'])
+        st.pyplot(figures['product_correlation'])
+
+        st.subheader("Lagged and rolling correlation with temperature")
+        st.plotly_chart(figures['lagged_correlation'], use_container_width=True)
+        st.plotly_chart(figures['rolling_correlation'], use_container_width=True)
 
     # --- 3. Recap and Recommendations ---
     st.markdown("""
@@ -67,3 +188,4 @@ def show_temperature_analysis(df):
     - **Continue to Monitor:**  
       Continue tracking temperature to detect if patterns emerge in future years, but do not prioritize temperature-based interventions unless a stronger relationship is established.
     """)
+    timer.mark('render', rows=len(results['daily_summary']))
@@ -0,0 +1,117 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from aggregates import build_aggregates
+from generate_synthetic_data import SIZES, generate
+from sales_data import iter_sales_csv, read_sales_csv
+
+EVENTS_PATH = "Data Anaylst Task -Events_2023_2024.csv"
+DATA_DIR = "benchmark_data"
+
+
+# --- Sections Under Test ---
+def _section_runners():
+    # The pure compute functions behind each show_* section, without any rendering
+    from analysis_events import compute_events
+    from analysis_temp import compute_temperature
+    from analysis_category import compute_category
+    from analysis_discounts import compute_discounts
+    return {
+        'events': lambda aggregates: compute_events(aggregates, EVENTS_PATH),
+        'temperature': compute_temperature,
+        'category': compute_category,
+        'discount': compute_discounts,
+    }
+
+
+# --- Measurement ---
+def measure(func, *args, repeat=3, memory=True):
+    # Best-of-N wall time, then one separate traced run for the peak allocation
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    stats = {'seconds': min(timings)}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func(*args)
+        stats['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, stats
+
+
+def benchmark_file(path, repeat=3, memory=True):
+    stages = {}
+    df, stages['load'] = measure(read_sales_csv, path, repeat=1, memory=memory)
+    aggregates, stages['aggregate'] = measure(build_aggregates, df, repeat=repeat, memory=memory)
+    for name, runner in _section_runners().items():
+        _, stages[name] = measure(runner, aggregates, repeat=repeat, memory=memory)
+    # The chunked path runs straight off the CSV; its peak should not grow with the file
+    from analysis_discounts import compute_discounts_streaming
+    stream = lambda csv_path: compute_discounts_streaming(iter_sales_csv(csv_path))
+    _, stages['discount_streaming'] = measure(stream, path, repeat=1, memory=memory)
+    return {'rows': len(df), 'stages': stages}
+
+
+def ensure_dataset(size, data_dir=DATA_DIR):
+    path = os.path.join(data_dir, f"synthetic_{size}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        generate(SIZES.get(size) or int(size), path)
+    return path
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(run['size'], stage): stats for run in baseline['runs'] for stage, stats in run['stages'].items()}
+    print(f"\nCompared with {baseline.get('commit')} ({baseline_path}):")
+    for run in current['runs']:
+        for stage, stats in run['stages'].items():
+            before = previous.get((run['size'], stage))
+            if before:
+                change = (stats['seconds'] / before['seconds'] - 1) * 100 if before['seconds'] else 0.0
+                print(f"  {run['size']:>6} {stage:<12} {before['seconds']:9.3f}s -> {stats['seconds']:9.3f}s ({change:+.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and memory-profile the dashboard sections on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", default=['10k', '1m'], help=f"any of {', '.join(SIZES)} or a row count")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    report = {
+        'commit': current_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'runs': [],
+    }
+    for size in args.sizes:
+        run = benchmark_file(ensure_dataset(size), args.repeat, not args.no_memory)
+        report['runs'].append({'size': size, **run})
+        for stage, stats in run['stages'].items():
+            peak = f"{stats['peak_mb']:10.1f} MB" if 'peak_mb' in stats else ''
+            print(f"{size:>6} {stage:<12} {stats['seconds']:9.3f}s {peak}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# What the dashboard loads before the Home page renders, and what each section adds
+BASE_MODULES = ['streamlit', 'pandas', 'sales_data', 'aggregates', 'ingest', 'instrumentation', 'sales_filter', 'shared_store']
+SECTION_MODULES = ['analysis_events', 'analysis_temp', 'analysis_category', 'analysis_baskets', 'analysis_discounts',
+                   'analysis_model']
+HEAVY_DEPENDENCIES = ['scipy.stats', 'plotly.express', 'matplotlib.pyplot', 'pyarrow', 'pyarrow.feather', 'tkinter']
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Measurement ---
+def _import_times_us(statement, modules):
+    # -X importtime reports the cumulative import cost of every module in a fresh interpreter
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    times = dict.fromkeys(modules, 0)
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] in times:
+            times[parts[2]] = int(parts[1])
+    return times
+
+
+def measure_modules(modules, preload=(), repeat=5):
+    # Median milliseconds per module; each module only pays for what was not imported before it
+    statement = '; '.join(f'import {name}' for name in [*preload, *modules])
+    samples = [_import_times_us(statement, modules) for _ in range(repeat)]
+    return {module: statistics.median(s[module] for s in samples) / 1000 for module in modules}
+
+
+def heavy_dependencies_loaded(module):
+    statement = f'import sys, {module}; print(",".join(m for m in {HEAVY_DEPENDENCIES!r} if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', statement], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def run_benchmark(repeat=5):
+    startup = measure_modules(BASE_MODULES, repeat=repeat)
+    rows = [{'module': module, 'stage': 'startup', 'cold_ms': ms} for module, ms in startup.items()]
+    for module in SECTION_MODULES:
+        rows.append({
+            'module': module,
+            'stage': 'section',
+            'cold_ms': measure_modules([module], repeat=repeat)[module],
+            # What opening the section costs once the startup modules are already loaded
+            'incremental_ms': measure_modules([module], preload=BASE_MODULES, repeat=repeat)[module],
+            'heavy_dependencies': heavy_dependencies_loaded(module),
+        })
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'startup_ms': sum(startup.values()),
+        'modules': rows,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report per-module import time for dashboard cold starts.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement (median is kept)")
+    parser.add_argument("--json", help="append the result as one JSON line to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.repeat)
+    print(f"{'module':<22}{'stage':<10}{'cold ms':>10}{'incr ms':>10}  heavy dependencies")
+    for row in report['modules']:
+        incremental = f"{row['incremental_ms']:10.1f}" if 'incremental_ms' in row else f"{'':>10}"
+        print(f"{row['module']:<22}{row['stage']:<10}{row['cold_ms']:10.1f}{incremental}  {', '.join(row.get('heavy_dependencies', []))}")
+    print(f"\nEstimated imports before Home renders: {report['startup_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'a') as f:
+            f.write(json.dumps(report) + '\n')
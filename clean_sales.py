@@ -0,0 +1,260 @@
+import argparse
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingest import BASELINE_PATH, DEFAULT_STORE, STORE_DIR, append_parquet, seed_store, store_seeded
+from sales_data import SALES_SCHEMA, SCHEMA_RANGES, apply_schema
+
+CLEAN_DIR = "clean"
+# Raw bytes handed to a worker at a time; blocks always end on a line break
+BLOCK_BYTES = 32 * 1024 * 1024
+SALES_COLUMNS = ['Date'] + list(SALES_SCHEMA)
+# Raw header spellings seen in POS exports -> dashboard column names
+COLUMN_ALIASES = {
+    'date': 'Date', 'sale date': 'Date', 'transaction date': 'Date',
+    'item category': 'Item Category', 'category': 'Item Category',
+    'product description': 'Product Description', 'product': 'Product Description', 'item': 'Product Description',
+    'sale amount': 'Sale Amount', 'amount': 'Sale Amount', 'net sales': 'Sale Amount',
+    'quantity sold': 'Quantity Sold', 'quantity': 'Quantity Sold', 'qty': 'Quantity Sold',
+    'discount amount': 'Discount Amount', 'discount': 'Discount Amount',
+    'discount applied': 'Discount Applied',
+    'temperature (°f)': 'Temperature (°F)', 'temperature': 'Temperature (°F)', 'temp': 'Temperature (°F)',
+    'transaction id': 'Transaction ID', 'receipt id': 'Transaction ID', 'receipt': 'Transaction ID',
+    'store': 'Store', 'branch': 'Store', 'store name': 'Store',
+}
+YES_VALUES = {'yes', 'y', 'true', '1'}
+NO_VALUES = {'no', 'n', 'false', '0', ''}
+
+
+# --- Raw Blocks ---
+def iter_blocks(path, block_bytes=BLOCK_BYTES):
+    # (header, body) byte blocks cut at line breaks, so workers can parse them
+    # independently. Assumes no quoted field spans lines, true of POS exports
+    with open(path, 'rb') as f:
+        header = f.readline()
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            block += f.readline()
+            yield header, block
+
+
+# --- Normalization ---
+def canonical_columns(columns):
+    return [COLUMN_ALIASES.get(' '.join(str(c).split()).lower(), str(c).strip()) for c in columns]
+
+
+def _clean_labels(values, title=False):
+    cleaned = values.str.split().str.join(' ')
+    return cleaned.str.title() if title else cleaned
+
+
+def _parse_money(values):
+    # "SAR 1,234.50" / " 12.5 " -> float; anything else becomes NaN
+    return pd.to_numeric(values.str.replace(r'[^0-9.\-]', '', regex=True), errors='coerce')
+
+
+def _parse_flag(values):
+    lowered = values.fillna('').str.strip().str.lower()
+    return pd.Series(np.where(lowered.isin(YES_VALUES), 1.0, np.where(lowered.isin(NO_VALUES), 0.0, np.nan)), index=values.index)
+
+
+def clean_frame(raw):
+    # raw: every column as str. Returns (clean rows, quarantined rows with a Reason)
+    raw = raw.set_axis(canonical_columns(raw.columns), axis=1)
+    missing = [c for c in SALES_COLUMNS if c not in raw.columns and c not in ('Discount Applied', 'Temperature (°F)')]
+    if missing:
+        raise ValueError(f"raw export is missing columns: {missing}")
+
+    df = pd.DataFrame(index=raw.index)
+    df['Date'] = pd.to_datetime(raw['Date'].str.strip(), errors='coerce', format='mixed').dt.normalize()
+    df['Item Category'] = _clean_labels(raw['Item Category'], title=True)
+    df['Product Description'] = _clean_labels(raw['Product Description'])
+    df['Sale Amount'] = _parse_money(raw['Sale Amount'])
+    df['Quantity Sold'] = pd.to_numeric(raw['Quantity Sold'].str.strip(), errors='coerce')
+    df['Discount Amount'] = _parse_money(raw['Discount Amount'].fillna('0'))
+    flag = _parse_flag(raw['Discount Applied']) if 'Discount Applied' in raw else pd.Series(np.nan, index=raw.index)
+    # A missing flag is taken from the amount; a present one has to agree with it
+    df['Discount Applied'] = flag.fillna((df['Discount Amount'] > 0).astype(float))
+    temperature = raw['Temperature (°F)'] if 'Temperature (°F)' in raw else pd.Series(None, index=raw.index, dtype=str)
+    df['Temperature (°F)'] = pd.to_numeric(temperature.str.strip(), errors='coerce')
+    if 'Store' in raw:
+        df['Store'] = _clean_labels(raw['Store'], title=True)
+
+    # First failing check wins, in this order
+    checks = [
+        ('invalid date', df['Date'].isna()),
+        ('missing category', df['Item Category'].isna() | (df['Item Category'] == '')),
+        ('missing product', df['Product Description'].isna() | (df['Product Description'] == '')),
+        ('invalid sale amount', df['Sale Amount'].isna() | (df['Sale Amount'] < 0)),
+        ('invalid quantity', df['Quantity Sold'].isna() | (df['Quantity Sold'] < 1) | (df['Quantity Sold'] % 1 != 0)
+         | (df['Quantity Sold'] > SCHEMA_RANGES['Quantity Sold'][1])),
+        ('invalid discount amount', df['Discount Amount'].isna() | (df['Discount Amount'] < 0)
+         | (df['Sale Amount'] + df['Discount Amount'] <= 0)),
+        ('discount flag mismatch', df['Discount Applied'].isna() | ((df['Discount Applied'] == 1) != (df['Discount Amount'] > 0))),
+        ('temperature out of range', df['Temperature (°F)'].notna() & ~df['Temperature (°F)'].between(*SCHEMA_RANGES['Temperature (°F)'])),
+    ]
+    if 'Store' in df:
+        checks.append(('missing store', df['Store'].isna() | (df['Store'] == '')))
+    reason = pd.Series(None, index=raw.index, dtype=object)
+    for label, failed in checks:
+        reason = reason.mask(reason.isna() & failed, label)
+    bad = reason.notna()
+
+    clean = df[~bad].copy()
+    clean['Discount Applied'] = clean['Discount Applied'] == 1
+    quarantine = raw[bad].assign(Reason=reason[bad])
+    if 'Transaction ID' in raw:
+        clean['Transaction ID'] = raw.loc[~bad, 'Transaction ID'].str.strip().replace('', np.nan)
+    return apply_schema(clean), quarantine
+
+
+def row_hashes(clean):
+    # Only a receipt key identifies a duplicate: a line repeated under the same
+    # (store and) receipt ID. Identical lines without an ID are separate sales,
+    # and whole re-delivered exports are caught by the store's batch digest.
+    # Returns the hashes of the keyed rows and which rows those are
+    if 'Transaction ID' not in clean:
+        return np.array([], dtype=np.uint64), np.zeros(len(clean), dtype=bool)
+    keyed = clean['Transaction ID'].notna().to_numpy()
+    keys = clean.loc[keyed, ['Transaction ID'] + SALES_COLUMNS + (['Store'] if 'Store' in clean else [])]
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(), keyed
+
+
+def as_quarantine(rows, reason, columns):
+    # Quarantined rows keep their values as text, on one fixed set of columns
+    rows = rows.astype({c: str for c in rows.columns}).assign(Reason=reason)
+    return rows.reindex(columns=columns)
+
+
+# --- Worker ---
+def clean_block(header, block):
+    raw = pd.read_csv(io.BytesIO(header + block), dtype=str, keep_default_na=False, na_values=[''])
+    clean, quarantine = clean_frame(raw)
+    columns = list(dict.fromkeys(quarantine.columns.drop('Reason').tolist() + SALES_COLUMNS)) + ['Reason']
+    hashes, keyed = row_hashes(clean)
+    # Duplicates inside the block are dropped here; across blocks by the parent
+    repeated = pd.Series(hashes).duplicated().to_numpy()
+    first = np.ones(len(clean), dtype=bool)
+    first[np.flatnonzero(keyed)[repeated]] = False
+    quarantine = pd.concat([as_quarantine(quarantine, quarantine['Reason'], columns), as_quarantine(clean[~first], 'duplicate', columns)])
+    return clean[first], hashes[~repeated], keyed[first], quarantine, len(raw)
+
+
+# --- Pipeline ---
+def _writer_table(frame):
+    # Categoricals are written as strings so every block has the same Arrow schema
+    frame = frame.astype({c: str for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)})
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def _append(writers, key, path, table):
+    if key not in writers:
+        writers[key] = pq.ParquetWriter(path, table.schema)
+    writers[key].write_table(table.cast(writers[key].schema))
+
+
+def clean_export(raw_path, out_dir=CLEAN_DIR, store_dir=STORE_DIR, max_workers=None, block_bytes=BLOCK_BYTES, store=DEFAULT_STORE,
+                 replace=False):
+    name = os.path.splitext(os.path.basename(raw_path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    clean_path = os.path.join(out_dir, f"{name}.parquet")
+    quarantine_path = os.path.join(out_dir, f"{name}.quarantine.parquet")
+    max_workers = max_workers or os.cpu_count() or 1
+    for path in (clean_path, quarantine_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Keys of the keyed lines kept so far; a set, so each block costs O(block) however large the file
+    seen = set()
+    counts = {'rows': 0, 'clean': 0, 'quarantined': 0, 'duplicates': 0}
+    reasons = {}
+    writers = {}
+    offset = 0
+
+    def collect(result):
+        nonlocal offset
+        clean, hashes, keyed, quarantine, n_rows = result
+        # Keep the first occurrence of a keyed line across blocks (hashes are already unique within a block)
+        hashes = hashes.tolist()
+        repeated_keys = np.fromiter((h in seen for h in hashes), dtype=bool, count=len(hashes))
+        seen.update(hashes)
+        repeated = np.zeros(len(clean), dtype=bool)
+        repeated[np.flatnonzero(keyed)[repeated_keys]] = True
+        quarantine = pd.concat([quarantine, as_quarantine(clean[repeated], 'duplicate', quarantine.columns.drop('Reason').tolist() + ['Reason'])])
+        clean = clean[~repeated]
+
+        if len(quarantine):
+            # Source Row is the 0-based data row in the raw export
+            quarantine = quarantine.assign(**{'Source Row': quarantine.index.to_numpy() + offset}).sort_values('Source Row')
+            _append(writers, 'quarantine', quarantine_path, pa.Table.from_pandas(quarantine, preserve_index=False))
+        if len(clean):
+            _append(writers, 'clean', clean_path, _writer_table(clean))
+
+        reason_counts = quarantine['Reason'].value_counts()
+        for reason, n in reason_counts.items():
+            reasons[reason] = reasons.get(reason, 0) + int(n)
+        counts['rows'] += n_rows
+        counts['clean'] += len(clean)
+        counts['duplicates'] += int(reason_counts.get('duplicate', 0))
+        counts['quarantined'] += len(quarantine) - int(reason_counts.get('duplicate', 0))
+        offset += n_rows
+
+    # Blocks are submitted with a bounded queue and collected in file order, so
+    # memory stays flat and "first occurrence" means first in the file
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = []
+            for header, block in iter_blocks(raw_path, block_bytes):
+                pending.append(pool.submit(clean_block, header, block))
+                if len(pending) > 2 * max_workers:
+                    collect(pending.pop(0).result())
+            for future in pending:
+                collect(future.result())
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    summary = {'source': os.path.basename(raw_path), **counts, 'reasons': reasons, 'clean_path': clean_path,
+               'quarantine_path': quarantine_path if 'quarantine' in writers else None}
+
+    # The clean rows go straight into the store the dashboard reads, a row group
+    # at a time and with their receipt IDs; exports with a Store column are
+    # split per store by the ingest
+    if store_dir is not None and 'clean' in writers:
+        summary['ingested'] = append_parquet(clean_path, store_dir, os.path.basename(raw_path), store, replace)
+    with open(os.path.join(out_dir, f"{name}.summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean raw POS exports into the dashboard's sales store.")
+    parser.add_argument("exports", nargs="+", help="raw CSV exports")
+    parser.add_argument("--out", default=CLEAN_DIR, help="directory for the clean and quarantine Parquet files")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--store-name", default=DEFAULT_STORE, help="branch the export belongs to, unless it has a Store column")
+    parser.add_argument("--no-ingest", action="store_true", help="only write the clean Parquet files")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="history the store is seeded with on first ingest")
+    parser.add_argument("--no-baseline", action="store_true", help="start the store without the baseline history")
+    parser.add_argument("--replace", action="store_true", help="replace ingested batches that overlap an export")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if not args.no_ingest:
+        if not args.no_baseline and not store_seeded(args.store) and not os.path.exists(args.baseline):
+            parser.error(f"{args.baseline} not found: pass --baseline with the current history, or --no-baseline")
+        seed_store(None if args.no_baseline else args.baseline, args.store)
+    for export in args.exports:
+        summary = clean_export(export, args.out, None if args.no_ingest else args.store, args.workers, store=args.store_name,
+                               replace=args.replace)
+        print(f"{export}: {summary['clean']:,} clean, {summary['quarantined']:,} quarantined, "
+              f"{summary['duplicates']:,} duplicates of {summary['rows']:,} rows")
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from aggregates import LEVELS, discount_pct
+
+# Quantity per transaction = b0 + b1*d + b2*d^2 + day-of-week + month, fitted
+# for every product and category at once, weighted by transactions
+RESPONSE_TERMS = ['Intercept', 'Discount', 'Discount²']
+PENALTY = 1.0  # small ridge term, so series that were never discounted stay solvable
+DISCOUNT_GRID = np.round(np.arange(0, 0.51, 0.01), 2)
+# Rows whose outer products are summed at a time (rows x features² floats)
+BLOCK_ROWS = 20_000
+
+
+# --- Design Matrix ---
+def response_design(cube):
+    # Discount share, its square, then day-of-week and month dummies (Monday
+    # and January are the baseline)
+    pct = discount_pct(cube).fillna(0).to_numpy(dtype=float)
+    dates = pd.DatetimeIndex(cube['Date'])
+    dayofweek = (dates.dayofweek.to_numpy()[:, None] == np.arange(1, 7)).astype(float)
+    month = (dates.month.to_numpy()[:, None] == np.arange(2, 13)).astype(float)
+    return np.hstack([np.ones((len(cube), 1)), pct[:, None], pct[:, None] ** 2, dayofweek, month])
+
+
+def series_groups(cube, levels=LEVELS):
+    # (rows x levels) group ids, numbered consecutively across levels
+    groups, keys, offset = [], [], 0
+    for level in levels:
+        codes, labels = pd.factorize(cube[level].astype(str), sort=True)
+        groups.append(codes + offset)
+        keys.append(pd.DataFrame({'Level': level, 'Series': labels}))
+        offset += len(labels)
+    return np.column_stack(groups), pd.concat(keys, ignore_index=True)
+
+
+# --- Batched Grouped Regression ---
+def grouped_least_squares(X, y, weights, groups, n_groups, penalty=PENALTY):
+    # Per-group weighted normal equations. A sparse (groups x rows) weight
+    # matrix sums every row's outer product into all of its groups in one
+    # product per block, then all systems are solved as one batch
+    n_rows, n_features = X.shape
+    gram = np.zeros((n_groups, n_features * n_features))
+    moments = np.zeros((n_groups, n_features))
+    for start in range(0, n_rows, BLOCK_ROWS):
+        block = slice(start, start + BLOCK_ROWS)
+        rows = np.arange(X[block].shape[0])
+        membership = sparse.csr_matrix(
+            (np.repeat(weights[block], groups.shape[1]), (groups[block].ravel(), np.repeat(rows, groups.shape[1]))),
+            shape=(n_groups, len(rows)),
+        )
+        gram += membership @ (X[block][:, :, None] * X[block][:, None, :]).reshape(len(rows), -1)
+        moments += membership @ (X[block] * y[block][:, None])
+    gram = gram.reshape(n_groups, n_features, n_features)
+    penalties = np.full(n_features, penalty)
+    penalties[0] = 0.0  # the intercept is not shrunk
+    coefficients = np.linalg.solve(gram + np.diag(penalties), moments[:, :, None])[:, :, 0]
+    return coefficients, gram
+
+
+# --- Response Curves ---
+def compute_discount_response(aggregates, levels=LEVELS, grid=DISCOUNT_GRID):
+    cube = aggregates['cube']
+    cube = cube[cube['Transactions'] > 0]
+    if cube.empty:
+        return None
+    X = response_design(cube)
+    y = (cube['Quantity Sold'] / cube['Transactions']).to_numpy(dtype=float)
+    weights = cube['Transactions'].to_numpy(dtype=float)
+    groups, keys = series_groups(cube, levels)
+    coefficients, gram = grouped_least_squares(X, y, weights, groups, len(keys))
+
+    # Curves at each series' own average day: row 0 of the weighted gram holds
+    # the transaction-weighted feature sums
+    mean_features = gram[:, 0, :] / gram[:, 0, :1]
+    calendar_effect = (mean_features[:, 3:] * coefficients[:, 3:]).sum(axis=1)
+    baseline = coefficients[:, 0] + calendar_effect
+    quantity = baseline[:, None] + coefficients[:, 1:2] * grid + coefficients[:, 2:3] * grid ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        uplift = quantity / baseline[:, None] - 1
+    # Net revenue per transaction at list price, relative to no discount
+    revenue = (1 - grid) * (uplift + 1) - 1
+
+    # Recommendations stay inside the discount range each series has actually seen
+    pct = X[:, 1]
+    observed_max = np.zeros(len(keys))
+    for level in range(groups.shape[1]):
+        np.maximum.at(observed_max, groups[:, level], pct)
+    in_range = grid[None, :] <= observed_max[:, None] + 1e-9
+    best = np.where(in_range, revenue, -np.inf).argmax(axis=1)
+    series = np.arange(len(keys))
+
+    # Price elasticity of quantity at the average discount, price being (1 - d)
+    mean_pct = mean_features[:, 1]
+    slope = coefficients[:, 1] + 2 * coefficients[:, 2] * mean_pct
+    at_mean = baseline + coefficients[:, 1] * mean_pct + coefficients[:, 2] * mean_pct ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        elasticity = -slope * (1 - mean_pct) / at_mean
+
+    summary = keys.assign(**{
+        'Transactions': gram[:, 0, 0],
+        'Baseline Qty/Transaction': baseline,
+        'Avg Discount %': mean_pct * 100,
+        'Max Observed Discount %': observed_max * 100,
+        'Elasticity': elasticity,
+        'Uplift at 10% (%)': uplift[:, np.searchsorted(grid, 0.10)] * 100,
+        'Recommended Discount %': grid[best] * 100,
+        'Uplift at Recommended (%)': uplift[series, best] * 100,
+        'Revenue Change at Recommended (%)': revenue[series, best] * 100,
+    })
+    curves = pd.DataFrame({
+        'Level': np.repeat(keys['Level'].to_numpy(), len(grid)),
+        'Series': np.repeat(keys['Series'].to_numpy(), len(grid)),
+        'Discount %': np.tile(grid * 100, len(keys)),
+        'Uplift %': uplift.ravel() * 100,
+        'Revenue Change %': revenue.ravel() * 100,
+        'Observed': in_range.ravel(),
+    })
+    coefficient_table = keys.assign(**dict(zip(RESPONSE_TERMS, coefficients[:, :3].T)))
+    return {'summary': summary, 'curves': curves, 'coefficients': coefficient_table}
@@ -0,0 +1,114 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from sales_data import source_key
+
+EVENTS_PATH = "Data Anaylst Task -Events_2023_2024.csv"
+
+
+# --- Reading ---
+def read_events(path):
+    # Either a single 'Date' per event or a 'Start Date' / 'End Date' span (both
+    # inclusive); an optional 'Store' column limits an event to one store
+    events = pd.read_csv(path)
+    start = pd.to_datetime(events['Start Date'] if 'Start Date' in events else events['Date']).dt.normalize()
+    end = pd.to_datetime(events['End Date']).dt.normalize().fillna(start) if 'End Date' in events else start
+    if (end < start).any():
+        raise ValueError(f"{path}: events ending before they start: {list(events.loc[end < start, 'Event Description'])}")
+    return pd.DataFrame({
+        'Event': events['Event Description'].astype(str),
+        'Start': start,
+        'End': end,
+        'Store': events['Store'] if 'Store' in events else pd.Series(pd.NA, index=events.index, dtype=object),
+    })
+
+
+# --- Interval Index ---
+def build_event_calendar(events):
+    # Per-day lookups over the span the events cover, built once per calendar:
+    # a CSR list of the events active each day (day_offsets into day_events,
+    # with one empty day past the end for dates outside the span) and "any
+    # event" flags, for all events and per store. Every event lists its
+    # own days, so overlaps need no special handling
+    events = events.reset_index(drop=True)
+    if events.empty:
+        return {'events': events, 'origin': np.datetime64('1970-01-01', 'D'), 'day_offsets': np.zeros(2, dtype=np.int64),
+                'day_events': np.zeros(0, dtype=np.int64), 'any': np.zeros(0, dtype=bool),
+                'chain_any': np.zeros(0, dtype=bool), 'store_any': {}}
+    origin = events['Start'].min()
+    start = (events['Start'] - origin).dt.days.to_numpy()
+    length = (events['End'] - events['Start']).dt.days.to_numpy() + 1
+    ids = np.repeat(np.arange(len(events)), length)
+    days = start[ids] + np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+    order = np.lexsort((ids, days))
+    days, ids = days[order], ids[order]
+    n_days = int(days.max()) + 1
+
+    def covered(mask):
+        return np.bincount(days[mask[ids]], minlength=n_days) > 0
+
+    # Store-specific events only count for their own store
+    stores = events['Store']
+    chain = stores.isna().to_numpy()
+    return {
+        'events': events,
+        'origin': np.datetime64(origin.date(), 'D'),
+        'day_offsets': np.searchsorted(days, np.arange(n_days + 2)),
+        'day_events': ids,
+        'any': covered(np.ones(len(events), dtype=bool)),
+        'chain_any': covered(chain),
+        'store_any': {store: covered(chain | (stores == store).to_numpy()) for store in stores.dropna().unique()},
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_calendar(path, key):
+    return build_event_calendar(read_events(path))
+
+
+def load_event_calendar(path=EVENTS_PATH):
+    # Built once per version of the events file and shared read-only
+    return _cached_calendar(path, source_key(path))
+
+
+# --- Lookups ---
+# Each date is mapped to its position on the calendar's day axis once, so a
+# lookup costs O(rows) (plus the tagged pairs), whatever the number of events
+def _day_positions(calendar, dates):
+    # Dates outside the span the events cover map to the empty day past its end
+    n_days = len(calendar['any'])
+    days = (pd.DatetimeIndex(dates).to_numpy().astype('datetime64[D]') - calendar['origin']).astype(np.int64)
+    return np.where((days >= 0) & (days < n_days), days, n_days)
+
+
+def event_flags(calendar, dates, store=None):
+    # With a store, only chain-wide events and that store's own events count
+    if store is None:
+        active = calendar['any']
+    else:
+        active = calendar['store_any'].get(store, calendar['chain_any'])
+    # The position past the end reads the appended False
+    return np.append(active, False)[_day_positions(calendar, dates)]
+
+
+def tag_events(frame, calendar, store=None):
+    # One row per (frame row, active event), for frames with a Date column
+    days = _day_positions(calendar, frame['Date'])
+    offsets = calendar['day_offsets']
+    counts = offsets[days + 1] - offsets[days]
+    rows = np.repeat(np.arange(len(frame)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ids = calendar['day_events'][np.repeat(offsets[days], counts) + within]
+    if store is not None:
+        stores = calendar['events']['Store']
+        keep = (stores.isna() | (stores == store)).to_numpy()[ids]
+        rows, ids = rows[keep], ids[keep]
+    return frame.iloc[rows].assign(Event=calendar['events']['Event'].to_numpy()[ids])
+
+
+def event_days(calendar):
+    # Every day on which at least one event is active
+    days = np.flatnonzero(calendar['any'])
+    return pd.DatetimeIndex(calendar['origin'] + days.astype('timedelta64[D]'))
@@ -0,0 +1,167 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from aggregates import LEVELS, rollup
+from analysis_forecasting import HORIZON, N_ORIGINS
+from event_calendar import event_flags
+
+SEASON = 7
+# (alpha, beta, gamma) tried for every series at once; the best in-sample
+# one-step error up to each forecast origin wins
+HW_GRID = list(itertools.product([0.1, 0.3, 0.5], [0.0, 0.05], [0.05, 0.2]))
+RIDGE_PENALTY = 1.0
+# Future discount share is assumed to stay at its recent average
+DISCOUNT_WINDOW = 28
+
+
+# --- Series Matrix ---
+def daily_matrices(aggregates):
+    # Date x (Level, Series) matrices of sales and discount share on one gap-free
+    # calendar: the total, every category and every product side by side
+    cube = aggregates['cube']
+    frames = [rollup(cube, ['Date']).assign(Level='Total', Series='All Sales')]
+    for level in LEVELS:
+        frames.append(rollup(cube, ['Date', level]).rename(columns={level: 'Series'}).assign(Level=level))
+    long = pd.concat(frames, ignore_index=True)
+    long['Series'] = long['Series'].astype(str)
+    long['Discount Share'] = long['Discount Amount'] / (long['Sale Amount'] + long['Discount Amount'])
+
+    calendar = pd.date_range(long['Date'].min(), long['Date'].max(), freq='D')
+    wide = long.pivot(index='Date', columns=['Level', 'Series'], values=['Sale Amount', 'Discount Share'])
+    wide = wide.reindex(calendar).fillna(0)
+    return wide['Sale Amount'], wide['Discount Share']
+
+
+def calendar_features(dates, calendar):
+    # Intercept, trend, day-of-week and month dummies and the event flag
+    dates = pd.DatetimeIndex(dates)
+    trend = np.arange(len(dates)) / 365.0
+    dayofweek = (dates.dayofweek.to_numpy()[:, None] == np.arange(1, 7)).astype(float)
+    month = (dates.month.to_numpy()[:, None] == np.arange(2, 13)).astype(float)
+    events = event_flags(calendar, dates).astype(float)[:, None]
+    return np.hstack([np.ones((len(dates), 1)), trend[:, None], dayofweek, month, events])
+
+
+# --- Batched Forecasters ---
+# Y is a (days x series) matrix; each returns forecasts of shape (len(cuts), horizon, series),
+# the forecast made with the first `cut` days of history, for every cut at once
+def seasonal_naive(Y, cuts, horizon=HORIZON, season=SEASON):
+    steps = np.arange(horizon) % season
+    return np.stack([Y[cut - season + steps] for cut in cuts])
+
+
+def holt_winters(Y, cuts, horizon=HORIZON, season=SEASON, grid=HW_GRID):
+    # Additive Holt-Winters run once over every series x parameter set; the
+    # state is snapshotted at each cut instead of refitting per origin
+    n_days, n_series = Y.shape
+    alpha, beta, gamma = (np.repeat(np.array(p, dtype=float), n_series) for p in zip(*grid))
+    values = np.tile(Y, (1, len(grid)))
+    level = values[:season].mean(axis=0)
+    trend = np.zeros_like(level)
+    seasonal = values[:season] - level
+    sse = np.zeros_like(level)
+
+    snapshots = {}
+    steps = np.arange(1, horizon + 1)
+    for t in range(season, n_days + 1):
+        if t in cuts:
+            forecast = level + steps[:, None] * trend + seasonal[(t - 1 + steps) % season]
+            snapshots[t] = (forecast, sse.copy())
+        if t == n_days:
+            break
+        s = seasonal[t % season]
+        error = values[t] - (level + trend + s)
+        sse += error ** 2
+        new_level = alpha * (values[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[t % season] = gamma * (values[t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    forecasts = []
+    for cut in cuts:
+        forecast, errors = snapshots[cut]
+        best = errors.reshape(len(grid), n_series).argmin(axis=0)
+        forecasts.append(forecast.reshape(horizon, len(grid), n_series)[:, best, np.arange(n_series)])
+    return np.stack(forecasts)
+
+
+def ridge(Y, cuts, features, discount, horizon=HORIZON, penalty=RIDGE_PENALTY):
+    # One ridge regression per series on the shared calendar features plus the
+    # series' own discount share. The calendar block of every normal equation
+    # is the same F^T F, so it is solved once per cut; each series only adds
+    # its discount column, eliminated with a scalar Schur complement
+    forecasts = []
+    for cut in cuts:
+        F, D, y = features[:cut], discount[:cut], Y[:cut]
+        penalties = np.full(F.shape[1], penalty)
+        penalties[0] = 0.0  # the intercept is not shrunk
+        shared = F.T @ F + np.diag(penalties)
+        cross = F.T @ D  # (features x series)
+        solved = np.linalg.solve(shared, np.hstack([F.T @ y, cross]))
+        sales_part, discount_part = np.split(solved, 2, axis=1)
+        discount_coef = (((D * y).sum(axis=0) - (cross * sales_part).sum(axis=0))
+                         / ((D * D).sum(axis=0) + penalty - (cross * discount_part).sum(axis=0)))
+        calendar_coef = sales_part - discount_part * discount_coef
+
+        planned_discount = discount[max(cut - DISCOUNT_WINDOW, 0):cut].mean(axis=0)
+        future = features[cut:cut + horizon]
+        forecasts.append(future @ calendar_coef + planned_discount * discount_coef)
+    return np.stack(forecasts)
+
+
+# --- Backtest and Forecast ---
+def compute_fast_forecasts(aggregates, calendar, horizon=HORIZON, n_origins=N_ORIGINS):
+    sales, discount = daily_matrices(aggregates)
+    if len(sales) < 2 * SEASON + n_origins * horizon:
+        return None
+    Y = sales.to_numpy(dtype=float)
+    n_days = len(Y)
+
+    # Calendar features run one horizon past the data for the final forecast
+    future_dates = pd.date_range(sales.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    features = calendar_features(sales.index.append(future_dates), calendar)
+    cuts = [n_days - origin * horizon for origin in range(n_origins, 0, -1)] + [n_days]
+
+    forecasts = {
+        'Seasonal Naive': seasonal_naive(Y, cuts, horizon),
+        'Holt-Winters': holt_winters(Y, cuts, horizon),
+        'Ridge': ridge(Y, cuts, features, discount.to_numpy(dtype=float), horizon),
+    }
+    forecasts = {model: np.clip(values, 0, None) for model, values in forecasts.items()}
+
+    # Errors over the backtest origins, every series and model at once
+    actual = np.stack([Y[cut:cut + horizon] for cut in cuts[:-1]])
+    keys = sales.columns.to_frame(index=False)
+    metrics, backtests, final = [], [], []
+    for model, values in forecasts.items():
+        errors = values[:-1] - actual
+        metrics.append(keys.assign(
+            Model=model,
+            MAE=np.abs(errors).mean(axis=(0, 1)),
+            RMSE=np.sqrt((errors ** 2).mean(axis=(0, 1))),
+        ))
+        for i, cut in enumerate(cuts[:-1]):
+            dates = sales.index[cut:cut + horizon]
+            backtests.append(pd.DataFrame({
+                'Level': np.tile(keys['Level'], horizon),
+                'Series': np.tile(keys['Series'], horizon),
+                'Model': model,
+                'Origin': sales.index[cut - 1],
+                'Date': np.repeat(dates, len(keys)),
+                'Actual': actual[i].ravel(),
+                'Forecast': values[i].ravel(),
+            }))
+        final.append(pd.DataFrame({
+            'Level': np.tile(keys['Level'], horizon),
+            'Series': np.tile(keys['Series'], horizon),
+            'Model': model,
+            'Date': np.repeat(future_dates, len(keys)),
+            'Forecast': values[-1].ravel(),
+        }))
+    return {
+        'metrics': pd.concat(metrics, ignore_index=True),
+        'backtests': pd.concat(backtests, ignore_index=True),
+        'forecasts': pd.concat(final, ignore_index=True),
+    }
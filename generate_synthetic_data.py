@@ -0,0 +1,109 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_calendar import event_days, load_event_calendar
+
+EVENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data Anaylst Task -Events_2023_2024.csv")
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000, '50m': 50_000_000}
+CHUNK_ROWS = 1_000_000
+
+# Category mix and per-product list prices (SAR), roughly matching the cafe's menu
+CATEGORY_SHARE = {'Coffee': 0.50, 'Pastries': 0.20, 'Tea': 0.15, 'Sandwiches': 0.15}
+PRODUCTS = {
+    'Coffee': {'Espresso': 12.0, 'Americano': 14.0, 'Cappuccino': 17.0, 'Latte': 18.0, 'Flat White': 18.0, 'Mocha': 20.0},
+    'Pastries': {'Croissant': 11.0, 'Chocolate Croissant': 13.0, 'Muffin': 12.0, 'Cinnamon Roll': 14.0},
+    'Tea': {'Black Tea': 10.0, 'Green Tea': 11.0, 'Chai Latte': 16.0, 'Herbal Tea': 12.0},
+    'Sandwiches': {'Chicken Sandwich': 28.0, 'Club Sandwich': 30.0, 'Halloumi Sandwich': 26.0, 'Tuna Sandwich': 27.0},
+}
+# Discount mix: most sales full price, discounts concentrated under 10% with a thin tail
+DISCOUNT_RATE = 0.3
+DISCOUNT_LEVELS = np.array([0.02, 0.05, 0.075, 0.10, 0.15, 0.20, 0.25, 0.30])
+DISCOUNT_WEIGHTS = np.array([0.15, 0.25, 0.20, 0.18, 0.10, 0.06, 0.04, 0.02])
+# Relative daily volume: busier weekends and event days
+WEEKDAY_WEIGHTS = np.array([0.9, 0.9, 0.95, 1.0, 1.15, 1.25, 1.1])
+EVENT_UPLIFT = 1.3
+
+
+# --- Calendar ---
+def daily_row_counts(n_rows, start, end, event_dates, rng):
+    dates = pd.date_range(start, end, freq='D')
+    weights = WEEKDAY_WEIGHTS[dates.dayofweek] * np.where(dates.isin(event_dates), EVENT_UPLIFT, 1.0)
+    counts = rng.multinomial(n_rows, weights / weights.sum())
+    return dates, counts
+
+
+def daily_temperatures(dates, rng):
+    # Hot-climate seasonal cycle (peak in July) plus day-to-day noise, one reading per day
+    seasonal = 82 + 18 * np.sin(2 * np.pi * (dates.dayofyear - 105) / 365.25)
+    return (seasonal + rng.normal(0, 4, len(dates))).astype(np.float32)
+
+
+# --- Row Generation ---
+def generate_chunk(dates, counts, temperatures, rng):
+    n = int(counts.sum())
+    products = [(category, product, price) for category, menu in PRODUCTS.items() for product, price in menu.items()]
+    product_weights = np.array([CATEGORY_SHARE[c] / len(PRODUCTS[c]) for c, _, _ in products])
+    picks = rng.choice(len(products), size=n, p=product_weights / product_weights.sum())
+
+    categories = np.array([c for c, _, _ in products])
+    names = np.array([p for _, p, _ in products])
+    prices = np.array([price for _, _, price in products])
+
+    quantity = (rng.geometric(0.55, n)).clip(1, 8).astype(np.int16)
+    gross = prices[picks] * quantity
+    discounted = rng.random(n) < DISCOUNT_RATE
+    pct = np.where(discounted, rng.choice(DISCOUNT_LEVELS, size=n, p=DISCOUNT_WEIGHTS), 0.0)
+    discount_amount = np.round(gross * pct, 2)
+
+    return pd.DataFrame({
+        'Date': np.repeat(dates.strftime('%Y-%m-%d'), counts),
+        'Item Category': categories[picks],
+        'Product Description': names[picks],
+        'Sale Amount': np.round(gross - discount_amount, 2),
+        'Quantity Sold': quantity,
+        'Discount Amount': discount_amount,
+        'Discount Applied': np.where(discount_amount > 0, 'Yes', 'No'),
+        'Temperature (°F)': np.repeat(np.round(temperatures, 1), counts),
+    })
+
+
+def generate(n_rows, out_path, start='2023-01-01', end='2024-12-31', events_path=EVENTS_PATH, seed=0):
+    rng = np.random.default_rng(seed)
+    event_dates = event_days(load_event_calendar(events_path)) if os.path.exists(events_path) else []
+    dates, counts = daily_row_counts(n_rows, start, end, event_dates, rng)
+    temperatures = daily_temperatures(dates, rng)
+
+    # Whole days per chunk, so a 50M-row file is written with bounded memory
+    chunk_ids = np.cumsum(counts) // CHUNK_ROWS
+    writer = None
+    for i, chunk_id in enumerate(np.unique(chunk_ids)):
+        days = chunk_ids == chunk_id
+        chunk = generate_chunk(dates[days], counts[days], temperatures[days], rng)
+        if out_path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(out_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    if writer is not None:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic cafe sales with the CafeSales_clean.csv schema.")
+    parser.add_argument("size", help=f"row count or one of {', '.join(SIZES)}")
+    parser.add_argument("--out", help="output .csv or .parquet (default: synthetic_<size>.csv)")
+    parser.add_argument("--start", default='2023-01-01')
+    parser.add_argument("--end", default='2024-12-31')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_rows = SIZES.get(args.size.lower()) or int(args.size)
+    out_path = args.out or f"synthetic_{args.size.lower()}.csv"
+    generate(n_rows, out_path, args.start, args.end, seed=args.seed)
+    print(f"Wrote {n_rows:,} rows to {out_path}")
@@ -0,0 +1,571 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aggregates import (
+    CUBE_DIMENSIONS, HISTOGRAM_DIMENSIONS, ROLLUPS, build_discount_histogram, build_rollups, build_sales_cube, empty_aggregates,
+    merge_histograms, merge_rollups, month_start, restore_dimension_dtypes, rollup,
+)
+from sales_data import apply_schema, iter_sales_csv, source_key
+
+STORE_DIR = "sales_store"
+# History the store starts from, so switching the dashboard to it loses nothing
+BASELINE_PATH = "CafeSales_clean.csv"
+# Batches without a Store column (and stores written before partitioning) belong here
+DEFAULT_STORE = "main"
+# What basket analysis reads of each receipt line
+RECEIPT_COLUMNS = ['Date', 'Item Category', 'Product Description', 'Quantity Sold', 'Transaction ID']
+
+# Store layout, partitioned by store (branch) and month:
+#   manifest.json                        the baseline and every ingested batch: store, source file,
+#                                        date range and digest, used to reject re-deliveries and overlaps;
+#                                        'pending' journals an ingest until it is committed
+#   parts/<store>/<digest>.parquet       the raw rows of each batch
+#   cube/<store>/<YYYY-MM>.parquet       the aggregate cube
+#   histogram/<store>/<YYYY-MM>.parquet  fixed-edge discount % counts per day and product
+#   rollups/<name>/<store>/<YYYY-MM>.parquet  each rollup's partial for that store and month
+# Every partition is additive, so a store or date selection only reads and
+# merges the partitions it needs. The dashboard reads the store once it is
+# seeded with the baseline history
+
+
+# --- Store Paths ---
+def manifest_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, "manifest.json")
+
+
+def read_manifest(store_dir=STORE_DIR):
+    path = manifest_path(store_dir)
+    if not os.path.exists(path):
+        return {'batches': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest, store_dir):
+    tmp_path = f"{manifest_path(store_dir)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(store_dir))
+
+
+def store_seeded(store_dir=STORE_DIR):
+    # The dashboard and report only switch to the store once it holds the
+    # baseline history (or was explicitly started without one)
+    return 'baseline' in read_manifest(store_dir)
+
+
+def source_version(data_path, store_dir=STORE_DIR):
+    # What derived artifacts (the offline forecasts) were built from, with the
+    # dashboard's source choice: the seeded store's batch digests, else the CSV's key
+    if store_seeded(store_dir):
+        batches = sorted(f"{e.get('store', DEFAULT_STORE)}:{e['digest']}" for e in read_manifest(store_dir)['batches'])
+        return {'store': os.path.abspath(store_dir), 'digest': hashlib.sha1('\n'.join(batches).encode()).hexdigest()[:16]}
+    path, mtime_ns, size = source_key(data_path)
+    return {'csv': path, 'mtime_ns': mtime_ns, 'size': size}
+
+
+def _write_atomic(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _read_optional(path):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def partition_path(store_dir, kind, store, month):
+    return os.path.join(store_dir, kind, store, f"{month:%Y-%m}.parquet")
+
+
+def _store_name(store):
+    store = str(store).strip()
+    if not store or os.sep in store or store.startswith('.'):
+        raise ValueError(f"invalid store name: {store!r}")
+    return store
+
+
+def _migrate_layout(store_dir):
+    # Stores written before partitioning kept cube/<YYYY-MM>.parquet, parts/<digest>.parquet,
+    # one histogram and the rollups at the top level; they become the default store
+    for kind in ("cube", "parts"):
+        kind_dir = os.path.join(store_dir, kind)
+        legacy = [e for e in os.listdir(kind_dir) if e.endswith('.parquet')] if os.path.isdir(kind_dir) else []
+        if legacy:
+            os.makedirs(os.path.join(kind_dir, DEFAULT_STORE), exist_ok=True)
+        for entry in legacy:
+            os.replace(os.path.join(kind_dir, entry), os.path.join(kind_dir, DEFAULT_STORE, entry))
+    hist_path = os.path.join(store_dir, "discount_histogram.parquet")
+    if os.path.exists(hist_path):
+        histogram = restore_dimension_dtypes(pd.read_parquet(hist_path))
+        for month, rows in histogram.groupby(month_start(histogram['Date'])):
+            _write_atomic(rows, partition_path(store_dir, "histogram", DEFAULT_STORE, month))
+        os.remove(hist_path)
+    for name in ROLLUPS:
+        if os.path.exists(os.path.join(store_dir, f"{name}.parquet")):
+            os.remove(os.path.join(store_dir, f"{name}.parquet"))
+
+
+# --- Batch Fingerprint ---
+# Two independent 64-bit row hashes are summed, so the digest ignores row
+# order and can be accumulated chunk by chunk
+DIGEST_KEYS = ['cafe-sales-key-1', 'cafe-sales-key-2']
+
+
+def row_hash_sums(rows):
+    # Hashes the typed values, so a re-exported file with different
+    # formatting or row order is still recognised as the same batch
+    rows = rows[sorted(rows.columns)]
+    return [int(pd.util.hash_pandas_object(rows, index=False, hash_key=key).to_numpy().sum(dtype=np.uint64))
+            for key in DIGEST_KEYS]
+
+
+def batch_digest(n_rows, sums):
+    return hashlib.sha1(f"{n_rows}:{sums[0]}:{sums[1]}".encode()).hexdigest()[:16]
+
+
+def _split_stores(chunk, store):
+    # A multi-store export is split, and each store's rows are a batch of their own
+    if 'Store' not in chunk.columns:
+        yield _store_name(store), chunk
+        return
+    for name, rows in chunk.groupby(chunk['Store'].astype(str), sort=True):
+        yield _store_name(name), rows.drop(columns='Store')
+
+
+def scan_batch(chunks, store=DEFAULT_STORE):
+    # First pass: {store: rows, digest and date range}, before anything is written
+    stats = {}
+    for chunk in chunks():
+        for name, rows in _split_stores(chunk, store):
+            entry = stats.setdefault(name, {'rows': 0, 'sums': [0, 0], 'first': rows['Date'].min(), 'last': rows['Date'].max()})
+            entry['rows'] += len(rows)
+            entry['sums'] = [(a + b) % 2 ** 64 for a, b in zip(entry['sums'], row_hash_sums(rows))]
+            entry['first'], entry['last'] = min(entry['first'], rows['Date'].min()), max(entry['last'], rows['Date'].max())
+    return {name: {'digest': batch_digest(entry['rows'], entry['sums']), 'rows': entry['rows'],
+                   'first_date': str(entry['first'].date()), 'last_date': str(entry['last'].date())}
+            for name, entry in stats.items()}
+
+
+# --- Coverage ---
+def find_conflicts(manifest, store, source, first_date, last_date):
+    # Ingested batches of the same store that a new batch would double-count:
+    # the same source file, or any overlap of their date ranges
+    return [entry for entry in manifest['batches']
+            if entry.get('store', DEFAULT_STORE) == store
+            and ((source is not None and entry.get('source') == source)
+                 or (entry['first_date'] <= last_date and first_date <= entry['last_date']))]
+
+
+# --- Incremental Merges ---
+def _merge_additive(existing, delta, keys, dropna=True):
+    # Only the rows sharing a key with the delta are re-aggregated
+    if existing is None or existing.empty:
+        return restore_dimension_dtypes(delta)
+    existing = restore_dimension_dtypes(existing)
+    delta = restore_dimension_dtypes(delta)
+    touched = pd.MultiIndex.from_frame(existing[keys]).isin(pd.MultiIndex.from_frame(delta[keys]))
+    merged = rollup(pd.concat([existing[touched], delta], ignore_index=True), keys, dropna=dropna)
+    combined = pd.concat([existing[~touched], merged[existing.columns]], ignore_index=True)
+    return restore_dimension_dtypes(combined).sort_values(keys, ignore_index=True)
+
+
+def _merge_cube_month(store_dir, store, month, delta):
+    path = partition_path(store_dir, "cube", store, month)
+    merged = _merge_additive(_read_optional(path), delta, CUBE_DIMENSIONS, dropna=False)
+    _write_atomic(merged.drop(columns='Temperature (°F)', errors='ignore'), path)
+    return merged
+
+
+def _rollup_kind(name):
+    return os.path.join("rollups", name)
+
+
+def _merge_partitions(store_dir, store, cube, histogram):
+    # Cube, rollup and histogram partitions for the months the rows touch; all
+    # are additive, so the rows' own totals are merged into each
+    for month, delta in cube.groupby(month_start(cube['Date'])):
+        merged = _merge_cube_month(store_dir, store, month, delta)
+        paths = {name: partition_path(store_dir, _rollup_kind(name), store, month) for name in ROLLUPS}
+        if not all(os.path.exists(path) for path in paths.values()):
+            # A month written before partials were stored gets them from its whole cube
+            for name, partial in build_rollups(merged).items():
+                _write_atomic(partial, paths[name])
+            continue
+        for name, partial in build_rollups(delta).items():
+            keys, dropna = ROLLUPS[name]
+            _write_atomic(merge_rollups(pd.read_parquet(paths[name]), partial, keys, dropna), paths[name])
+    for month, delta in histogram.groupby(month_start(histogram['Date'])):
+        path = partition_path(store_dir, "histogram", store, month)
+        _write_atomic(merge_histograms(_read_optional(path), delta), path)
+
+
+def _entry_months(entry):
+    return pd.date_range(pd.Timestamp(entry['first_date']).to_period('M').to_timestamp(), entry['last_date'], freq='MS')
+
+
+def _part_path(store_dir, store, digest):
+    return os.path.join(store_dir, "parts", store, f"{digest}.parquet")
+
+
+def _rebuild_months(store_dir, store, months, entries):
+    # Merged totals cannot tell which batch contributed what, so the months a
+    # replaced batch touched are rebuilt from the parts that remain
+    for month in months:
+        for kind in ["cube", "histogram"] + [_rollup_kind(name) for name in ROLLUPS]:
+            if os.path.exists(partition_path(store_dir, kind, store, month)):
+                os.remove(partition_path(store_dir, kind, store, month))
+    lower, upper = min(months), max(months) + pd.offsets.MonthBegin()
+    for entry in entries:
+        path = _part_path(store_dir, store, entry['digest'])
+        rows = pd.read_parquet(path, filters=[('Date', '>=', lower), ('Date', '<', upper)])
+        rows = restore_dimension_dtypes(rows[month_start(rows['Date']).isin(months)])
+        if len(rows):
+            _merge_partitions(store_dir, store, build_sales_cube(rows), build_discount_histogram(rows))
+
+
+# --- Crash Recovery ---
+def _journal(batches, replaced):
+    # The new batches and every month their merge, or a replacement's rebuild, may rewrite
+    months = {}
+    for name, entry in list(batches.items()) + replaced:
+        months.setdefault(name, set()).update(f"{month:%Y-%m}" for month in _entry_months(entry))
+    return {'batches': [{'store': name, **batch} for name, batch in batches.items()],
+            'months': {name: sorted(values) for name, values in months.items()}}
+
+
+def recover_store(store_dir=STORE_DIR):
+    # An ingest that crashed after its journal entry may have merged part of
+    # its rows. Merged totals cannot be un-added, so the journalled months are
+    # rebuilt from the committed batches' parts and the crashed batch's own
+    # parts are dropped; re-running the ingest then counts it once
+    manifest = read_manifest(store_dir)
+    pending = manifest.pop('pending', None)
+    if pending is None:
+        return False
+    for name, months in pending['months'].items():
+        months = [pd.Timestamp(f"{month}-01") for month in months]
+        committed = [entry for entry in manifest['batches'] if entry.get('store', DEFAULT_STORE) == name
+                     and _entry_months(entry).isin(months).any()]
+        _rebuild_months(store_dir, name, months, committed)
+    committed = {(entry.get('store', DEFAULT_STORE), entry['digest']) for entry in manifest['batches']}
+    for entry in pending['batches']:
+        path = _part_path(store_dir, entry['store'], entry['digest'])
+        if (entry['store'], entry['digest']) not in committed and os.path.exists(path):
+            os.remove(path)
+    _write_manifest(manifest, store_dir)
+    return True
+
+
+# --- Ingestion Entry Point ---
+def append_chunks(chunks, store_dir=STORE_DIR, source=None, store=DEFAULT_STORE, replace=False):
+    # chunks: callable returning an iterable of typed frames; it is read twice,
+    # once to fingerprint the batch and once to write it, so memory is bounded
+    # by a chunk plus the batch's aggregates
+    _migrate_layout(store_dir)
+    recover_store(store_dir)
+    manifest = read_manifest(store_dir)
+    batches = scan_batch(chunks, store)
+
+    # Coverage checks per store: an identical re-delivery is skipped; a
+    # different batch over the same file or dates is refused unless replacing
+    replaced = []
+    for name, batch in list(batches.items()):
+        if any(e['digest'] == batch['digest'] and e.get('store', DEFAULT_STORE) == name for e in manifest['batches']):
+            del batches[name]
+            continue
+        conflicts = find_conflicts(manifest, name, source, batch['first_date'], batch['last_date'])
+        if conflicts and not replace:
+            covered = ', '.join(f"{e.get('source') or 'an unnamed batch'} ({e['first_date']} to {e['last_date']})" for e in conflicts)
+            raise ValueError(f"{source or 'batch'} for store '{name}' overlaps already ingested {covered}; "
+                             "pass replace=True (--replace) to swap them out")
+        replaced.extend((name, e) for e in conflicts)
+    if not batches:
+        return False
+
+    # Parts are streamed to a temporary file per store, aggregates accumulated per chunk
+    writers, cubes, histograms = {}, {}, {}
+    try:
+        for chunk in chunks():
+            for name, rows in _split_stores(chunk, store):
+                if name not in batches:
+                    continue
+                table = pa.Table.from_pandas(
+                    rows.astype({c: str for c in rows.columns if isinstance(rows[c].dtype, pd.CategoricalDtype)}),
+                    preserve_index=False)
+                if name not in writers:
+                    path = _part_path(store_dir, name, batches[name]['digest'])
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    writers[name] = pq.ParquetWriter(f"{path}.{os.getpid()}.tmp", table.schema)
+                writers[name].write_table(table.cast(writers[name].schema))
+                cube = build_sales_cube(rows)
+                cubes[name] = cube if name not in cubes else restore_dimension_dtypes(
+                    rollup(pd.concat([cubes[name], cube], ignore_index=True), CUBE_DIMENSIONS, dropna=False)
+                    .drop(columns='Temperature (°F)'))
+                histograms[name] = merge_histograms(histograms.get(name), build_discount_histogram(rows))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Nothing has been merged yet: journal the ingest, so a crash from here on
+    # is rolled back by recover_store instead of leaving a partial merge
+    _write_manifest({**manifest, 'pending': _journal(batches, replaced)}, store_dir)
+
+    # Replaced batches leave the manifest, and the months they touched are rebuilt without them
+    for name, entry in replaced:
+        manifest['batches'].remove(entry)
+    for name in sorted({name for name, _ in replaced}):
+        months = sorted({month for owner, entry in replaced if owner == name for month in _entry_months(entry)})
+        remaining = [entry for entry in manifest['batches'] if entry.get('store', DEFAULT_STORE) == name
+                     and _entry_months(entry).isin(months).any()]
+        _rebuild_months(store_dir, name, months, remaining)
+
+    ingested_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    for name, batch in batches.items():
+        path = _part_path(store_dir, name, batch['digest'])
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        _merge_partitions(store_dir, name, cubes[name], histograms[name])
+        manifest['batches'].append({'store': name, 'source': source, **batch, 'ingested_at': ingested_at})
+    # The manifest is written last and drops the journal entry, committing the batch
+    _write_manifest(manifest, store_dir)
+    for name, entry in replaced:
+        if os.path.exists(_part_path(store_dir, name, entry['digest'])):
+            os.remove(_part_path(store_dir, name, entry['digest']))
+    return True
+
+
+def append_batch(batch, store_dir=STORE_DIR, source=None, store=DEFAULT_STORE, replace=False):
+    return append_chunks(lambda: [batch], store_dir, source, store, replace)
+
+
+def append_csv(path, store_dir=STORE_DIR, store=DEFAULT_STORE, replace=False):
+    return append_chunks(lambda: iter_sales_csv(path), store_dir, os.path.basename(path), store, replace)
+
+
+def append_parquet(path, store_dir=STORE_DIR, source=None, store=DEFAULT_STORE, replace=False):
+    # Row group by row group, e.g. the clean exports written by clean_sales
+    def chunks():
+        parquet = pq.ParquetFile(path)
+        for i in range(parquet.num_row_groups):
+            yield apply_schema(parquet.read_row_group(i).to_pandas())
+    return append_chunks(chunks, store_dir, source or os.path.basename(path), store, replace)
+
+
+def seed_store(baseline_path=BASELINE_PATH, store_dir=STORE_DIR):
+    # On first ingest the baseline history goes in as the default store's
+    # first batch; None starts the store without it
+    manifest = read_manifest(store_dir)
+    if 'baseline' in manifest:
+        return False
+    if baseline_path is not None:
+        append_csv(baseline_path, store_dir)
+        manifest = read_manifest(store_dir)
+    manifest['baseline'] = None if baseline_path is None else os.path.basename(baseline_path)
+    os.makedirs(store_dir, exist_ok=True)
+    _write_manifest(manifest, store_dir)
+    return True
+
+
+# --- Partitions ---
+def list_partitions(store_dir=STORE_DIR):
+    # One row per (store, month) cube partition, its histogram and rollup
+    # partials. A store not yet migrated reads as the default store, with its
+    # single histogram file and no rollup partials
+    rows = []
+    cube_dir = os.path.join(store_dir, "cube")
+    legacy_histogram = os.path.join(store_dir, "discount_histogram.parquet")
+    for entry in sorted(os.listdir(cube_dir)):
+        if entry.endswith('.parquet'):
+            rows.append((DEFAULT_STORE, entry[:-len('.parquet')], os.path.join(cube_dir, entry), legacy_histogram))
+            continue
+        for month in sorted(os.listdir(os.path.join(cube_dir, entry))):
+            month = month[:-len('.parquet')]
+            rows.append((entry, month, os.path.join(cube_dir, entry, f"{month}.parquet"),
+                         os.path.join(store_dir, "histogram", entry, f"{month}.parquet")))
+    partitions = pd.DataFrame(rows, columns=['Store', 'Month', 'Cube', 'Histogram'])
+    partitions['Month'] = pd.to_datetime(partitions['Month'], format='%Y-%m')
+    for name in ROLLUPS:
+        partitions[name] = [partition_path(store_dir, _rollup_kind(name), store, month)
+                            for store, month in zip(partitions['Store'], partitions['Month'])]
+    return partitions
+
+
+def store_date_ranges(store_dir=STORE_DIR):
+    # {store: (first date, last date)} from the manifest, without reading any partition
+    ranges = {}
+    for entry in read_manifest(store_dir)['batches']:
+        store = entry.get('store', DEFAULT_STORE)
+        first, last = pd.Timestamp(entry['first_date']).date(), pd.Timestamp(entry['last_date']).date()
+        if store in ranges:
+            first, last = min(first, ranges[store][0]), max(last, ranges[store][1])
+        ranges[store] = (first, last)
+    return dict(sorted(ranges.items()))
+
+
+def prune_partitions(partitions, stores=None, start=None, end=None):
+    # Whole months are kept; rows inside them are filtered later on the index
+    keep = np.ones(len(partitions), dtype=bool)
+    if stores:
+        keep &= partitions['Store'].isin(stores).to_numpy()
+    if start is not None:
+        keep &= (partitions['Month'] >= pd.Timestamp(start).to_period('M').to_timestamp()).to_numpy()
+    if end is not None:
+        keep &= (partitions['Month'] <= pd.Timestamp(end)).to_numpy()
+    return partitions[keep]
+
+
+# --- Per-Partition Aggregation ---
+def _aggregate_partitions(partitions):
+    # Worker: one store's pruned partitions -> its cube, histogram and rollups.
+    # The stored rollup partials of the selected months are merged; a partition
+    # written before they were stored has its partials rebuilt from its cube
+    cubes = [restore_dimension_dtypes(pd.read_parquet(p)) for p in partitions['Cube']]
+    partials = {name: [] for name in ROLLUPS}
+    for cube, (_, paths) in zip(cubes, partitions.iterrows()):
+        stored = {name: _read_optional(paths[name]) for name in ROLLUPS}
+        if any(frame is None for frame in stored.values()):
+            stored = build_rollups(cube)
+        for name, frame in stored.items():
+            partials[name].append(frame)
+    rollups = {name: restore_dimension_dtypes(rollup(pd.concat(frames, ignore_index=True), *ROLLUPS[name]))
+               for name, frames in partials.items()}
+    cube = restore_dimension_dtypes(pd.concat(cubes, ignore_index=True))
+    histograms = [pd.read_parquet(p) for p in partitions['Histogram'].drop_duplicates() if os.path.exists(p)]
+    histogram = restore_dimension_dtypes(pd.concat(histograms, ignore_index=True)) if histograms else None
+    if histogram is not None and partitions['Histogram'].nunique() < len(partitions):
+        # The unmigrated single histogram covers every month
+        histogram = histogram[month_start(histogram['Date']).isin(partitions['Month'])]
+    return {'cube': cube, 'discount_histogram': histogram, **rollups}
+
+
+def merge_partials(partials):
+    # Cross-store totals: every aggregate is additive, so concatenated partials
+    # are rolled up once more over the same keys
+    if len(partials) == 1:
+        merged = dict(partials[0])
+    else:
+        cube = rollup(pd.concat([p['cube'] for p in partials], ignore_index=True), CUBE_DIMENSIONS, dropna=False)
+        merged = {'cube': restore_dimension_dtypes(cube.drop(columns='Temperature (°F)'))}
+        for name, (keys, dropna) in ROLLUPS.items():
+            frames = pd.concat([p[name] for p in partials], ignore_index=True)
+            merged[name] = restore_dimension_dtypes(rollup(frames, keys, dropna=dropna))
+        histograms = [p['discount_histogram'] for p in partials if p['discount_histogram'] is not None]
+        merged['discount_histogram'] = (
+            restore_dimension_dtypes(pd.concat(histograms, ignore_index=True))
+            .groupby(HISTOGRAM_DIMENSIONS, observed=True)['Count'].sum().reset_index()
+        ) if histograms else None
+    if merged['discount_histogram'] is None:
+        # No discounted sales: an empty histogram with the same dtypes as a built
+        # one, its dimensions taken from the cube
+        dimensions = [col for col in HISTOGRAM_DIMENSIONS if col in merged['cube']]
+        empty = merged['cube'][dimensions].iloc[:0].reset_index(drop=True)
+        empty = empty.assign(**{'Bin Start': pd.Series(dtype='float64'), 'Count': pd.Series(dtype='int64')})
+        merged['discount_histogram'] = restore_dimension_dtypes(empty)
+    return merged
+
+
+# --- Loading ---
+def load_store_aggregates(store_dir=STORE_DIR, stores=None, start=None, end=None, max_workers=None):
+    # Only the partitions of the selected stores and months are read. Each
+    # store is aggregated in its own process, then the partials are merged. A
+    # selection in a gap between ingested months has no rows, not an error
+    partitions = prune_partitions(list_partitions(store_dir), stores, start, end)
+    if partitions.empty:
+        return empty_aggregates()
+    groups = [rows for _, rows in partitions.groupby('Store', sort=True)]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(groups))
+    if max_workers <= 1:
+        return merge_partials([_aggregate_partitions(rows) for rows in groups])
+    # spawn, not fork: the dashboard loads from a threaded Streamlit server
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn')) as pool:
+        return merge_partials(list(pool.map(_aggregate_partitions, groups)))
+
+
+def _part_files(store_dir, stores=None):
+    # (store, path) of every ingested part; unmigrated parts belong to the default store
+    parts_dir = os.path.join(store_dir, "parts")
+    files = []
+    for entry in sorted(os.listdir(parts_dir)):
+        if entry.endswith('.parquet'):
+            files.append((DEFAULT_STORE, os.path.join(parts_dir, entry)))
+        else:
+            files.extend((entry, os.path.join(parts_dir, entry, p)) for p in sorted(os.listdir(os.path.join(parts_dir, entry)))
+                         if p.endswith('.parquet'))
+    return [(store, path) for store, path in files if not stores or store in stores]
+
+
+def load_store_data(store_dir=STORE_DIR, stores=None):
+    parts = [pd.read_parquet(path).assign(Store=store) for store, path in _part_files(store_dir, stores)]
+    return restore_dimension_dtypes(pd.concat(parts, ignore_index=True))
+
+
+def iter_store_rows(store_dir=STORE_DIR, stores=None, start=None, end=None):
+    # Typed rows of the selected stores and days (inclusive), one part row
+    # group at a time, for passes that must not hold the store in memory. Row
+    # groups whose Date statistics fall outside the range are not read
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    for store, path in _part_files(store_dir, stores):
+        parquet = pq.ParquetFile(path)
+        date_column = parquet.schema.names.index('Date')
+        for i in range(parquet.num_row_groups):
+            stats = parquet.metadata.row_group(i).column(date_column).statistics
+            if stats is not None and stats.has_min_max and (
+                    (start is not None and pd.Timestamp(stats.max) < start)
+                    or (end is not None and pd.Timestamp(stats.min) > end)):
+                continue
+            rows = parquet.read_row_group(i).to_pandas()
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= (rows['Date'] >= start).to_numpy()
+            if end is not None:
+                keep &= (rows['Date'] <= end).to_numpy()
+            if keep.any():
+                yield apply_schema(rows[keep].reset_index(drop=True))
+
+
+def load_receipt_lines(store_dir=STORE_DIR, stores=None):
+    # The lines that carry a receipt ID, for basket analysis. Parts ingested
+    # without one (e.g. the baseline CSV) are skipped; None when there are none
+    lines = []
+    for store, path in _part_files(store_dir, stores):
+        if 'Transaction ID' not in pq.read_schema(path).names:
+            continue
+        part = pd.read_parquet(path, columns=RECEIPT_COLUMNS)
+        lines.append(part[part['Transaction ID'].notna()].assign(Store=store))
+    lines = [part for part in lines if len(part)]
+    if not lines:
+        return None
+    lines = pd.concat(lines, ignore_index=True)
+    lines['Store'] = lines['Store'].astype('category')
+    return restore_dimension_dtypes(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append daily sales batches to the dashboard store.")
+    parser.add_argument("batches", nargs="*", help="CSV files with the CafeSales_clean.csv columns")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--store-name", default=DEFAULT_STORE, help="branch the batches belong to, unless they have a Store column")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="history the store is seeded with on first ingest")
+    parser.add_argument("--no-baseline", action="store_true", help="start the store without the baseline history")
+    parser.add_argument("--replace", action="store_true", help="replace ingested batches that overlap a new one")
+    args = parser.parse_args()
+
+    if not args.no_baseline and not store_seeded(args.store) and not os.path.exists(args.baseline):
+        parser.error(f"{args.baseline} not found: pass --baseline with the current history, or --no-baseline")
+    if seed_store(None if args.no_baseline else args.baseline, args.store):
+        print(f"Seeded {args.store} with {'no baseline' if args.no_baseline else args.baseline}")
+    for batch_path in args.batches:
+        added = append_csv(batch_path, args.store, args.store_name, args.replace)
+        print(f"{batch_path}: {'appended' if added else 'already ingested, skipped'}")
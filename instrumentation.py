@@ -0,0 +1,128 @@
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+TIMING_LOG = os.environ.get("DASHBOARD_TIMING_LOG", os.path.join("logs", "dashboard_timings.jsonl"))
+# Per-stage peak memory needs tracemalloc, which slows allocations down, so it is opt-in
+TRACE_MEMORY = os.environ.get("DASHBOARD_TRACE_MEMORY") == "1"
+
+_log_lock = threading.Lock()
+_local = threading.local()
+
+
+# --- Session Records ---
+def _session_state():
+    # Only inside a live Streamlit session; scripts and the report builder just log
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx(suppress_warning=True) is None:
+            return None
+        return st.session_state
+    except ImportError:
+        return None
+
+
+def _session_id():
+    state = _session_state()
+    if state is None:
+        return None
+    if '_diagnostics_session' not in state:
+        state['_diagnostics_session'] = uuid.uuid4().hex[:8]
+    return state['_diagnostics_session']
+
+
+def start_run():
+    # Called once per script run; the panel shows the records of the latest run
+    state = _session_state()
+    if state is not None:
+        state['_diagnostics_records'] = []
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def record(section, stage, seconds, rows=None, peak_mb=None, cache=None):
+    entry = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'session': _session_id(),
+        'section': section,
+        'stage': stage,
+        'seconds': round(seconds, 6),
+        'rows': rows,
+        'peak_mb': None if peak_mb is None else round(peak_mb, 3),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'cache': cache,
+    }
+    state = _session_state()
+    if state is not None:
+        state.setdefault('_diagnostics_records', []).append(entry)
+
+    if TIMING_LOG:
+        directory = os.path.dirname(TIMING_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _log_lock, open(TIMING_LOG, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def _reset_peak():
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+def _traced_peak_mb():
+    return tracemalloc.get_traced_memory()[1] / 1e6 if tracemalloc.is_tracing() else None
+
+
+# --- Timers ---
+class SectionTimer:
+    # Times consecutive stages of one section: each mark() closes the stage that
+    # started at the previous mark (or at construction)
+    def __init__(self, section):
+        self.section = section
+        self._restart()
+
+    def _restart(self):
+        _local.cache_miss = False
+        _reset_peak()
+        self._start = time.perf_counter()
+
+    def mark(self, stage, rows=None, cached=False):
+        # cached=True for stages behind st.cache_data: a miss is any cached body
+        # that called mark_cache_miss() since the previous mark
+        cache = ('miss' if _local.cache_miss else 'hit') if cached else None
+        entry = record(self.section, stage, time.perf_counter() - self._start, rows, _traced_peak_mb(), cache)
+        self._restart()
+        return entry
+
+
+def mark_cache_miss():
+    # Called from inside a cached function body, which only runs on a miss
+    _local.cache_miss = True
+
+
+# --- Diagnostics Panel ---
+def show_diagnostics_panel():
+    import pandas as pd
+    import streamlit as st
+
+    state = _session_state()
+    records = [] if state is None else state.get('_diagnostics_records', [])
+    st.sidebar.subheader("Diagnostics")
+    if not records:
+        st.sidebar.caption("No timings recorded for this page yet.")
+        return
+    table = pd.DataFrame(records)[['section', 'stage', 'seconds', 'rows', 'peak_mb', 'cache']]
+    st.sidebar.dataframe(table, hide_index=True)
+    st.sidebar.caption(
+        f"Total {table['seconds'].sum():.3f}s · max RSS {records[-1]['max_rss_mb']:.0f} MB"
+        + ("" if TRACE_MEMORY else " · set DASHBOARD_TRACE_MEMORY=1 for per-stage peaks")
+    )
+    if TIMING_LOG:
+        st.sidebar.caption(f"Logged to {TIMING_LOG}")
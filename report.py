@@ -0,0 +1,136 @@
+import argparse
+import base64
+import html
+import importlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from aggregates import load_aggregates
+from ingest import STORE_DIR, load_store_aggregates, manifest_path, store_seeded
+from sales_data import source_key
+from shared_store import load_shared
+
+DATA_PATH = "CafeSales_clean.csv"
+EVENTS_PATH = "Data Anaylst Task -Events_2023_2024.csv"
+REPORT_DIR = "report"
+# Long tables (e.g. one row per day) are kept whole in the JSON but cut in the HTML
+MAX_HTML_ROWS = 50
+
+# section -> (module, compute function, figure builder, title)
+SECTIONS = {
+    'events': ('analysis_events', 'compute_events', 'build_events_figures', "Event Effects on Sales"),
+    'temperature': ('analysis_temp', 'compute_temperature', 'build_temperature_figures', "Temperature Effects on Sales"),
+    'category': ('analysis_category', 'compute_category', 'build_category_figures', "Category Performance Analysis"),
+    'discounts': ('analysis_discounts', 'compute_discounts', 'build_discount_figures', "Discount Analysis"),
+}
+
+
+def load_report_aggregates(data_path=DATA_PATH, store_dir=STORE_DIR):
+    # Same source choice and shared mapped files as the dashboard: the ingested
+    # store wins over the CSV once it is seeded with the history
+    if store_seeded(store_dir):
+        return load_shared(source_key(manifest_path(store_dir)), 'aggregates', lambda: load_store_aggregates(store_dir))
+    return load_shared(source_key(data_path), 'aggregates', lambda: load_aggregates(data_path))
+
+
+# --- Serialisation ---
+def _to_json(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.reset_index() if isinstance(value, pd.Series) or not isinstance(value.index, pd.RangeIndex) else value
+        return json.loads(frame.to_json(orient='records', date_format='iso'))
+    return value
+
+
+def _to_html(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        if isinstance(value, pd.Series):
+            return value.to_frame().to_html(max_rows=MAX_HTML_ROWS)
+        return value.to_html(index=False, max_rows=MAX_HTML_ROWS)
+    if isinstance(value, (list, tuple, dict)):
+        return None
+    return f"<p>{html.escape(str(value))}</p>"
+
+
+def _figure_html(fig):
+    if hasattr(fig, 'to_html'):
+        return fig.to_html(full_html=False, include_plotlyjs=False)
+    # Matplotlib figures are embedded as PNGs so the report has no image files
+    import matplotlib.pyplot as plt
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return f'<img src="data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}">'
+
+
+# --- Section Worker ---
+def run_section(name, data_path, events_path, store_dir):
+    module_name, compute_name, figures_name, title = SECTIONS[name]
+    module = importlib.import_module(module_name)
+    aggregates = load_report_aggregates(data_path, store_dir)
+    args = (aggregates, events_path) if name == 'events' else (aggregates,)
+    results = getattr(module, compute_name)(*args)
+    # A section returns None when the data cannot support it (e.g. no event days)
+    if results is None:
+        return {'title': title, 'results': None, 'figures_html': {},
+                'results_html': {'note': "<p>Not enough data for this section.</p>"}}
+    figures = getattr(module, figures_name)(results)
+    tables_html = {key: _to_html(value) for key, value in results.items()}
+    return {
+        'title': title,
+        'results': {key: _to_json(value) for key, value in results.items()},
+        'results_html': {key: table for key, table in tables_html.items() if table is not None},
+        'figures_html': {key: _figure_html(fig) for key, fig in figures.items()},
+    }
+
+
+# --- Report Builder ---
+def build_report(data_path=DATA_PATH, events_path=EVENTS_PATH, store_dir=STORE_DIR, out_dir=REPORT_DIR, max_workers=None):
+    # Publish the aggregates once so the workers only attach to the mapped files
+    load_report_aggregates(data_path, store_dir)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(run_section, name, data_path, events_path, store_dir) for name in SECTIONS}
+        sections = {name: future.result() for name, future in futures.items()}
+
+    generated_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "report.json"), 'w') as f:
+        json.dump({
+            'generated_at': generated_at,
+            'sections': {name: {'title': s['title'], 'results': s['results']} for name, s in sections.items()},
+        }, f, indent=2, default=str)
+
+    from plotly.offline import get_plotlyjs_version
+    body = []
+    for section in sections.values():
+        body.append(f"<h2>{html.escape(section['title'])}</h2>")
+        for key, table in section['results_html'].items():
+            body.append(f"<h3>{html.escape(key.replace('_', ' ').title())}</h3>{table}")
+        body.extend(f"<div class='figure'>{figure}</div>" for figure in section['figures_html'].values())
+    with open(os.path.join(out_dir, "report.html"), 'w') as f:
+        f.write(
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Cafe Sales Report</title>"
+            f"<script src='https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'></script>"
+            "<style>body{font-family:sans-serif;margin:2em} table{border-collapse:collapse}"
+            " td,th{border:1px solid #ccc;padding:2px 6px} .figure{margin:1em 0}</style></head><body>"
+            f"<h1>Cafe Sales Report</h1><p>Generated {generated_at}</p>{''.join(body)}</body></html>"
+        )
+    return sections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the static HTML + JSON sales report without Streamlit.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--events", default=EVENTS_PATH)
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    build_report(args.data, args.events, args.store, args.out, args.workers)
+    print(f"Wrote {os.path.join(args.out, 'report.html')} and report.json")
@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+N_RESAMPLES = 100_000
+SEED = 0
+# Index matrices are built a batch of resamples at a time, about 16 MB each
+BATCH_ELEMENTS = 2_000_000
+
+
+# --- Batching ---
+def _batches(n_resamples, n_values, seed):
+    # One child seed per batch, so results depend only on the seed and the
+    # number of resamples, never on how many workers ran the batches
+    batch_size = max(1, BATCH_ELEMENTS // max(n_values, 1))
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def _run_batches(func, args, batches, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(batches) <= 1:
+        return [func(*args, size, seed) for size, seed in batches]
+    # spawn, not fork: the dashboard calls this from a threaded Streamlit server
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(batches)), mp_context=get_context('spawn')) as pool:
+        futures = [pool.submit(func, *args, size, seed) for size, seed in batches]
+        return [future.result() for future in futures]
+
+
+# --- Statistics ---
+# Every group is (values, weights) and its statistic is sum(values) / sum(weights):
+# a plain mean with unit weights, or e.g. quantity per transaction from daily totals
+def _as_group(group):
+    if isinstance(group, tuple):
+        values, weights = group
+    else:
+        values, weights = group, None
+    values = np.asarray(values, dtype=float)
+    weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float)
+    return values, weights
+
+
+def _ratio(values, weights, idx):
+    return values[idx].sum(axis=-1) / weights[idx].sum(axis=-1)
+
+
+def _permutation_batch(values, weights, n_first, size, seed):
+    # Only the smaller group of each relabelling is drawn (the k smallest of
+    # random keys, a uniform k-subset); the other group is the pooled remainder
+    rng = np.random.default_rng(seed)
+    k = min(n_first, len(values) - n_first)
+    idx = np.argpartition(rng.random((size, len(values))), k - 1, axis=1)[:, :k]
+    drawn_values, drawn_weights = values[idx].sum(axis=1), weights[idx].sum(axis=1)
+    drawn = drawn_values / drawn_weights
+    rest = (values.sum() - drawn_values) / (weights.sum() - drawn_weights)
+    return drawn - rest if k == n_first else rest - drawn
+
+
+def _bootstrap_batch(groups, size, seed):
+    rng = np.random.default_rng(seed)
+    return np.stack([
+        _ratio(values, weights, rng.integers(0, len(values), (size, len(values))))
+        for values, weights in groups
+    ])
+
+
+# --- Public Tests ---
+def permutation_test(a, b, n_resamples=N_RESAMPLES, seed=SEED, max_workers=None):
+    # Two-sided test of statistic(a) - statistic(b) under exchangeable labels
+    a_values, a_weights = _as_group(a)
+    b_values, b_weights = _as_group(b)
+    observed = a_values.sum() / a_weights.sum() - b_values.sum() / b_weights.sum()
+    values = np.concatenate([a_values, b_values])
+    weights = np.concatenate([a_weights, b_weights])
+    batches = _batches(n_resamples, len(values), seed)
+    diffs = np.concatenate(_run_batches(_permutation_batch, (values, weights, len(a_values)), batches, max_workers))
+    # +1 on both sides counts the observed labelling, so p is never exactly 0
+    p_value = (np.sum(np.abs(diffs) >= abs(observed) - 1e-12) + 1) / (n_resamples + 1)
+    return float(observed), float(p_value)
+
+
+def bootstrap(groups, n_resamples=N_RESAMPLES, seed=SEED, max_workers=None):
+    # Resampled statistics, shape (len(groups), n_resamples); groups are resampled
+    # independently but in the same batches, so their draws line up by column
+    groups = [_as_group(group) for group in groups]
+    batches = _batches(n_resamples, sum(len(values) for values, _ in groups), seed)
+    return np.concatenate(_run_batches(_bootstrap_batch, (groups,), batches, max_workers), axis=1)
+
+
+def confidence_interval(samples, level=0.95):
+    tail = (1 - level) / 2 * 100
+    return np.percentile(samples, [tail, 100 - tail], axis=-1)
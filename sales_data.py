@@ -0,0 +1,131 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".cache"
+
+# Declared dtypes for the sales data. High-repeat strings are categoricals and
+# the Yes/No flag is a bool; money stays float64 so totals are exact to the cent
+SALES_SCHEMA = {
+    'Item Category': 'category',
+    'Product Description': 'category',
+    'Sale Amount': 'float64',
+    'Quantity Sold': 'int16',
+    'Discount Amount': 'float64',
+    'Discount Applied': 'bool',
+    'Temperature (°F)': 'float32',
+}
+# Values the narrow dtypes above can hold without wrapping or drifting. Quantity
+# must also be a whole number; temperature is limited to plausible readings,
+# where float32 keeps a tenth of a degree exactly enough
+SCHEMA_RANGES = {
+    'Quantity Sold': (np.iinfo(np.int16).min, np.iinfo(np.int16).max),
+    'Temperature (°F)': (-60.0, 140.0),
+}
+# Bumped whenever SALES_SCHEMA or a cached aggregate's layout changes, so old caches are rebuilt
+SCHEMA_VERSION = 5
+
+
+# --- Source Versioning ---
+def source_key(path):
+    # Anything that changes when the CSV is rewritten: location, mtime and size
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:12]
+
+
+def cache_path(path, cache_dir=CACHE_DIR, kind='data'):
+    key = source_key(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}.{kind}-{_digest(key[0])}-{_digest((key, SCHEMA_VERSION))}.parquet")
+
+
+# --- Schema ---
+def discount_flag(values):
+    # "Yes"/"No" (any case) to bool, mapping only the distinct values
+    if values.dtype == bool:
+        return values
+    labels = values.astype('category')
+    flags = labels.cat.categories.astype(str).str.strip().str.lower().isin(['yes', 'true', '1'])
+    # Missing values have code -1, which reads the trailing False
+    flags = np.append(flags, False)
+    return pd.Series(flags[labels.cat.codes.to_numpy()], index=values.index, name=values.name)
+
+
+def check_ranges(df):
+    # Raises instead of letting astype wrap a quantity or round a bad reading
+    for col, (low, high) in SCHEMA_RANGES.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        bad = values.notna() & ~values.between(low, high)
+        if col == 'Quantity Sold':
+            bad |= values.notna() & (values % 1 != 0)
+        if bad.any():
+            raise ValueError(f"{int(bad.sum())} '{col}' values outside [{low}, {high}] or not whole, "
+                             f"e.g. {values[bad].iloc[0]}; clean the export first")
+
+
+def apply_schema(df):
+    # Converts in place, column by column, so there is never a second full copy
+    if 'Date' in df.columns:
+        # Every aggregate is daily, so a time of sale is dropped here; left in,
+        # the 'daily' rollup would get one row per timestamp
+        dates = df['Date'] if pd.api.types.is_datetime64_any_dtype(df['Date']) else pd.to_datetime(df['Date'])
+        df['Date'] = dates.dt.normalize()
+    if 'Discount Applied' in df.columns:
+        df['Discount Applied'] = discount_flag(df['Discount Applied'])
+    check_ranges(df.loc[:, [col for col in SCHEMA_RANGES if col in df.columns and df[col].dtype != SALES_SCHEMA[col]]])
+    for col, dtype in SALES_SCHEMA.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+# --- CSV Parsing ---
+def _csv_dtypes():
+    # Strings are parsed straight into categoricals instead of object columns
+    return {col: 'category' for col, dtype in SALES_SCHEMA.items() if dtype in ('category', 'bool')}
+
+
+def read_sales_csv(path, **read_csv_kwargs):
+    df = pd.read_csv(path, dtype=_csv_dtypes(), **read_csv_kwargs)
+    return apply_schema(df)
+
+
+def iter_sales_csv(path, chunksize=1_000_000, **read_csv_kwargs):
+    # Typed chunks for passes that must not hold the whole file in memory
+    for chunk in pd.read_csv(path, dtype=_csv_dtypes(), chunksize=chunksize, **read_csv_kwargs):
+        yield apply_schema(chunk)
+
+
+# --- Columnar Cache ---
+def write_cache(df, cached):
+    cache_dir = os.path.dirname(cached)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Older versions of the same source are stale once the CSV has changed
+    prefix = os.path.basename(cached).rsplit('-', 1)[0] + '-'
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and entry.endswith('.parquet'):
+            os.remove(os.path.join(cache_dir, entry))
+
+    # Write-then-rename so concurrent sessions never read a half-written file
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cached)
+
+
+def load_sales_data(path, cache_dir=CACHE_DIR):
+    cached = cache_path(path, cache_dir)
+    if os.path.exists(cached):
+        return pd.read_parquet(cached)
+
+    df = read_sales_csv(path)
+    write_cache(df, cached)
+    return df
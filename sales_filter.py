@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import build_rollups
+
+# Aggregates sliced by the sidebar filters; the rollups are rebuilt from the cube
+INDEXED_AGGREGATES = ['cube', 'discount_histogram']
+
+
+# --- Date-Sorted Index ---
+def build_index(frame):
+    # Rows sorted by Date, so a date range is one contiguous block found by
+    # binary search. Each category and product keeps the sorted positions of
+    # its rows, and a date block cuts those arrays down to contiguous slices too
+    # Cubes are normally built in date order, and then the (shared) frame is used as is
+    if not frame['Date'].is_monotonic_increasing:
+        frame = frame.take(np.argsort(frame['Date'].to_numpy(), kind='stable'))
+    frame = frame.reset_index(drop=True)
+    partitions = {}
+    for col in ['Item Category', 'Product Description']:
+        codes = frame[col].cat.codes.to_numpy()
+        positions = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[positions], np.arange(len(frame[col].cat.categories) + 1))
+        partitions[col] = {
+            value: positions[bounds[i]:bounds[i + 1]]
+            for i, value in enumerate(frame[col].cat.categories)
+        }
+    return {'frame': frame, 'dates': frame['Date'].to_numpy(), 'partitions': partitions}
+
+
+def build_indexes(aggregates):
+    return {name: build_index(aggregates[name]) for name in INDEXED_AGGREGATES}
+
+
+def category_products(cube):
+    # Product choices per category for the sidebar
+    pairs = cube[['Item Category', 'Product Description']].drop_duplicates().astype(str)
+    return {category: sorted(group['Product Description']) for category, group in pairs.groupby('Item Category')}
+
+
+def slice_index(index, start=None, end=None, categories=None, products=None):
+    # start and end are inclusive days
+    dates = index['dates']
+    lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+    hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+
+    # The narrowest partition wins: products, else categories, else the whole block
+    if products:
+        column, values = 'Product Description', products
+    elif categories:
+        column, values = 'Item Category', categories
+    else:
+        return index['frame'].iloc[lo:hi]
+    parts = []
+    for value in values:
+        positions = index['partitions'][column].get(value)
+        if positions is not None:
+            parts.append(positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)])
+    rows = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.intp)
+    frame = index['frame'].take(rows)
+    if products and categories:
+        frame = frame[frame['Item Category'].isin(categories)]
+    return frame
+
+
+# --- Filtered Aggregates ---
+def filter_aggregates(aggregates, indexes, start=None, end=None, categories=None, products=None):
+    if start is None and end is None and not categories and not products:
+        return aggregates
+    filtered = {
+        name: slice_index(indexes[name], start, end, categories, products).reset_index(drop=True)
+        for name in INDEXED_AGGREGATES
+    }
+    return {**filtered, **build_rollups(filtered['cube'])}
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import shutil
+
+import pyarrow.feather as feather
+
+from sales_data import CACHE_DIR, SCHEMA_VERSION
+
+SHARED_DIR = os.path.join(CACHE_DIR, "shared")
+
+# Layout: <shared dir>/<source digest>/<version digest>/<kind>/<name>.arrow
+# Files are uncompressed Arrow IPC, so every session and worker process that
+# attaches maps the same pages instead of holding its own copy of the frames.
+
+
+# --- Paths ---
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:12]
+
+
+def _kind_dir(key, kind, shared_dir):
+    # key is a source_key(): (absolute path, mtime_ns, size)
+    return os.path.join(shared_dir, _digest(key[0]), _digest((key, SCHEMA_VERSION)), kind)
+
+
+# --- Publish / Attach ---
+def publish(frames, key, kind, shared_dir=SHARED_DIR):
+    target = _kind_dir(key, kind, shared_dir)
+    if os.path.isdir(target):
+        return target
+    tmp_dir = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, frame in frames.items():
+        feather.write_feather(frame, os.path.join(tmp_dir, f"{name}.arrow"), compression='uncompressed')
+    try:
+        os.rename(tmp_dir, target)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Older versions of this source; processes still mapping them keep their pages
+    source_dir = os.path.dirname(os.path.dirname(target))
+    current = os.path.basename(os.path.dirname(target))
+    for version in os.listdir(source_dir):
+        if version != current:
+            shutil.rmtree(os.path.join(source_dir, version), ignore_errors=True)
+    return target
+
+
+def attach(key, kind, shared_dir=SHARED_DIR):
+    # Read-only frames backed by the mapped files, or None if not yet published.
+    # Under pandas copy-on-write any modification copies instead of writing through
+    directory = _kind_dir(key, kind, shared_dir)
+    if not os.path.isdir(directory):
+        return None
+    return {
+        name[:-len(".arrow")]: feather.read_table(os.path.join(directory, name), memory_map=True).to_pandas(split_blocks=True)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".arrow")
+    }
+
+
+def load_shared(key, kind, build, shared_dir=SHARED_DIR):
+    # The first caller for a data version builds and publishes; the rest attach
+    frames = attach(key, kind, shared_dir)
+    if frames is None:
+        publish(build(), key, kind, shared_dir)
+        frames = attach(key, kind, shared_dir)
+    return frames
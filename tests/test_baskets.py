@@ -0,0 +1,76 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_baskets import compute_baskets
+
+
+@pytest.fixture(scope="module")
+def lines():
+    # Receipt lines with repeated products in a basket, returns (zero quantity)
+    # and transaction IDs reused across stores
+    rng = np.random.default_rng(0)
+    products = {f"Product {i}": f"Category {i % 4}" for i in range(12)}
+    names = rng.choice(list(products), 3000)
+    return pd.DataFrame({
+        'Store': rng.choice(['North', 'South', 'East'], 3000),
+        'Transaction ID': rng.integers(0, 400, 3000),
+        'Product Description': names,
+        'Item Category': [products[name] for name in names],
+        'Quantity Sold': rng.choice([0, 1, 2, 3], 3000, p=[0.1, 0.5, 0.3, 0.1]),
+    })
+
+
+def brute_force_pairs(baskets):
+    # Support and lift of every co-occurring pair, counted over Python sets
+    single, both = {}, {}
+    for basket in baskets:
+        for item in basket:
+            single[item] = single.get(item, 0) + 1
+        for pair in combinations(sorted(basket), 2):
+            both[pair] = both.get(pair, 0) + 1
+    n = len(baskets)
+    return {pair: (count / n, count * n / (single[pair[0]] * single[pair[1]])) for pair, count in both.items()}
+
+
+def result_pairs(pairs):
+    return {
+        (row['Item A'], row['Item B']): (row['Support'], row['Lift'])
+        for row in pairs.to_dict('records')
+    }
+
+
+def assert_same_pairs(result, expected):
+    assert result.keys() == expected.keys()
+    for pair, (support, lift) in expected.items():
+        assert result[pair][0] == pytest.approx(support, rel=1e-12)
+        assert result[pair][1] == pytest.approx(lift, rel=1e-12)
+
+
+def test_pairs_match_brute_force_sets(lines):
+    sold = lines[lines['Quantity Sold'] > 0]
+    grouped = sold.groupby(['Store', 'Transaction ID'])
+    product_baskets = [set(group) for _, group in grouped['Product Description']]
+    category_baskets = [set(group) for _, group in grouped['Item Category']]
+
+    results = compute_baskets(lines, min_support=0.0)
+    assert results['n_baskets'] == len(product_baskets)
+    assert_same_pairs(result_pairs(results['product_pairs']), brute_force_pairs(product_baskets))
+    assert_same_pairs(result_pairs(results['category_pairs']), brute_force_pairs(category_baskets))
+
+    support = results['product_support'].set_index('Product Description')['Support']
+    for product in support.index:
+        assert support[product] == pytest.approx(sum(product in b for b in product_baskets) / len(product_baskets), rel=1e-12)
+
+
+def test_min_support_drops_rare_pairs(lines):
+    results = compute_baskets(lines, min_support=0.05)
+    expected = {pair: values for pair, values in result_pairs(compute_baskets(lines, min_support=0.0)['product_pairs']).items()
+                if values[0] >= 0.05}
+    assert_same_pairs(result_pairs(results['product_pairs']), expected)
+
+
+def test_no_baskets(lines):
+    assert compute_baskets(lines[lines['Quantity Sold'] < 0]) is None
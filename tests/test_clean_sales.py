@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_sales import clean_export
+from ingest import load_store_data
+from sales_data import read_sales_csv
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CafeSales_clean.csv")
+
+
+@pytest.fixture
+def source():
+    return pd.read_csv(BASELINE, dtype=str, nrows=600)
+
+
+def write_export(tmp_path, raw, name="export.csv"):
+    path = tmp_path / name
+    raw.to_csv(path, index=False)
+    return str(path)
+
+
+def receipts(raw):
+    return raw.assign(**{'Receipt ID': [f" R{i:05d} " for i in range(len(raw))]})
+
+
+def test_messy_formats_clean_to_the_source_values(tmp_path, source):
+    raw = source.copy()
+    raw.loc[:99, 'Date'] = pd.to_datetime(raw.loc[:99, 'Date']).dt.strftime('%m/%d/%Y')
+    raw.loc[100:199, 'Item Category'] = '  ' + raw.loc[100:199, 'Item Category'].str.lower() + ' '
+    raw.loc[200:299, 'Sale Amount'] = 'SAR ' + raw.loc[200:299, 'Sale Amount']
+    raw.loc[300:349, 'Discount Applied'] = raw.loc[300:349, 'Discount Applied'].str.upper()
+    raw = raw.rename(columns={'Quantity Sold': 'Qty', 'Item Category': 'category'})
+    summary = clean_export(write_export(tmp_path, raw), str(tmp_path / "clean"), store_dir=None, max_workers=1)
+
+    assert summary['clean'] == len(source) and summary['quarantined'] == 0
+    clean = pd.read_parquet(summary['clean_path'])
+    expected = read_sales_csv(BASELINE).head(len(source))
+    pd.testing.assert_frame_equal(clean.astype({'Item Category': str, 'Product Description': str}),
+                                  expected.astype({'Item Category': str, 'Product Description': str}), check_dtype=False)
+
+
+def test_bad_rows_are_quarantined_with_their_reason(tmp_path, source):
+    bad = pd.DataFrame([
+        {**source.iloc[0], 'Date': 'not a date'},
+        {**source.iloc[1], 'Sale Amount': '-5'},
+        {**source.iloc[2], 'Quantity Sold': '0'},
+        {**source.iloc[3], 'Discount Applied': 'Yes', 'Discount Amount': '0'},
+        {**source.iloc[4], 'Temperature (°F)': '400'},
+        {**source.iloc[5], 'Product Description': ''},
+    ])
+    raw = pd.concat([source, bad], ignore_index=True)
+    summary = clean_export(write_export(tmp_path, raw), str(tmp_path / "clean"), store_dir=None, max_workers=1)
+
+    assert summary['clean'] == len(source)
+    quarantine = pd.read_parquet(summary['quarantine_path'])
+    assert quarantine['Source Row'].tolist() == list(range(len(source), len(raw)))
+    assert quarantine['Reason'].tolist() == ['invalid date', 'invalid sale amount', 'invalid quantity',
+                                             'discount flag mismatch', 'temperature out of range', 'missing product']
+
+
+def test_duplicates_need_a_receipt_key(tmp_path, source):
+    # Identical lines are separate sales unless they repeat a receipt line
+    without_ids = pd.concat([source, source.iloc[[10, 20]]], ignore_index=True)
+    summary = clean_export(write_export(tmp_path, without_ids, "plain.csv"), str(tmp_path / "clean"), store_dir=None, max_workers=1)
+    assert summary['duplicates'] == 0 and summary['clean'] == len(without_ids)
+
+    keyed = receipts(source)
+    with_ids = pd.concat([keyed, keyed.iloc[[10, 20]], keyed.iloc[[30]].assign(**{'Receipt ID': 'R-other'})], ignore_index=True)
+    summary = clean_export(write_export(tmp_path, with_ids, "keyed.csv"), str(tmp_path / "clean"), store_dir=None, max_workers=1)
+    assert summary['duplicates'] == 2 and summary['clean'] == len(source) + 1
+    clean = pd.read_parquet(summary['clean_path'])
+    assert clean['Transaction ID'].str.startswith('R').all()
+
+
+def test_workers_and_blocks_do_not_change_the_output(tmp_path, source):
+    keyed = receipts(source)
+    raw = pd.concat([keyed, keyed.iloc[[5, 400, 590]], pd.DataFrame([{**source.iloc[7], 'Quantity Sold': 'x'}])],
+                    ignore_index=True)
+    path = write_export(tmp_path, raw)
+    outputs = []
+    for workers, block_bytes in [(1, 1 << 20), (3, 4_000)]:
+        summary = clean_export(path, str(tmp_path / f"clean_{workers}"), store_dir=None, max_workers=workers, block_bytes=block_bytes)
+        outputs.append((pd.read_parquet(summary['clean_path']), pd.read_parquet(summary['quarantine_path']),
+                        {k: summary[k] for k in ('rows', 'clean', 'quarantined', 'duplicates', 'reasons')}))
+    pd.testing.assert_frame_equal(outputs[0][0], outputs[1][0])
+    pd.testing.assert_frame_equal(outputs[0][1], outputs[1][1])
+    assert outputs[0][2] == outputs[1][2]
+    assert outputs[0][2]['duplicates'] == 3
+
+
+def test_clean_rows_are_ingested_with_receipt_ids(tmp_path, source):
+    path = write_export(tmp_path, receipts(source))
+    out_dir, store_dir = str(tmp_path / "clean"), str(tmp_path / "store")
+    summary = clean_export(path, out_dir, store_dir=store_dir, max_workers=2, block_bytes=8_000)
+    with open(os.path.join(out_dir, "export.summary.json")) as f:
+        assert json.load(f)['ingested'] == summary['ingested']
+    stored = load_store_data(store_dir)
+    assert len(stored) == len(source)
+    assert stored['Transaction ID'].notna().all()
+    np.testing.assert_allclose(stored['Sale Amount'].sum(), source['Sale Amount'].astype(float).sum())
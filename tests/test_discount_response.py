@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+import discount_response
+from aggregates import LEVELS, build_aggregates
+from discount_response import PENALTY, compute_discount_response, grouped_least_squares, response_design
+from sales_data import read_sales_csv
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CafeSales_clean.csv")
+
+
+def weighted_ridge(X, y, weights, penalty=PENALTY):
+    # One series: the weighted normal equations, intercept not shrunk
+    penalties = np.full(X.shape[1], penalty)
+    penalties[0] = 0.0
+    return np.linalg.solve(X.T @ (X * weights[:, None]) + np.diag(penalties), X.T @ (weights * y))
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return build_aggregates(read_sales_csv(BASELINE, nrows=4000))['cube']
+
+
+def test_grouped_least_squares_matches_per_group_solves(monkeypatch):
+    # Small blocks, so the sums run over several of them
+    monkeypatch.setattr(discount_response, 'BLOCK_ROWS', 37)
+    rng = np.random.default_rng(0)
+    n_rows, n_groups = 500, 6
+    X = np.hstack([np.ones((n_rows, 1)), rng.normal(size=(n_rows, 4))])
+    y = X @ rng.normal(size=5) + rng.normal(0, 0.1, n_rows)
+    weights = rng.integers(1, 10, n_rows).astype(float)
+    # Two levels: every row belongs to one group of each
+    groups = np.column_stack([rng.integers(0, 2, n_rows), rng.integers(2, n_groups, n_rows)])
+    coefficients, _ = grouped_least_squares(X, y, weights, groups, n_groups)
+    for group in range(n_groups):
+        rows = (groups == group).any(axis=1)
+        np.testing.assert_allclose(coefficients[group], weighted_ridge(X[rows], y[rows], weights[rows]), rtol=1e-8, atol=1e-10)
+
+
+def test_response_matches_per_series_regressions(cube):
+    response = compute_discount_response({'cube': cube})
+    cube = cube[cube['Transactions'] > 0]
+    X = response_design(cube)
+    y = (cube['Quantity Sold'] / cube['Transactions']).to_numpy(dtype=float)
+    weights = cube['Transactions'].to_numpy(dtype=float)
+    coefficients = response['coefficients'].set_index(['Level', 'Series'])
+    assert len(coefficients) == sum(cube[level].nunique() for level in LEVELS)
+    for level in LEVELS:
+        for series in cube[level].astype(str).unique():
+            rows = (cube[level].astype(str) == series).to_numpy()
+            expected = weighted_ridge(X[rows], y[rows], weights[rows])[:3]
+            np.testing.assert_allclose(coefficients.loc[(level, series)].to_numpy(dtype=float), expected, rtol=1e-7, atol=1e-9)
+
+
+def test_recommendations_stay_in_the_observed_range(cube):
+    summary = compute_discount_response({'cube': cube})['summary']
+    assert (summary['Recommended Discount %'] <= summary['Max Observed Discount %'] + 1e-6).all()
+    np.testing.assert_allclose(summary.groupby('Level')['Transactions'].sum(), cube['Transactions'].sum())
+
+
+def test_no_transactions_gives_no_response(cube):
+    assert compute_discount_response({'cube': cube.assign(Transactions=0)}) is None
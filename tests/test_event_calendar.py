@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from event_calendar import build_event_calendar, event_days, event_flags, tag_events
+
+
+@pytest.fixture(scope="module")
+def events():
+    rng = np.random.default_rng(0)
+    n = 40
+    start = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 500, n), unit='D')
+    stores = pd.Series(np.where(rng.random(n) < 0.3, rng.choice(['A', 'B'], n), None), dtype=object)
+    return pd.DataFrame({
+        'Event': [f"Event {i}" for i in range(n)],
+        'Start': start,
+        'End': start + pd.to_timedelta(rng.integers(0, 6, n), unit='D'),
+        'Store': stores.where(stores.notna(), pd.NA),
+    })
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(1)
+    dates = pd.Timestamp('2022-12-01') + pd.to_timedelta(rng.integers(0, 620, 3000), unit='D')
+    return pd.DataFrame({'Date': dates, 'Row': np.arange(3000)})
+
+
+def counted(events, store):
+    # Chain-wide events count everywhere; a store's own only with that store
+    if store is None:
+        return events
+    return events[events['Store'].isna() | (events['Store'] == store)]
+
+
+def reference_tags(frame, events, store):
+    # Every (row, event) pair with the row's date inside the event, by brute force
+    pairs = []
+    for i, event in counted(events, store).iterrows():
+        inside = frame['Date'].between(event['Start'], event['End'])
+        pairs.extend((row, i) for row in frame.loc[inside, 'Row'])
+    return pairs
+
+
+@pytest.mark.parametrize('store', [None, 'A', 'B', 'unknown'])
+def test_lookups_match_interval_checks(events, frame, store):
+    calendar = build_event_calendar(events)
+    pairs = reference_tags(frame, events, store)
+    flagged = {row for row, _ in pairs}
+    np.testing.assert_array_equal(event_flags(calendar, frame['Date'], store), frame['Row'].isin(flagged).to_numpy())
+    tagged = tag_events(frame, calendar, store)
+    expected = sorted((row, events['Event'][i]) for row, i in pairs)
+    assert sorted(zip(tagged['Row'], tagged['Event'])) == expected
+
+
+def test_event_days_cover_every_event_day(events):
+    days = set()
+    for start, end in zip(events['Start'], events['End']):
+        days.update(pd.date_range(start, end))
+    assert list(event_days(build_event_calendar(events))) == sorted(days)
+
+
+def test_empty_calendar_has_no_events(events, frame):
+    calendar = build_event_calendar(events.head(0))
+    assert not event_flags(calendar, frame['Date']).any()
+    assert tag_events(frame, calendar).empty
+    assert len(event_days(calendar)) == 0
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from fast_forecasting import DISCOUNT_WINDOW, HW_GRID, RIDGE_PENALTY, SEASON, holt_winters, ridge, seasonal_naive
+
+HORIZON = 14
+
+
+def sample_series(n_days=120, n_series=4, seed=0):
+    rng = np.random.default_rng(seed)
+    days = np.arange(n_days)[:, None]
+    weekly = 20 * np.sin(2 * np.pi * days / SEASON + rng.uniform(0, np.pi, n_series))
+    return 200 + 0.5 * days * rng.uniform(-1, 1, n_series) + weekly + rng.normal(0, 5, (n_days, n_series))
+
+
+def holt_winters_reference(y, cut, horizon=HORIZON, season=SEASON, grid=HW_GRID):
+    # One series, one parameter set at a time, refitted on the first `cut` days
+    best = None
+    for alpha, beta, gamma in grid:
+        level = y[:season].mean()
+        trend = 0.0
+        seasonal = list(y[:season] - level)
+        sse = 0.0
+        for t in range(season, cut):
+            s = seasonal[t % season]
+            sse += (y[t] - (level + trend + s)) ** 2
+            new_level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            seasonal[t % season] = gamma * (y[t] - new_level) + (1 - gamma) * s
+            level = new_level
+        if best is None or sse < best[0]:
+            forecast = [level + h * trend + seasonal[(cut - 1 + h) % season] for h in range(1, horizon + 1)]
+            best = (sse, forecast)
+    return np.array(best[1])
+
+
+def ridge_reference(y, cut, features, discount, horizon=HORIZON, penalty=RIDGE_PENALTY):
+    # The full normal equations of one series: calendar features plus its discount share
+    X = np.hstack([features[:cut], discount[:cut, None]])
+    penalties = np.full(X.shape[1], penalty)
+    penalties[0] = 0.0
+    coef = np.linalg.solve(X.T @ X + np.diag(penalties), X.T @ y[:cut])
+    planned = discount[max(cut - DISCOUNT_WINDOW, 0):cut].mean()
+    return features[cut:cut + horizon] @ coef[:-1] + planned * coef[-1]
+
+
+def test_seasonal_naive_repeats_the_last_week():
+    Y = sample_series()
+    forecasts = seasonal_naive(Y, [50, 120 - HORIZON], HORIZON)
+    for i, cut in enumerate([50, 120 - HORIZON]):
+        for h in range(HORIZON):
+            np.testing.assert_array_equal(forecasts[i, h], Y[cut - SEASON + h % SEASON])
+
+
+def test_holt_winters_matches_single_series_refits():
+    Y = sample_series()
+    cuts = [60, 92, 106]
+    forecasts = holt_winters(Y, cuts, HORIZON)
+    assert forecasts.shape == (len(cuts), HORIZON, Y.shape[1])
+    for i, cut in enumerate(cuts):
+        for j in range(Y.shape[1]):
+            np.testing.assert_allclose(forecasts[i, :, j], holt_winters_reference(Y[:, j], cut), rtol=1e-10)
+
+
+def test_ridge_matches_single_series_solves():
+    rng = np.random.default_rng(1)
+    Y = sample_series()
+    n_days = len(Y)
+    dates = np.arange(n_days + HORIZON)
+    dayofweek = (dates[:, None] % SEASON == np.arange(1, SEASON)).astype(float)
+    features = np.hstack([np.ones((len(dates), 1)), dates[:, None] / 365.0, dayofweek,
+                          (rng.random(len(dates)) < 0.1).astype(float)[:, None]])
+    discount = rng.uniform(0, 0.3, (n_days, Y.shape[1]))
+    discount[:, -1] = 0.0  # a series that is never discounted stays solvable
+    cuts = [70, 92, n_days]
+    forecasts = ridge(Y, cuts, features, discount, HORIZON)
+    for i, cut in enumerate(cuts):
+        for j in range(Y.shape[1]):
+            np.testing.assert_allclose(forecasts[i, :, j], ridge_reference(Y[:, j], cut, features, discount[:, j]),
+                                       rtol=1e-8, atol=1e-8)
+
+
+@pytest.mark.parametrize('cut', [SEASON, SEASON + 1])
+def test_holt_winters_short_history(cut):
+    # Forecasting from the first week only uses the initial level and season
+    Y = sample_series(n_days=30)
+    forecasts = holt_winters(Y, [cut], HORIZON)
+    for j in range(Y.shape[1]):
+        np.testing.assert_allclose(forecasts[0, :, j], holt_winters_reference(Y[:, j], cut), rtol=1e-10)
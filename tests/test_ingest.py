@@ -0,0 +1,227 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from aggregates import CUBE_DIMENSIONS, HISTOGRAM_DIMENSIONS, ROLLUPS, build_aggregates, restore_dimension_dtypes
+from analysis_discounts import compute_discounts, compute_discounts_streaming
+from sales_data import iter_sales_csv, read_sales_csv
+from sales_filter import build_indexes, filter_aggregates
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CafeSales_clean.csv")
+AGGREGATE_KEYS = {'cube': CUBE_DIMENSIONS, 'discount_histogram': HISTOGRAM_DIMENSIONS,
+                  **{name: keys for name, (keys, _) in ROLLUPS.items()}}
+
+
+def normalized(frame, keys, columns):
+    frame = restore_dimension_dtypes(frame[columns].copy())
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype) and col != 'Discount Bin':
+            frame[col] = frame[col].astype(str)
+    return frame.sort_values(keys, ignore_index=True)
+
+
+def assert_same_aggregates(got, expected):
+    # Same rows and totals, whatever order the partitions were merged in
+    for name, keys in AGGREGATE_KEYS.items():
+        columns = sorted(set(got[name].columns) & set(expected[name].columns))
+        pd.testing.assert_frame_equal(normalized(got[name], keys, columns), normalized(expected[name], keys, columns),
+                                      check_dtype=False, check_categorical=False, rtol=1e-9)
+
+
+def assert_same_discounts(got, expected):
+    for name, frame in expected.items():
+        if isinstance(frame, pd.DataFrame):
+            pd.testing.assert_frame_equal(got[name].reset_index(drop=True), frame.reset_index(drop=True),
+                                          check_dtype=False, check_categorical=False, rtol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def sales():
+    return read_sales_csv(BASELINE, nrows=3000).sort_values('Date', kind='stable', ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def branches(sales):
+    return np.array(['Riyadh', 'Jeddah', 'Dammam'])[np.random.default_rng(0).integers(0, 3, len(sales))]
+
+
+def date_batches(sales, n=3):
+    cuts = sales['Date'].quantile(np.linspace(0, 1, n + 1)[1:-1]).tolist()
+    edges = [sales['Date'].min()] + cuts + [sales['Date'].max() + pd.Timedelta(days=1)]
+    return [sales[(sales['Date'] >= lo) & (sales['Date'] < hi)] for lo, hi in zip(edges, edges[1:])]
+
+
+def test_incremental_batches_match_a_full_build(tmp_path, sales):
+    store_dir = str(tmp_path / "store")
+    for i, batch in enumerate(date_batches(sales)):
+        assert ingest.append_batch(batch, store_dir, source=f"batch{i}.csv")
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=1), build_aggregates(sales))
+
+
+def test_chunked_csv_matches_one_frame(tmp_path, sales):
+    path = str(tmp_path / "sales.csv")
+    sales.to_csv(path, index=False)
+    ingest.append_chunks(lambda: iter_sales_csv(path, chunksize=700), str(tmp_path / "chunked"), source="sales.csv")
+    ingest.append_batch(sales, str(tmp_path / "whole"), source="sales.csv")
+    assert_same_aggregates(ingest.load_store_aggregates(str(tmp_path / "chunked"), max_workers=1),
+                           ingest.load_store_aggregates(str(tmp_path / "whole"), max_workers=1))
+    digests = [ingest.read_manifest(str(tmp_path / name))['batches'][0]['digest'] for name in ("chunked", "whole")]
+    assert digests[0] == digests[1]
+
+
+def test_repeated_batch_is_skipped(tmp_path, sales):
+    store_dir = str(tmp_path / "store")
+    assert ingest.append_batch(sales, store_dir, source="a.csv")
+    assert not ingest.append_batch(sales.sample(frac=1, random_state=0), store_dir, source="b.csv")
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=1), build_aggregates(sales))
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_multi_store_merge_matches_a_single_build(tmp_path, sales, branches, max_workers):
+    store_dir = str(tmp_path / "store")
+    ingest.append_batch(sales.assign(Store=branches), store_dir, source="branches.csv")
+    assert ingest.store_date_ranges(store_dir).keys() == {'Dammam', 'Jeddah', 'Riyadh'}
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=max_workers), build_aggregates(sales))
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, stores=['Jeddah', 'Dammam'], max_workers=max_workers),
+                           build_aggregates(sales[branches != 'Riyadh']))
+
+
+def test_pruned_selection_reads_whole_months(tmp_path, sales, branches):
+    store_dir = str(tmp_path / "store")
+    ingest.append_batch(sales.assign(Store=branches), store_dir, source="branches.csv")
+    selected = ingest.load_store_aggregates(store_dir, stores=['Riyadh'], start='2023-03-15', end='2023-05-02', max_workers=1)
+    rows = sales[(branches == 'Riyadh') & (sales['Date'] >= '2023-03-01') & (sales['Date'] < '2023-06-01')]
+    assert_same_aggregates(selected, build_aggregates(rows))
+
+
+def test_range_in_a_gap_between_months_is_empty(tmp_path, sales):
+    store_dir = str(tmp_path / "store")
+    first, last = date_batches(sales, 2)
+    ingest.append_batch(first, store_dir, source="first.csv")
+    ingest.append_batch(last.assign(Date=last['Date'] + pd.Timedelta(days=400)), store_dir, source="later.csv")
+    gap_start = (first['Date'].max() + pd.offsets.MonthBegin(2)).date()
+    gap_end = (gap_start + pd.offsets.MonthEnd(1)).date()
+    for stores in (None, ['main']):
+        assert ingest.prune_partitions(ingest.list_partitions(store_dir), stores, gap_start, gap_end).empty
+        selected = ingest.load_store_aggregates(store_dir, stores, gap_start, gap_end, max_workers=1)
+        expected = build_aggregates(sales.head(0))
+        for name in AGGREGATE_KEYS:
+            assert selected[name].empty
+            assert list(selected[name].columns) == list(expected[name].columns)
+        assert filter_aggregates(selected, build_indexes(selected), gap_start, gap_end)['cube'].empty
+
+
+def test_store_without_discounts_has_a_typed_empty_histogram(tmp_path, sales):
+    store_dir = str(tmp_path / "store")
+    ingest.append_batch(sales[~sales['Discount Applied']], store_dir)
+    histogram = ingest.load_store_aggregates(store_dir, max_workers=1)['discount_histogram']
+    expected = build_aggregates(sales.head(0))['discount_histogram']
+    assert histogram.empty
+    assert histogram.dtypes.to_dict() == expected.dtypes.to_dict()
+
+
+def test_streaming_csv_matches_in_memory_discounts(tmp_path, sales):
+    path = str(tmp_path / "sales.csv")
+    sales.to_csv(path, index=False)
+    assert_same_discounts(compute_discounts_streaming(iter_sales_csv(path, chunksize=450)),
+                          compute_discounts(build_aggregates(sales)))
+
+
+def test_streaming_store_matches_in_memory_discounts(tmp_path, sales, branches):
+    store_dir = str(tmp_path / "store")
+    ingest.append_batch(sales.assign(Store=branches), store_dir, source="branches.csv")
+    for stores, start, end in [(None, None, None), (['Jeddah'], '2023-02-10', '2023-06-20')]:
+        streamed = compute_discounts_streaming(ingest.iter_store_rows(store_dir, stores, start, end))
+        aggregates = ingest.load_store_aggregates(store_dir, stores, start, end, max_workers=1)
+        expected = compute_discounts(filter_aggregates(aggregates, build_indexes(aggregates), start, end))
+        assert_same_discounts(streamed, expected)
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_on_commit(monkeypatch):
+    # The journal write goes through; the committing one (without 'pending') fails
+    write_manifest = ingest._write_manifest
+
+    def failing(manifest, store_dir):
+        if 'pending' not in manifest:
+            raise Crash
+        write_manifest(manifest, store_dir)
+    monkeypatch.setattr(ingest, '_write_manifest', failing)
+
+
+def crash_after_first_merge(monkeypatch):
+    merge_partitions = ingest._merge_partitions
+    calls = []
+
+    def failing(*args):
+        if calls:
+            raise Crash
+        calls.append(args)
+        merge_partitions(*args)
+    monkeypatch.setattr(ingest, '_merge_partitions', failing)
+
+
+@pytest.mark.parametrize('crash', [crash_on_commit, crash_after_first_merge])
+def test_retry_after_a_crash_counts_the_batch_once(tmp_path, sales, branches, monkeypatch, crash):
+    store_dir = str(tmp_path / "store")
+    first, second = date_batches(sales, 2)
+    ingest.append_batch(first, store_dir, source="first.csv")
+    # Partly into the store that already holds the first batch, partly new stores
+    later = second.assign(Store=np.where(branches[len(first):] == 'Dammam', 'main', branches[len(first):]))
+    with monkeypatch.context() as patch:
+        crash(patch)
+        with pytest.raises(Crash):
+            ingest.append_batch(later, store_dir, source="second.csv")
+    assert 'pending' in ingest.read_manifest(store_dir)
+    assert ingest.append_batch(later, store_dir, source="second.csv")
+    assert 'pending' not in ingest.read_manifest(store_dir)
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=1), build_aggregates(sales))
+    assert len(ingest.load_store_data(store_dir)) == len(sales)
+
+
+def test_crashed_replace_keeps_the_committed_batch(tmp_path, sales, monkeypatch):
+    store_dir = str(tmp_path / "store")
+    first, second = date_batches(sales, 2)
+    ingest.append_batch(first, store_dir, source="first.csv")
+    ingest.append_batch(second, store_dir, source="second.csv")
+    fixed = second.assign(**{'Quantity Sold': (second['Quantity Sold'] + 1).astype('int16')})
+    with monkeypatch.context() as patch:
+        crash_on_commit(patch)
+        with pytest.raises(Crash):
+            ingest.append_batch(fixed, store_dir, source="second.csv", replace=True)
+    assert ingest.recover_store(store_dir)
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=1), build_aggregates(sales))
+    assert ingest.append_batch(fixed, store_dir, source="second.csv", replace=True)
+    assert_same_aggregates(ingest.load_store_aggregates(store_dir, max_workers=1), build_aggregates(pd.concat([first, fixed])))
+
+
+def test_empty_stream_gives_empty_discounts(tmp_path, sales):
+    store_dir = str(tmp_path / "store")
+    first, second = date_batches(sales, 2)
+    ingest.append_batch(first, store_dir, source="first.csv")
+    ingest.append_batch(second.assign(Date=second['Date'] + pd.Timedelta(days=400)), store_dir, source="later.csv")
+    gap_start = (first['Date'].max() + pd.offsets.MonthBegin(2)).date()
+    rows = ingest.iter_store_rows(store_dir, None, gap_start, (gap_start + pd.offsets.MonthEnd(1)).date())
+    for streamed in (compute_discounts_streaming(rows), compute_discounts_streaming(iter([]))):
+        expected = compute_discounts(build_aggregates(sales.head(0)))
+        assert streamed['discount_comparison'].empty and streamed['quantity_per_bin_category'].empty
+        assert_same_discounts(streamed, expected)
+
+
+def test_source_version_follows_the_dashboard_source(tmp_path, sales):
+    path, store_dir = str(tmp_path / "sales.csv"), str(tmp_path / "store")
+    first, second = date_batches(sales, 2)
+    first.to_csv(path, index=False)
+    csv_version = ingest.source_version(path, store_dir)
+    assert csv_version['csv'] == os.path.abspath(path)
+    ingest.seed_store(path, store_dir)
+    seeded = ingest.source_version(path, store_dir)
+    assert seeded != csv_version and 'digest' in seeded
+    ingest.append_batch(second, store_dir, source="second.csv")
+    assert ingest.source_version(path, store_dir) != seeded
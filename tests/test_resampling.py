@@ -0,0 +1,82 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ttest_1samp
+
+from analysis_events import event_significance, event_window_means
+from resampling import bootstrap, confidence_interval, permutation_test
+
+
+def exact_permutation_p(a, b):
+    # Every relabelling of the pooled values, enumerated
+    values = np.concatenate([a, b])
+    observed = abs(a.mean() - b.mean())
+    diffs = []
+    for picked in itertools.combinations(range(len(values)), len(a)):
+        mask = np.zeros(len(values), dtype=bool)
+        mask[list(picked)] = True
+        diffs.append(abs(values[mask].mean() - values[~mask].mean()))
+    return np.mean(np.asarray(diffs) >= observed - 1e-12)
+
+
+def test_permutation_matches_exact_enumeration():
+    a = np.array([12.0, 15.5, 14.0, 18.0, 16.5])
+    b = np.array([10.0, 11.5, 13.0, 9.5, 12.5, 11.0])
+    difference, p_value = permutation_test(a, b, n_resamples=50_000, max_workers=1)
+    assert difference == pytest.approx(a.mean() - b.mean())
+    assert p_value == pytest.approx(exact_permutation_p(a, b), abs=0.005)
+
+
+def test_permutation_weighted_groups():
+    # (values, weights) compares sum(values) / sum(weights), e.g. quantity per transaction
+    quantity = np.array([30.0, 42.0, 25.0, 50.0])
+    transactions = np.array([10.0, 12.0, 8.0, 15.0])
+    difference, _ = permutation_test((quantity[:2], transactions[:2]), (quantity[2:], transactions[2:]), 1_000, max_workers=1)
+    assert difference == pytest.approx(72 / 22 - 75 / 23)
+
+
+def test_results_do_not_depend_on_workers():
+    rng = np.random.default_rng(1)
+    a, b = rng.normal(10, 2, 40), rng.normal(11, 2, 60)
+    # 200k resamples of 100 values run as several batches, so the pool is used
+    n = 200_000
+    assert permutation_test(a, b, n, seed=3, max_workers=1) == permutation_test(a, b, n, seed=3, max_workers=2)
+    np.testing.assert_array_equal(bootstrap([a, b], n, seed=3, max_workers=1), bootstrap([a, b], n, seed=3, max_workers=2))
+
+
+def test_bootstrap_interval_matches_normal_approximation():
+    values = np.random.default_rng(2).normal(50, 5, 400)
+    samples = bootstrap([values], 20_000, max_workers=1)
+    assert samples.shape == (1, 20_000)
+    low, high = confidence_interval(samples[0])
+    standard_error = values.std(ddof=1) / np.sqrt(len(values))
+    assert low == pytest.approx(values.mean() - 1.96 * standard_error, abs=0.1 * standard_error + 0.05)
+    assert high == pytest.approx(values.mean() + 1.96 * standard_error, abs=0.1 * standard_error + 0.05)
+
+
+def test_event_significance_matches_ttest_1samp():
+    baseline = np.random.default_rng(4).normal(100, 15, 200)
+    event_values = np.array([80.0, 99.0, 104.5, 140.0])
+    t_stats, p_values = event_significance(event_values, baseline)
+    for value, t_stat, p_value in zip(event_values, t_stats, p_values):
+        expected = ttest_1samp(baseline, value)
+        assert t_stat == pytest.approx(expected.statistic)
+        assert p_value == pytest.approx(expected.pvalue)
+
+
+def test_event_window_means_match_a_loop():
+    dates = pd.date_range('2023-01-01', periods=60).delete([5, 6, 20])
+    daily = pd.DataFrame({'Date': dates, 'Sale Amount': np.arange(len(dates), dtype=float) * 3 + 7})
+    starts = pd.to_datetime(['2023-01-05', '2023-01-21', '2023-02-27', '2023-01-06'])
+    ends = pd.to_datetime(['2023-01-08', '2023-01-21', '2023-03-05', '2023-01-07'])
+    for window in (0, 2):
+        means, days = event_window_means(daily, starts, ends, window)
+        for start, end, mean, n in zip(starts, ends, means, days):
+            inside = daily['Date'].between(start - pd.Timedelta(days=window), end + pd.Timedelta(days=window))
+            assert n == inside.sum()
+            if n:
+                assert mean == pytest.approx(daily.loc[inside, 'Sale Amount'].mean())
+            else:
+                assert np.isnan(mean)
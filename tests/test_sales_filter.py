@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import build_aggregates, build_rollups
+from sales_data import read_sales_csv
+from sales_filter import INDEXED_AGGREGATES, build_index, build_indexes, filter_aggregates, slice_index
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CafeSales_clean.csv")
+
+RANGES = {
+    'all': (None, None),
+    'from': ('2023-03-15', None),
+    'until': (None, '2023-02-10'),
+    'range': ('2023-02-14', '2023-06-03'),
+    'one day': ('2023-05-31', '2023-05-31'),
+    'reversed': ('2023-03-10', '2023-03-01'),
+    'before data': ('2022-11-01', '2022-12-31'),
+    'after data': ('2023-08-01', '2023-08-31'),
+    # April has no sales at all
+    'gap': ('2023-04-03', '2023-04-27'),
+    'whole gap month': ('2023-04-01', '2023-04-30'),
+    'across gap': ('2023-03-30', '2023-05-02'),
+}
+SELECTIONS = {
+    'none': (None, None),
+    'categories': (['Tea', 'Pastries'], None),
+    'products': (None, ['Latte', 'Club']),
+    # Products outside the chosen categories are dropped
+    'both': (['Coffee'], ['Latte', 'Club']),
+    'unknown': (['Juice'], None),
+}
+
+
+@pytest.fixture(scope="module")
+def aggregates():
+    sales = read_sales_csv(BASELINE)
+    keep = sales['Date'].between('2023-01-01', '2023-06-30') & (sales['Date'].dt.month != 4)
+    return build_aggregates(sales[keep].reset_index(drop=True))
+
+
+@pytest.fixture(scope="module")
+def indexes(aggregates):
+    return build_indexes(aggregates)
+
+
+def masked(frame, start=None, end=None, categories=None, products=None):
+    # Reference filter: one boolean mask over the date-sorted rows
+    frame = frame.sort_values('Date', kind='stable', ignore_index=True)
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= (frame['Date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (frame['Date'] <= pd.Timestamp(end)).to_numpy()
+    if categories:
+        mask &= frame['Item Category'].isin(categories).to_numpy()
+    if products:
+        mask &= frame['Product Description'].isin(products).to_numpy()
+    return frame[mask].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+@pytest.mark.parametrize('date_range', RANGES)
+def test_slice_matches_mask(aggregates, indexes, date_range, selection):
+    start, end = RANGES[date_range]
+    categories, products = SELECTIONS[selection]
+    for name in INDEXED_AGGREGATES:
+        got = slice_index(indexes[name], start, end, categories, products).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, masked(aggregates[name], start, end, categories, products))
+
+
+@pytest.mark.parametrize('date_range', ['gap', 'whole gap month', 'reversed', 'before data', 'after data'])
+def test_empty_ranges(aggregates, indexes, date_range):
+    start, end = RANGES[date_range]
+    filtered = filter_aggregates(aggregates, indexes, start, end)
+    for name, frame in filtered.items():
+        assert frame.empty, name
+    assert filtered['cube'].dtypes.equals(aggregates['cube'].dtypes)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_filter_aggregates_rebuilds_rollups(aggregates, indexes, selection):
+    start, end = RANGES['across gap']
+    categories, products = SELECTIONS[selection]
+    filtered = filter_aggregates(aggregates, indexes, start, end, categories, products)
+    cube = masked(aggregates['cube'], start, end, categories, products)
+    pd.testing.assert_frame_equal(filtered['cube'], cube)
+    for name, rollup in build_rollups(cube).items():
+        pd.testing.assert_frame_equal(filtered[name], rollup)
+
+
+def test_unsorted_frame_is_indexed_by_date(aggregates):
+    shuffled = aggregates['cube'].sample(frac=1, random_state=0)
+    index = build_index(shuffled)
+    start, end = RANGES['range']
+    got = slice_index(index, start, end, ['Coffee']).reset_index(drop=True)
+    expected = masked(shuffled, start, end, ['Coffee'])
+    # Rows of one day may come back in any order
+    keys = ['Date', 'Product Description', 'Discount Applied', 'Discount Bin']
+    pd.testing.assert_frame_equal(got.sort_values(keys, ignore_index=True), expected.sort_values(keys, ignore_index=True))
+
+
+def test_no_filters_returns_aggregates(aggregates, indexes):
+    assert filter_aggregates(aggregates, indexes) is aggregates
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_temp import (
+    MIN_PERIODS, lagged_temperature_correlations, rolling_temperature_correlations, temperature_correlations,
+)
+
+
+@pytest.fixture(scope="module")
+def daily():
+    # Date x product sales with gaps (no sales that day), a product with too few
+    # days, and a few days without a temperature reading
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2023-01-01', periods=200, freq='D')
+    temperature = pd.Series(70 + 15 * np.sin(np.arange(200) / 30) + rng.normal(0, 3, 200), index=dates)
+    temperature.iloc[rng.choice(200, 10, replace=False)] = np.nan
+    sales = pd.DataFrame({
+        f"Product {i}": 100 + i * temperature.fillna(70).to_numpy() + rng.normal(0, 40, 200) for i in range(-2, 3)
+    }, index=dates)
+    sales = sales.mask(rng.random(sales.shape) < 0.3)
+    sales['Rare'] = np.nan
+    sales.iloc[[5, 60], sales.columns.get_loc('Rare')] = [10.0, 20.0]
+    return sales, temperature
+
+
+def pandas_correlations(sales, temperature):
+    # DataFrame.corrwith, blanked where fewer than MIN_PERIODS days have both values
+    expected = sales.corrwith(temperature)
+    expected[sales.notna().mul(temperature.notna(), axis=0).sum() < MIN_PERIODS] = np.nan
+    return expected
+
+
+def test_correlations_match_pandas(daily):
+    sales, temperature = daily
+    result = temperature_correlations(sales, temperature)
+    np.testing.assert_allclose(result['Correlation'], pandas_correlations(sales, temperature), rtol=1e-10, atol=1e-12)
+    assert result['Days'].tolist() == sales.notna().mul(temperature.notna(), axis=0).sum().tolist()
+    assert np.isnan(result.loc['Rare', 'Correlation'])
+
+
+def test_lagged_correlations_match_shifted_pandas(daily):
+    sales, temperature = daily
+    result = lagged_temperature_correlations(sales, temperature, lags=[0, 3])
+    for lag in (0, 3):
+        np.testing.assert_allclose(result[f"Lag {lag}"], pandas_correlations(sales, temperature.shift(lag)), rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize('window', [30, 90])
+def test_rolling_correlations_match_pandas(daily, window):
+    sales, temperature = daily
+    result = rolling_temperature_correlations(sales, temperature, window=window)
+    for product in sales.columns:
+        expected = sales[product].rolling(window, min_periods=MIN_PERIODS).corr(temperature)
+        np.testing.assert_array_equal(np.isnan(result[product]), np.isnan(expected))
+        np.testing.assert_allclose(result[product], expected, rtol=1e-8, atol=1e-10)
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import LEVELS, build_aggregates, empty_aggregates
+from sales_data import read_sales_csv
+from trend_pyramid import build_trend_pyramid, trend_window
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CafeSales_clean.csv")
+# Wednesday to Saturday, so the first and last week and month are partial
+START, END = pd.Timestamp('2023-01-11'), pd.Timestamp('2023-06-17')
+
+
+@pytest.fixture(scope="module")
+def aggregates():
+    # Five days without sales in March, which the daily calendar fills with zeros
+    sales = read_sales_csv(BASELINE)
+    keep = sales['Date'].between(START, END) & ~sales['Date'].between('2023-03-05', '2023-03-09')
+    return build_aggregates(sales[keep].reset_index(drop=True))
+
+
+@pytest.fixture(scope="module")
+def pyramid(aggregates):
+    return build_trend_pyramid(aggregates['cube'])
+
+
+def cube_by_day(cube, level):
+    # Date x series totals straight from the cube, on a gap-free calendar
+    wide = cube.groupby(['Date', level], observed=True)['Sale Amount'].sum().unstack(fill_value=0.0)
+    wide.columns = wide.columns.astype(str)
+    return wide.reindex(pd.date_range(START, END, freq='D'), fill_value=0.0)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_day_level_matches_cube(aggregates, pyramid, level):
+    days = pyramid['levels']['Day'][level]
+    expected = cube_by_day(aggregates['cube'], level)
+    pd.testing.assert_frame_equal(days, expected[days.columns], check_names=False, check_freq=False, rtol=1e-12)
+    assert (days.loc['2023-03-05':'2023-03-09'] == 0).all().all()
+
+
+def test_day_totals_match_daily_rollup(aggregates, pyramid):
+    totals = pyramid['levels']['Day']['Item Category'].sum(axis=1)
+    daily = aggregates['daily'].set_index('Date')['Sale Amount'].reindex(totals.index, fill_value=0.0)
+    np.testing.assert_allclose(totals, daily, rtol=1e-12)
+
+
+def test_month_level_matches_monthly_rollup(aggregates, pyramid):
+    months = pyramid['levels']['Month']['Item Category']
+    # Only February to May are whole months inside the range
+    assert months.index.tolist() == list(pd.date_range('2023-02-01', '2023-05-01', freq='MS'))
+    monthly = aggregates['monthly'].pivot(index='Month', columns='Item Category', values='Sale Amount')
+    monthly.columns = monthly.columns.astype(str)
+    np.testing.assert_allclose(months, monthly.loc[months.index, months.columns], rtol=1e-12)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_week_level_sums_complete_weeks(aggregates, pyramid, level):
+    weeks = pyramid['levels']['Week'][level]
+    # Monday 2023-01-16 is the first whole week; the one from Monday 2023-06-12 ends after the data
+    assert weeks.index.tolist() == list(pd.date_range('2023-01-16', '2023-06-05', freq='7D'))
+    days = cube_by_day(aggregates['cube'], level)[weeks.columns]
+    expected = np.array([days.loc[week:week + pd.Timedelta(days=6)].sum().to_numpy() for week in weeks.index])
+    np.testing.assert_allclose(weeks, expected, rtol=1e-12)
+
+
+def test_partial_periods_only(aggregates):
+    # Three days inside one week and one month have no complete coarse period
+    cube = aggregates['cube']
+    pyramid = build_trend_pyramid(cube[cube['Date'].between('2023-02-07', '2023-02-09')])
+    assert pyramid['resolutions'] == ['Day']
+    assert len(pyramid['levels']['Day']) == 3
+
+
+def test_trend_window(pyramid):
+    long, resolution = trend_window(pyramid, 'Item Category', '2023-02-01', '2023-02-28', resolution='Day')
+    assert resolution == 'Day'
+    assert long['Date'].min() == pd.Timestamp('2023-02-01') and long['Date'].max() == pd.Timestamp('2023-02-28')
+    days = pyramid['levels']['Day']['Item Category'].loc['2023-02-01':'2023-02-28']
+    assert long['Sale Amount'].sum() == pytest.approx(days.to_numpy().sum(), rel=1e-12)
+
+    # A window starting mid-week keeps the week already running at its start
+    long, _ = trend_window(pyramid, 'Item Category', '2023-02-01', '2023-02-28', resolution='Week')
+    assert sorted(long['Date'].unique()) == list(pd.date_range('2023-01-30', '2023-02-27', freq='7D'))
+
+    # The whole range is under MAX_POINTS days, so the auto resolution is the finest
+    assert trend_window(pyramid, 'Product Description')[1] == 'Day'
+
+
+def test_empty_cube():
+    pyramid = build_trend_pyramid(empty_aggregates()['cube'])
+    assert pyramid['levels'] == {}
+    long, _ = trend_window(pyramid, 'Item Category')
+    assert long.empty and long.columns.tolist() == ['Date', 'Item Category', 'Sale Amount']
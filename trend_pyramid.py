@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from aggregates import LEVELS, month_start
+
+# Finest first; sales dates are whole days (sales_data.apply_schema)
+RESOLUTIONS = ['Day', 'Week', 'Month']
+# The auto resolution is the finest one that keeps a chart under this many points per line
+MAX_POINTS = 500
+
+
+# --- Period Starts ---
+def period_starts(dates, resolution):
+    dates = pd.DatetimeIndex(dates)
+    if resolution == 'Day':
+        return dates.normalize()
+    if resolution == 'Week':
+        # Weeks start on Monday
+        return dates.normalize() - pd.to_timedelta(dates.dayofweek, unit='D')
+    return pd.DatetimeIndex(month_start(pd.Series(dates)))
+
+
+# --- Pyramid Build ---
+def build_trend_pyramid(cube, measure='Sale Amount', levels=LEVELS):
+    # One pass over the cube gives the (days x products) matrix; the category
+    # columns are a sparse product with the product -> category map, and every
+    # coarser resolution is a reduceat over the daily rows. Each resolution is a
+    # wide float64 frame on a gap-free period index, built from the filtered
+    # cube, so it is cached per selection rather than stored with the rollups
+    if cube.empty:
+        return {'resolutions': RESOLUTIONS, 'levels': {}}
+
+    starts = period_starts(cube['Date'], 'Day')
+    calendar = pd.date_range(starts.min(), starts.max(), freq='D')
+    rows = calendar.get_indexer(starts)
+    products, product_labels = pd.factorize(cube['Product Description'].astype(str), sort=True)
+    values = cube[measure].to_numpy(dtype=float)
+    by_product = sparse.csr_matrix((values, (rows, products)), shape=(len(calendar), len(product_labels)))
+
+    categories = (cube[['Product Description', 'Item Category']].astype(str)
+                  .drop_duplicates('Product Description').set_index('Product Description')['Item Category']
+                  .reindex(product_labels))
+    category_codes, category_labels = pd.factorize(categories, sort=True)
+    membership = sparse.csr_matrix(
+        (np.ones(len(category_codes)), (np.arange(len(category_codes)), category_codes)),
+        shape=(len(product_labels), len(category_labels)),
+    )
+    series = {'Item Category': (by_product @ membership).toarray(), 'Product Description': by_product.toarray()}
+    labels = {'Item Category': category_labels, 'Product Description': product_labels}
+    matrix = np.hstack([series[level] for level in levels])
+    columns = pd.MultiIndex.from_tuples([(level, str(label)) for level in levels for label in labels[level]],
+                                        names=['Level', 'Series'])
+
+    pyramid = {'Day': pd.DataFrame(matrix, index=calendar, columns=columns)}
+    days = pyramid['Day']
+    for coarse in RESOLUTIONS[1:]:
+        coarse_starts = period_starts(days.index, coarse)
+        # Rows are sorted, so each period is one contiguous run of days
+        boundaries = np.flatnonzero(np.r_[True, coarse_starts[1:] != coarse_starts[:-1]])
+        frame = pd.DataFrame(np.add.reduceat(days.to_numpy(), boundaries, axis=0),
+                             index=coarse_starts[boundaries], columns=columns)
+        pyramid[coarse] = _complete_periods(frame, days.index, coarse)
+    # A resolution with no complete period (e.g. weeks in a 3-day range) is not offered
+    resolutions = [resolution for resolution in RESOLUTIONS if len(pyramid[resolution])]
+    return {'resolutions': resolutions, 'levels': {resolution: pyramid[resolution] for resolution in resolutions}}
+
+
+def _complete_periods(frame, days, resolution):
+    # The first week or month can start before the data does and the last end
+    # after it; those partial totals would plot as false dips, so they are dropped
+    step = pd.Timedelta(days=7) if resolution == 'Week' else pd.offsets.MonthBegin()
+    ends = frame.index + step
+    complete = (frame.index >= days[0]) & (ends <= days[-1] + pd.Timedelta(days=1))
+    return frame[complete]
+
+
+# --- Windowed Reads ---
+def pick_resolution(pyramid, start=None, end=None, max_points=MAX_POINTS):
+    # Finest resolution with at most max_points periods inside [start, end]
+    for resolution in pyramid['resolutions']:
+        if len(_window(pyramid['levels'][resolution], start, end)) <= max_points:
+            return resolution
+    return pyramid['resolutions'][-1]
+
+
+def _window(frame, start, end):
+    # Periods are sorted, so a window is two binary searches; a period is kept
+    # if it starts inside the range, plus the one already running at start
+    lower = 0 if start is None else max(frame.index.searchsorted(pd.Timestamp(start), side='right') - 1, 0)
+    upper = len(frame) if end is None else frame.index.searchsorted(pd.Timestamp(end), side='right')
+    return frame.iloc[lower:upper]
+
+
+def trend_window(pyramid, level, start=None, end=None, resolution=None, measure='Sale Amount'):
+    # Long (Date, level, measure) rows for one level over [start, end]
+    if not pyramid['levels']:
+        return pd.DataFrame(columns=['Date', level, measure]), resolution
+    resolution = resolution or pick_resolution(pyramid, start, end)
+    frame = _window(pyramid['levels'][resolution], start, end)[level]
+    long = frame.rename_axis('Date').reset_index().melt(id_vars='Date', var_name=level, value_name=measure)
+    return long, resolution